@@ -1,13 +1,18 @@
 # -*- mode: python ; coding: utf-8 -*-
-from PyInstaller.utils.hooks import collect_all
+import os
 
-datas = [('tesseract_manager.py', '.')]
+# Set AUTOPARSE_BUILD=onedir for a folder build. The onefile exe unpacks
+# itself to a temp directory on every launch; onedir starts straight from
+# disk and skips UPX so nothing has to be decompressed either.
+BUILD_MODE = os.environ.get('AUTOPARSE_BUILD', 'onefile')
+
+datas = [('tesseract_manager.py', '.'), ('version_config.json', '.')]
 binaries = []
-hiddenimports = ['PIL', 'PIL.Image', 'PIL.ImageTk', 'PIL.ImageGrab', 'pytesseract', 'pyautogui', 'keyboard', 'pyperclip', 'tkinter', 'tkinter.messagebox', 'tkinter.ttk']
-tmp_ret = collect_all('PIL')
-datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
-tmp_ret = collect_all('pytesseract')
-datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
+# Modules main.py imports lazily inside functions are still found by the
+# bytecode scan; only tkinter submodules need listing
+hiddenimports = ['tkinter', 'tkinter.messagebox', 'tkinter.ttk', 'tkinter.filedialog']
+# pyautogui and its helpers are no longer used anywhere
+excludes = ['pyautogui', 'pymsgbox', 'pytweening', 'pyscreeze', 'mouseinfo', 'PIL.ImageQt', 'PIL.ImageShow']
 
 
 a = Analysis(
@@ -19,29 +24,58 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=excludes,
     noarchive=False,
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='AutoParse',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-    icon=['icon.ico'],
-)
+if BUILD_MODE == 'onedir':
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='AutoParse',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+        icon=['icon.ico'],
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=False,
+        upx_exclude=[],
+        name='AutoParse',
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        name='AutoParse',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+        icon=['icon.ico'],
+    )
@@ -2,7 +2,6 @@ import os
 import sys
 import subprocess
 import json
-import requests
 import shutil
 import tempfile
 import zipfile
@@ -11,19 +10,172 @@ import tkinter as tk
 from tkinter import messagebox
 import threading
 import time
+import hashlib
+import random
+from binary_delta import apply_delta, file_sha256, make_delta
+
+# Backoff between failed checks: 1 min, 2 min, 4 min, ... up to a day
+BACKOFF_BASE_SECONDS = 60
+BACKOFF_MAX_SECONDS = 24 * 60 * 60
+
+
+def parse_version(version):
+    """'1.2.10' -> (1, 2, 10) for comparisons"""
+    parts = []
+    for part in str(version).lstrip('v').split('.'):
+        digits = ''.join(ch for ch in part if ch.isdigit())
+        parts.append(int(digits) if digits else 0)
+    return tuple(parts)
+
+
+def load_version_config():
+    """Settings from version_config.json next to this module (bundled into the exe)"""
+    try:
+        with open(Path(__file__).parent / "version_config.json", "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
 
 class AutoUpdater:
-    def __init__(self, repo_owner="Architect423", repo_name="AutoParse", current_version="1.0.0"):
+    def __init__(self, repo_owner="Architect423", repo_name="AutoParse", current_version="1.0.0",
+                 manifest_url=None, executable=None, state_path=None):
         self.repo_owner = repo_owner
         self.repo_name = repo_name
         self.current_version = current_version
         self.github_api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}"
         self.repo_url = f"https://github.com/{repo_owner}/{repo_name}"
         self.project_root = Path(__file__).parent
+        self.manifest_url = manifest_url or f"{self.repo_url}/releases/latest/download/manifest.json"
+        
+        # The frozen build updates its own executable from release manifests, source checkouts use git
+        self.frozen = executable is not None or getattr(sys, 'frozen', False)
+        self.executable = Path(executable or sys.executable)
+        install_root = self.executable.parent if self.frozen else self.project_root
+        self.state_path = Path(state_path) if state_path else install_root / "update_state.json"
+        self.state = self._load_state()
+        self.latest_release = None
+    
+    def _load_state(self):
+        """Load cached responses and backoff state"""
+        try:
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+        except Exception:
+            state = {}
+        state.setdefault('http', {})
+        state.setdefault('failures', 0)
+        state.setdefault('next_check_at', 0)
+        return state
+    
+    def _save_state(self):
+        """Persist cached responses and backoff state"""
+        try:
+            with open(self.state_path, "w") as f:
+                json.dump(self.state, f)
+        except Exception as e:
+            print(f"Error saving update state: {e}")
+    
+    def _backoff_active(self):
+        """Check if a previous failure means we should not contact the server yet"""
+        return time.time() < self.state.get('next_check_at', 0)
+    
+    def _record_failure(self, retry_after=None):
+        """Push the next check back exponentially, or to the server's Retry-After"""
+        self.state['failures'] += 1
+        delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (self.state['failures'] - 1))
+        delay *= random.uniform(0.8, 1.2)
+        if retry_after:
+            delay = max(delay, retry_after)
+        self.state['next_check_at'] = time.time() + delay
+        print(f"Update check failed, next attempt in {delay / 60:.0f} min")
+        self._save_state()
+    
+    def _record_success(self):
+        """Reset the backoff after a good response"""
+        self.state['failures'] = 0
+        self.state['next_check_at'] = 0
+        self._save_state()
+    
+    def _conditional_get(self, url, accept=None):
+        """GET url with If-None-Match/If-Modified-Since, returning the body text or None on failure
+
+        A 304 returns the cached body, which also does not count against the
+        GitHub API rate limit.
+        """
+        # requests takes a while to import, so only load it once the check actually runs
+        import requests
         
+        cached = self.state['http'].get(url)
+        headers = {'User-Agent': f"AutoParse/{self.current_version}"}
+        if accept:
+            headers['Accept'] = accept
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        
+        try:
+            response = requests.get(url, headers=headers, timeout=10)
+        except requests.RequestException as e:
+            print(f"Error fetching {url}: {e}")
+            self._record_failure()
+            return None
+        
+        if response.status_code == 304 and cached:
+            self._record_success()
+            return cached['body']
+        if response.status_code == 200:
+            self.state['http'][url] = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'body': response.text
+            }
+            self._record_success()
+            return response.text
+        
+        retry_after = None
+        if response.headers.get('Retry-After', '').isdigit():
+            retry_after = int(response.headers['Retry-After'])
+        elif response.headers.get('X-RateLimit-Remaining') == '0' and response.headers.get('X-RateLimit-Reset', '').isdigit():
+            retry_after = int(response.headers['X-RateLimit-Reset']) - time.time()
+        print(f"Error fetching {url}: HTTP {response.status_code}")
+        self._record_failure(retry_after)
+        return None
+    
+    def _download(self, url, destination, expected_sha256, expected_size=None):
+        """Stream url to destination and check its SHA-256, returning True if it matches"""
+        import requests
+        
+        digest = hashlib.sha256()
+        size = 0
+        with requests.get(url, stream=True, timeout=30,
+                          headers={'User-Agent': f"AutoParse/{self.current_version}"}) as response:
+            response.raise_for_status()
+            with open(destination, "wb") as f:
+                for chunk in response.iter_content(chunk_size=256 * 1024):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+        if expected_size is not None and size != expected_size:
+            print(f"Download size mismatch for {url}: {size} != {expected_size}")
+            return False
+        if digest.hexdigest() != expected_sha256:
+            print(f"Download hash mismatch for {url}")
+            return False
+        return True
+    
     def check_for_updates(self):
         """Check if updates are available from GitHub"""
         try:
+            if self._backoff_active():
+                print("Skipping update check until the backoff period is over.")
+                return False
+            
+            if self.frozen:
+                return self._check_release_manifest()
+            
             # Check if we're in a git repository
             if not self._is_git_repo():
                 print("Not a git repository. Skipping update check.")
@@ -50,6 +202,20 @@ class AutoUpdater:
             print(f"Error checking for updates: {e}")
             return False
     
+    def _check_release_manifest(self):
+        """Fetch the release manifest and compare its version with ours"""
+        body = self._conditional_get(self.manifest_url)
+        if body is None:
+            print("Could not fetch the release manifest. Skipping update check.")
+            return False
+        release = json.loads(body)
+        print(f"Current version: {self.current_version}")
+        print(f"Latest version: {release.get('version')}")
+        if parse_version(release.get('version', '0')) <= parse_version(self.current_version):
+            return False
+        self.latest_release = release
+        return True
+    
     def _is_git_repo(self):
         """Check if current directory is a git repository"""
         return (self.project_root / ".git").exists()
@@ -73,19 +239,101 @@ class AutoUpdater:
     def _get_latest_commit(self):
         """Get latest commit hash from GitHub"""
         try:
-            response = requests.get(
-                f"{self.github_api_url}/commits/main",
-                timeout=10
-            )
-            if response.status_code == 200:
-                data = response.json()
-                return data["sha"]
+            body = self._conditional_get(f"{self.github_api_url}/commits/main",
+                                         accept="application/vnd.github+json")
+            if body is not None:
+                return json.loads(body)["sha"]
         except Exception as e:
             print(f"Error fetching latest commit: {e}")
         return None
     
+    def download_release(self, release):
+        """Download and verify the new executable, preferring a delta from our current build
+
+        Returns the path of the verified new executable, or None.
+        """
+        expected = release['exe']['sha256']
+        new_path = self.executable.with_name(self.executable.name + ".new")
+        
+        current_sha256 = file_sha256(self.executable)
+        delta = next((d for d in release.get('deltas', []) if d.get('from_sha256') == current_sha256), None)
+        if delta is not None:
+            delta_path = self.executable.with_name(self.executable.name + ".delta")
+            try:
+                print(f"Downloading {delta.get('size', 0) / 1024:.0f} KB delta instead of the full executable")
+                if self._download(delta['url'], delta_path, delta['sha256'], delta.get('size')):
+                    with open(self.executable, "rb") as f:
+                        old = f.read()
+                    with open(delta_path, "rb") as f:
+                        new = apply_delta(old, f.read())
+                    if hashlib.sha256(new).hexdigest() == expected:
+                        with open(new_path, "wb") as f:
+                            f.write(new)
+                        return new_path
+                    print("Patched executable does not match the release hash")
+            except Exception as e:
+                print(f"Delta update failed: {e}")
+            finally:
+                if delta_path.exists():
+                    delta_path.unlink()
+        
+        print("Downloading full executable")
+        if self._download(release['exe']['url'], new_path, expected, release['exe'].get('size')):
+            return new_path
+        if new_path.exists():
+            new_path.unlink()
+        return None
+    
+    def update_frozen_exe(self, show_gui=True, restart=True):
+        """Replace the running executable with the latest release"""
+        try:
+            release = self.latest_release
+            if release is None:
+                if not self._check_release_manifest():
+                    return False
+                release = self.latest_release
+            
+            new_path = self.download_release(release)
+            if new_path is None:
+                raise Exception("Could not download a verified update")
+            
+            # A running exe cannot be overwritten on Windows, but it can be renamed out of the way
+            old_path = self.executable.with_name(self.executable.name + ".old")
+            if old_path.exists():
+                old_path.unlink()
+            os.replace(self.executable, old_path)
+            os.replace(new_path, self.executable)
+            print(f"Updated to version {release['version']}")
+            
+            if show_gui:
+                messagebox.showinfo(
+                    "Update Complete",
+                    f"AutoParse has been updated to version {release['version']}!\n\n"
+                    "The application will restart to apply changes."
+                )
+            if restart:
+                self._restart_application()
+            return True
+        except Exception as e:
+            error_msg = f"Error during update: {e}"
+            print(error_msg)
+            if show_gui:
+                messagebox.showerror("Update Failed", error_msg)
+            return False
+    
+    def cleanup_previous_update(self):
+        """Delete the executable left behind by the last update"""
+        old_path = self.executable.with_name(self.executable.name + ".old")
+        try:
+            if self.frozen and old_path.exists():
+                old_path.unlink()
+        except OSError:
+            pass  # Still locked by the exiting process, try again next launch
+    
     def update_from_github(self, show_gui=True):
         """Update the application from GitHub"""
+        if self.frozen:
+            return self.update_frozen_exe(show_gui)
         try:
             print("Updating from GitHub...")
             
@@ -207,25 +455,99 @@ class AutoUpdater:
             print(f"Error in silent update: {e}")
             return False
 
+def create_updater(**overrides):
+    """AutoUpdater configured from version_config.json"""
+    config = load_version_config()
+    options = {
+        'repo_owner': config.get('repo_owner', "Architect423"),
+        'repo_name': config.get('repo_name', "AutoParse"),
+        'current_version': config.get('version', "1.0.0"),
+        'manifest_url': config.get('manifest_url'),
+    }
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    return AutoUpdater(**options)
+
 def check_for_updates_on_startup():
     """Convenience function to check for updates on application startup"""
-    updater = AutoUpdater()
+    config = load_version_config()
+    if not config.get('auto_update_enabled', True) or not config.get('check_on_startup', True):
+        return
     
     # Check for updates in background with a small delay to not block startup
     def delayed_check():
-        time.sleep(2)  # Wait 2 seconds after startup
+        time.sleep(config.get('update_check_delay_seconds', 2))
+        updater = create_updater()
+        updater.cleanup_previous_update()
         updater.check_and_update_async()
     
     thread = threading.Thread(target=delayed_check, daemon=True)
     thread.start()
 
+def make_release(version, exe_path, previous, base_url, out_dir):
+    """Write manifest.json, the executable and deltas from previous builds into out_dir"""
+    os.makedirs(out_dir, exist_ok=True)
+    exe_name = os.path.basename(exe_path)
+    shutil.copyfile(exe_path, os.path.join(out_dir, exe_name))
+    with open(exe_path, "rb") as f:
+        new = f.read()
+    
+    manifest = {
+        'version': version,
+        'exe': {'url': f"{base_url}/{exe_name}", 'sha256': hashlib.sha256(new).hexdigest(), 'size': len(new)},
+        'deltas': []
+    }
+    for old_path in previous:
+        with open(old_path, "rb") as f:
+            old = f.read()
+        old_sha256 = hashlib.sha256(old).hexdigest()
+        delta = make_delta(old, new)
+        delta_name = f"{exe_name}.{old_sha256[:12]}.delta"
+        with open(os.path.join(out_dir, delta_name), "wb") as f:
+            f.write(delta)
+        manifest['deltas'].append({'from_sha256': old_sha256, 'url': f"{base_url}/{delta_name}",
+                                   'sha256': hashlib.sha256(delta).hexdigest(), 'size': len(delta)})
+        print(f"Delta from {old_path}: {len(delta)} bytes ({100 * len(delta) / len(new):.1f}% of the exe)")
+    
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Release {version} written to {out_dir}")
+
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Check for updates or build release files")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    check_parser = subparsers.add_parser("check", help="Check for updates and apply them")
+    check_parser.add_argument("--manifest-url", help="Release manifest to use, e.g. from a local test server")
+    check_parser.add_argument("--exe", help="Update this executable as if running frozen")
+    check_parser.add_argument("--current-version")
+    
+    release_parser = subparsers.add_parser("make-release", help="Build manifest.json and deltas for a release")
+    release_parser.add_argument("--version", required=True)
+    release_parser.add_argument("--exe", required=True, help="The new executable")
+    release_parser.add_argument("--previous", nargs="*", default=[], help="Earlier executables to make deltas from")
+    release_parser.add_argument("--base-url", required=True, help="URL the release files will be served from")
+    release_parser.add_argument("--out", default="release")
+    
+    args = parser.parse_args()
+    if args.command == "make-release":
+        make_release(args.version, args.exe, args.previous, args.base_url.rstrip('/'), args.out)
+        sys.exit(0)
+    
     # Test the updater
-    updater = AutoUpdater()
+    if args.command == "check":
+        updater = create_updater(manifest_url=args.manifest_url, executable=args.exe,
+                                 current_version=args.current_version)
+    else:
+        updater = create_updater()
     
     print("Checking for updates...")
     if updater.check_for_updates():
         print("Updates available!")
-        updater.update_from_github()
+        if updater.frozen:
+            updater.update_frozen_exe(show_gui=False, restart=not args.exe)
+        else:
+            updater.update_from_github(show_gui=False)
     else:
         print("No updates available.")
@@ -0,0 +1,357 @@
+"""OCR configuration autotuner for the calibrated region
+
+Usage:
+    python autotune.py [SAMPLES...] [--capture N] [--min-accuracy 0.95] [--workers N] [--yes]
+    python main.py autotune [...]
+
+Samples are region screenshots given on the command line, or --capture N
+fresh grabs of the calibrated region. The output of the current
+configuration for each sample is shown for confirmation (Enter accepts a
+field, anything else replaces it) and saved next to the sample as
+<sample>.expected.json, so later runs do not ask again.
+
+Every combination of page segmentation mode, OEM (the default engine and
+the legacy one unless --oem is given), text scale, thresholding and
+whitelist is then run over the samples in a pool of worker processes,
+one OCR engine per process, and scored on field agreement with the
+confirmed output and on median latency. The fastest few combinations that
+reach --min-accuracy are timed again one at a time, so they are compared
+without the other workers competing for the CPU, and the fastest is stored
+in calibration_config.json as 'ocr_config' and 'preprocess' (or in a
+profile region's entry with --region PROFILE/REGION).
+
+Combinations are scored on the path captures of the region actually
+take: for the main region that is per-field OCR of the learned layout
+(learned on the first sample with the candidate's config, its single-line
+zones read with --psm 7) and the confidence re-OCR, as set in the
+calibration; profile regions are read whole.
+"""
+import argparse
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ocr_engine import OCR_WHITELIST
+
+PSMS = (3, 4, 6, 11)
+# Tesseract's default engine (LSTM with current traineddata) and the legacy one; with
+# traineddata that has no legacy model the OEM 0 combinations fail and score 0
+OEMS = (None, 0)
+TEXT_HEIGHTS = (None, 24, 32, 48)
+THRESHOLDS = (None, 'otsu', 'adaptive')
+WHITELISTS = (True, False)
+
+SAMPLES_DIR = "autotune_samples"
+
+# Set in each worker process by init_worker
+_engine = None
+_images = None
+_template = None
+_pipeline_settings = None
+_field_executor = None
+
+
+def build_ocr_config(psm, oem=None, whitelist=True):
+    """Tesseract config string for one combination"""
+    parts = [f"--psm {psm}"]
+    if oem is not None:
+        parts.append(f"--oem {oem}")
+    if whitelist:
+        parts.append(f"-c tessedit_char_whitelist={OCR_WHITELIST}")
+    return " ".join(parts)
+
+
+def candidates(psms=PSMS, oems=OEMS, text_heights=TEXT_HEIGHTS, thresholds=THRESHOLDS, whitelists=WHITELISTS):
+    """Every combination of the search space as {'ocr_config', 'preprocess'}"""
+    combinations = []
+    for psm, oem, height, threshold, whitelist in itertools.product(psms, oems, text_heights, thresholds, whitelists):
+        preprocess = {}
+        if threshold:
+            preprocess['threshold'] = threshold
+        if height:
+            preprocess['target_text_height'] = height
+        combinations.append({'ocr_config': build_ocr_config(psm, oem, whitelist), 'preprocess': preprocess})
+    return combinations
+
+
+def describe(candidate):
+    """Short human readable form of a combination"""
+    config = candidate['ocr_config'].replace(f"-c tessedit_char_whitelist={OCR_WHITELIST}", "whitelist")
+    preprocess = ", ".join(f"{key}={value}" for key, value in candidate['preprocess'].items())
+    return f"{config} [{preprocess or 'raw'}]"
+
+
+def field_agreement(expected, parsed):
+    """(matching fields, total fields) between a confirmed and a parsed result"""
+    matches = sum(1 for field, value in expected.items() if parsed.get(field, '').strip() == value.strip())
+    return matches, len(expected)
+
+
+def pipeline_settings(settings, target):
+    """{'per_field_ocr', 'confidence'} of the pipeline the GUI runs for a region"""
+    if target == 'main':
+        return {'per_field_ocr': settings.get('per_field_ocr', True), 'confidence': settings.get('confidence', {})}
+    return {'per_field_ocr': False, 'confidence': settings.get('confidence', {})}
+
+
+def load_state(tesseract_path, sample_paths, template_name, templates_path, settings=None):
+    """Load the engine, samples, parser template and pipeline settings of this process"""
+    global _engine, _images, _template, _pipeline_settings, _field_executor
+    from concurrent.futures import ThreadPoolExecutor
+    from PIL import Image
+    from ocr_engine import create_ocr_engine
+    from parser_templates import load_templates, get_template
+
+    _template = get_template(load_templates(templates_path), template_name)
+    _pipeline_settings = settings or {'per_field_ocr': False, 'confidence': None}
+    # Same zone parallelism as the GUI's field OCR pool. Always a new one: a
+    # worker forked from a process that had a pool inherits it without its threads
+    _field_executor = None
+    if _pipeline_settings['per_field_ocr']:
+        _field_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="field-ocr")
+    _engine = create_ocr_engine(tesseract_path)
+    _images = []
+    for path in sample_paths:
+        with Image.open(path) as image:
+            _images.append(image.convert('RGB'))
+
+
+def init_worker(*args):
+    """Worker initializer - keeps engine logging off the progress output"""
+    sys.stdout = sys.stderr
+    load_state(*args)
+
+
+def evaluate(candidate, expected):
+    """Score one combination over every sample
+
+    Returns {'accuracy', 'latency_ms' (median), 'parsed'}; a combination
+    that fails scores 0.
+    """
+    from ocr_pipeline import OCRPipeline
+    from preprocessing import ImagePreprocessor
+
+    pipeline = OCRPipeline(lambda: _engine, ocr_config=candidate['ocr_config'],
+                           preprocessor=ImagePreprocessor(candidate['preprocess']),
+                           per_field_ocr=_pipeline_settings['per_field_ocr'], field_executor=_field_executor,
+                           parse=_template.parse, format_output=_template.format_output,
+                           field_labels=_template.layout_labels, confidence=_pipeline_settings['confidence'],
+                           match_label=_template.match_label)
+    try:
+        # Untimed run so engine handles for this config are created (and the layout learned) outside the measurement
+        pipeline.process(_images[0])
+        latencies = []
+        parsed = []
+        for image in _images:
+            start = time.perf_counter()
+            parsed.append(pipeline.process(image)['parsed'])
+            latencies.append((time.perf_counter() - start) * 1000)
+    except Exception as e:
+        return {'accuracy': 0.0, 'latency_ms': float('inf'), 'parsed': [], 'error': str(e)}
+
+    matches = total = 0
+    for confirmed, result in zip(expected, parsed):
+        case_matches, case_total = field_agreement(confirmed, result)
+        matches += case_matches
+        total += case_total
+    return {'accuracy': matches / total if total else 0.0,
+            'latency_ms': statistics.median(latencies), 'parsed': parsed}
+
+
+def expected_path(sample_path):
+    return sample_path + ".expected.json"
+
+
+def has_values(fields):
+    """Whether a parsed or confirmed result has at least one non-empty field"""
+    return any(isinstance(value, str) and value.strip() for value in fields.values())
+
+
+def confirm_expected(sample_paths, baseline, assume_yes=False):
+    """Confirmed parsed fields for every sample, asking for those not confirmed yet
+
+    baseline is the evaluate() result of the current configuration, whose
+    output is offered for confirmation. Raises ValueError when a sample
+    needs confirming and the baseline has nothing to offer, or when the
+    confirmed fields are all empty - an empty expectation would let any
+    config score 100%.
+    """
+    confirmed = []
+    for index, path in enumerate(sample_paths):
+        if os.path.exists(expected_path(path)):
+            with open(expected_path(path), 'r') as f:
+                fields = json.load(f)
+            if has_values(fields):
+                confirmed.append(fields)
+                continue
+            print(f"Ignoring {expected_path(path)}: no confirmed fields")
+
+        if baseline.get('error'):
+            raise ValueError(f"The current config failed, so there is no output to confirm: {baseline['error']}")
+        parsed = baseline['parsed'][index] if index < len(baseline['parsed']) else {}
+        if not has_values(parsed):
+            raise ValueError(f"The current config parsed no fields from {path} - check the sample and region")
+        fields = dict(parsed)
+        if not assume_yes:
+            print(f"\n{path}")
+            for field, value in parsed.items():
+                answer = input(f"  {field} [{value}]: ").strip()
+                if answer:
+                    fields[field] = answer
+        if not has_values(fields):
+            raise ValueError(f"No fields confirmed for {path}")
+        with open(expected_path(path), 'w') as f:
+            json.dump(fields, f, indent=2)
+        confirmed.append(fields)
+    return confirmed
+
+
+def capture_samples(region, count, interval, directory=SAMPLES_DIR):
+    """Grab count settled captures of region, interval seconds apart, and save them as PNGs"""
+    from screen_capture import select_capture_backend, grab_stable
+
+    os.makedirs(directory, exist_ok=True)
+    backend = select_capture_backend(region)
+    paths = []
+    try:
+        for index in range(count):
+            if index:
+                time.sleep(interval)
+            image, _ = grab_stable(backend, region)
+            path = os.path.join(directory, f"sample_{time.strftime('%Y%m%d_%H%M%S')}_{index}.png")
+            image.save(path)
+            paths.append(path)
+            print(f"Captured {path}")
+    finally:
+        backend.close()
+    return paths
+
+
+def find_region(settings, target):
+    """(bbox, settings dict the tuned values go into) for 'main' or 'PROFILE/REGION'"""
+    if target == 'main':
+        return tuple(settings.get('region') or ()), settings
+    profile_name, _, region_name = target.partition('/')
+    for profile in settings.get('profiles', []):
+        if profile['name'] == profile_name:
+            for region in profile.get('regions', []):
+                if region['name'] == region_name:
+                    return tuple(region['bbox']), region
+    raise ValueError(f"No region '{target}' in the calibration")
+
+
+def tune(candidate_list, sample_paths, expected, workers, tesseract_path, template_name, templates_path,
+         settings=None):
+    """Evaluate every combination in parallel, returning [(candidate, result)] in input order"""
+    # Each worker is one OCR stream; stop Tesseract from spawning its own threads on top
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+    results = [None] * len(candidate_list)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(tesseract_path, sample_paths, template_name, templates_path, settings)) as pool:
+        futures = {pool.submit(evaluate, candidate, expected): index for index, candidate in enumerate(candidate_list)}
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            sys.stderr.write(f"\r{done}/{len(candidate_list)} combinations")
+    sys.stderr.write("\n")
+    return list(zip(candidate_list, results))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='autotune', description=__doc__.splitlines()[0])
+    parser.add_argument('samples', nargs='*', help='Region screenshots to tune on')
+    parser.add_argument('--capture', type=int, default=0, help='Grab this many new samples of the region first')
+    parser.add_argument('--interval', type=float, default=2.0, help='Seconds between captured samples')
+    parser.add_argument('--region', default='main', help="'main' or PROFILE/REGION of a profile region")
+    parser.add_argument('--min-accuracy', type=float, default=0.95, help='Field agreement a config must reach (0-1)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--finalists', type=int, default=3, help='Fastest configs re-timed one at a time')
+    parser.add_argument('--psm', type=int, nargs='+', default=list(PSMS))
+    parser.add_argument('--oem', type=int, nargs='+', help='OEM values to try (default: tesseract default and 0, legacy)')
+    parser.add_argument('--yes', action='store_true', help='Accept the current output as confirmed without asking')
+    parser.add_argument('--dry-run', action='store_true', help='Report the best config without saving it')
+    parser.add_argument('--tesseract', help='Path to the tesseract binary (default: auto-detect)')
+    parser.add_argument('--calibration', default='calibration_config.json')
+    args = parser.parse_args(argv)
+
+    from batch_ocr import find_tesseract
+    from ocr_engine import OCR_CONFIG
+    from parser_templates import TEMPLATES_FILE
+
+    settings = {}
+    if os.path.exists(args.calibration):
+        with open(args.calibration, 'r') as f:
+            settings = json.load(f)
+    bbox, entry = find_region(settings, args.region)
+
+    sample_paths = list(args.samples)
+    if args.capture:
+        if len(bbox) != 4:
+            print('No calibrated region to capture', file=sys.stderr)
+            return 1
+        sample_paths += capture_samples(bbox, args.capture, args.interval)
+    if not sample_paths:
+        print('No samples - pass screenshots or use --capture N', file=sys.stderr)
+        return 1
+
+    tesseract_path = args.tesseract or find_tesseract(settings.get('tesseract'))
+    template_name = entry.get('parser', settings.get('parser_template', 'vehicle'))
+    templates_path = os.path.join(os.path.dirname(args.calibration), TEMPLATES_FILE)
+
+    # The current configuration proposes the output to confirm and is the reference to beat
+    path_settings = pipeline_settings(settings, args.region)
+    load_state(tesseract_path, sample_paths, template_name, templates_path, path_settings)
+    current = {'ocr_config': entry.get('ocr_config') or settings.get('ocr_config') or OCR_CONFIG,
+               'preprocess': entry.get('preprocess') or {}}
+    try:
+        expected = confirm_expected(sample_paths, evaluate(current, [{}] * len(sample_paths)), args.yes)
+    except ValueError as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+    reference = evaluate(current, expected)
+
+    candidate_list = candidates(psms=args.psm, oems=args.oem or OEMS)
+    print(f"Tuning {len(candidate_list)} combinations on {len(sample_paths)} samples with {args.workers} workers")
+    scored = tune(candidate_list, sample_paths, expected, max(1, args.workers), tesseract_path,
+                  template_name, templates_path, path_settings)
+
+    qualifying = sorted((item for item in scored if item[1]['accuracy'] >= args.min_accuracy),
+                        key=lambda item: item[1]['latency_ms'])
+    if not qualifying:
+        best = max(scored, key=lambda item: item[1]['accuracy'])
+        print(f"No combination reached {args.min_accuracy * 100:.0f}% (best {best[1]['accuracy'] * 100:.1f}%: "
+              f"{describe(best[0])})")
+        return 1
+
+    # Re-time the fastest ones alone - parallel timings include contention between workers
+    finalists = [(candidate, evaluate(candidate, expected)) for candidate, _ in qualifying[:max(1, args.finalists)]]
+    finalists = [item for item in finalists if item[1]['accuracy'] >= args.min_accuracy] or qualifying[:1]
+    best, result = min(finalists, key=lambda item: item[1]['latency_ms'])
+
+    print(f"\n{'config':<60}{'fields':>9}{'median':>10}")
+    print(f"{'current: ' + describe(current):<60}{reference['accuracy'] * 100:>8.1f}%{reference['latency_ms']:>8.1f}ms")
+    for candidate, finalist in finalists:
+        print(f"{describe(candidate):<60}{finalist['accuracy'] * 100:>8.1f}%{finalist['latency_ms']:>8.1f}ms")
+    print(f"\nBest: {describe(best)}")
+
+    if args.dry_run:
+        return 0
+    entry['ocr_config'] = best['ocr_config']
+    entry['preprocess'] = best['preprocess']
+    entry['autotune'] = {'accuracy': round(result['accuracy'], 4), 'latency_ms': round(result['latency_ms'], 2),
+                         'samples': len(sample_paths), 'per_field_ocr': path_settings['per_field_ocr'],
+                         'confidence': path_settings['confidence'] is not None
+                                       and path_settings['confidence'].get('enabled', True),
+                         'tuned_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+    with open(args.calibration, 'w') as f:
+        json.dump(settings, f)
+    print(f"Saved to {args.calibration} ({args.region})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
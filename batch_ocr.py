@@ -0,0 +1,197 @@
+"""Headless batch mode: OCR a directory or glob of screenshots to JSONL
+
+Usage:
+    python batch_ocr.py SCREENSHOTS... [--output results.jsonl] [--workers N]
+    python main.py batch SCREENSHOTS... [...]
+
+Every input is a region screenshot like the hotkey captures. Each one goes
+through the same grab-free pipeline as the GUI (preprocessing -> OCR ->
+parser template -> format_output) in a pool of worker processes, one
+OCR engine per process. Results are written one JSON object per line in
+input order as soon as the head of the queue is done, and no more than
+--max-pending images are in flight at once so memory stays flat however
+large the input is.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp')
+
+# Set in each worker process by init_worker
+_pipeline = None
+
+
+def expand_inputs(inputs):
+    """Image paths for a list of files, directories and glob patterns, in a stable order"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            names = sorted(os.listdir(item))
+            paths.extend(os.path.join(item, name) for name in names if name.lower().endswith(IMAGE_EXTENSIONS))
+        elif os.path.exists(item):
+            paths.append(item)
+        else:
+            matches = sorted(glob.glob(item, recursive=True))
+            paths.extend(path for path in matches if path.lower().endswith(IMAGE_EXTENSIONS))
+    return paths
+
+
+def find_tesseract(discovery_cache=None):
+    """Tesseract binary the GUI would use, or None"""
+    from tesseract_manager import TesseractManager
+
+    manager = TesseractManager(discovery_cache)
+    if manager.check_tesseract_installed():
+        return manager.get_tesseract_path()
+    return None
+
+
+def read_calibration(path):
+    """Settings saved by the GUI in a calibration file, {} if it is missing or unreadable"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f'Error loading {path}: {e}', file=sys.stderr)
+        return {}
+
+
+def load_template(template_name='vehicle', templates_path=None, correction_settings=None):
+    """Compiled parser template with the dictionary correctors of correction_settings attached"""
+    from parser_templates import load_templates, get_template
+
+    template = get_template(load_templates(templates_path), template_name)
+    if correction_settings and correction_settings.get('fields'):
+        from fuzzy_dictionary import load_correctors
+        for field, corrector in load_correctors(correction_settings).items():
+            template.add_corrector(field, corrector)
+    return template
+
+
+def init_worker(tesseract_path, ocr_config, preprocess_settings, template_name='vehicle', templates_path=None,
+                confidence_settings=None, correction_settings=None):
+    """Create this process's OCR engine and pipeline"""
+    global _pipeline
+    from ocr_engine import create_ocr_engine
+    from ocr_pipeline import OCRPipeline
+    from preprocessing import ImagePreprocessor
+
+    # The JSONL may be going to stdout - keep engine and parser logging out of it
+    sys.stdout = sys.stderr
+    template = load_template(template_name, templates_path, correction_settings)
+    engine = create_ocr_engine(tesseract_path, warm_up_config=ocr_config)
+    _pipeline = OCRPipeline(lambda: engine, ocr_config=ocr_config,
+                            preprocessor=ImagePreprocessor(preprocess_settings),
+                            parse=template.parse, format_output=template.format_output,
+                            confidence=confidence_settings, match_label=template.match_label)
+
+
+def process_file(path):
+    """OCR and parse one screenshot in a worker process"""
+    from PIL import Image
+
+    start = time.perf_counter()
+    try:
+        with Image.open(path) as image:
+            result = _pipeline.process(image.convert('RGB'))
+        return {'path': path, 'parsed': result['parsed'], 'formatted': result['formatted'],
+                'confidence': result['confidence'], 'retried': result['retried'],
+                'text': result['text'], 'timings': result['timings']}
+    except Exception as e:
+        return {'path': path, 'error': str(e), 'timings': {'total': (time.perf_counter() - start) * 1000}}
+
+
+def run_batch(paths, output, workers, max_pending, tesseract_path, ocr_config, preprocess_settings,
+              template_name='vehicle', templates_path=None, confidence_settings=None, correction_settings=None):
+    """Process paths across the pool and write results to output in input order
+
+    Returns (processed, failed).
+    """
+    # Each worker is one OCR stream; stop Tesseract from spawning its own threads on top
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+    processed = failed = 0
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(tesseract_path, ocr_config, preprocess_settings,
+                                       template_name, templates_path, confidence_settings,
+                                       correction_settings)) as pool:
+        def write_oldest():
+            nonlocal processed, failed
+            result = pending.popleft().result()
+            output.write(json.dumps(result) + '\n')
+            processed += 1
+            failed += 'error' in result
+
+        for path in paths:
+            # Backpressure - wait for the head of the queue before submitting more
+            while len(pending) >= max_pending:
+                write_oldest()
+            pending.append(pool.submit(process_file, path))
+
+        while pending:
+            write_oldest()
+    output.flush()
+    return processed, failed
+
+
+def main(argv=None):
+    from ocr_engine import OCR_CONFIG
+
+    parser = argparse.ArgumentParser(prog='batch', description=__doc__.splitlines()[0])
+    parser.add_argument('inputs', nargs='+', help='Screenshot files, directories or glob patterns')
+    parser.add_argument('--output', '-o', default='-', help='JSONL output file (default: stdout)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help='Images in flight at once (default: 4 per worker)')
+    parser.add_argument('--tesseract', help='Path to the tesseract binary (default: auto-detect)')
+    parser.add_argument('--config', help='Tesseract config string (default: the tuned one in the calibration file)')
+    parser.add_argument('--calibration', default='calibration_config.json',
+                        help="Take preprocessing settings from this calibration file")
+    parser.add_argument('--template', help='Parser template name (default: the one in the calibration file)')
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        print('No screenshots found', file=sys.stderr)
+        return 1
+
+    calibration = read_calibration(args.calibration)
+    preprocess_settings = calibration.get('preprocess') or {}
+    ocr_config = args.config or calibration.get('ocr_config') or OCR_CONFIG
+    template_name = args.template or calibration.get('parser_template', 'vehicle')
+    # Templates live alongside the calibration file
+    from parser_templates import TEMPLATES_FILE
+    templates_path = os.path.join(os.path.dirname(args.calibration), TEMPLATES_FILE)
+
+    tesseract_path = args.tesseract or find_tesseract(calibration.get('tesseract'))
+    workers = max(1, args.workers)
+    max_pending = args.max_pending or workers * 4
+
+    print(f'Processing {len(paths)} screenshots with {workers} workers', file=sys.stderr)
+    start = time.perf_counter()
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        processed, failed = run_batch(paths, output, workers, max_pending, tesseract_path,
+                                      ocr_config, preprocess_settings, template_name, templates_path,
+                                      calibration.get('confidence', {}), calibration.get('correction'))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - start
+
+    print(f'Done: {processed} screenshots, {failed} failed, {elapsed:.1f} s '
+          f'({processed / elapsed if elapsed else 0.0:.1f} img/s)', file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,340 @@
+"""OCR regression harness: runs the capture pipeline (minus the screen grab) over a saved corpus
+
+Usage:
+    python benchmarks/ocr_regression.py run [--configs FILE] [--only NAME ...] [--check] [--update-baseline]
+    python benchmarks/ocr_regression.py add SCREENSHOT [--expected FILE]
+    python benchmarks/ocr_regression.py synthesize
+
+The corpus lives in benchmarks/corpus: manifest.json lists region screenshots
+and the format_output text each one must produce. 'add' copies a screenshot
+into the corpus and records the current pipeline output as its expected text,
+which should be checked by hand before committing. 'synthesize' renders the
+SYNTHETIC_PANELS below into the corpus as a baseline set of cases whose
+expected text is known exactly; real screenshots should be added next to
+them.
+
+'run' reports throughput, latency percentiles and field accuracy for every
+OCR configuration in configs.json. With --check it exits non-zero when a
+configuration's p95 latency or accuracy regresses past the thresholds
+against baseline.json, when a configuration has no baseline yet, or when a
+configuration could not run at all.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from ocr_engine import OCR_WHITELIST, create_named_engine
+from vehicle_parser import format_output, parse_vehicle_data
+from ocr_pipeline import OCRPipeline
+from preprocessing import ImagePreprocessor
+from latency_stats import percentile
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+MANIFEST = os.path.join(CORPUS_DIR, "manifest.json")
+CONFIGS = os.path.join(CORPUS_DIR, "configs.json")
+BASELINE = os.path.join(CORPUS_DIR, "baseline.json")
+
+# Vehicle panels rendered by 'synthesize': field values, colours and the
+# owner wrapped onto a second line, covering the layouts seen in game
+SYNTHETIC_PANELS = [
+    {"Name": "Karin", "Model": "Sultan RS", "Plate": "46EEK572", "Owner": "Jane Doe"},
+    {"Name": "Pegassi", "Model": "Zentorno", "Plate": "12ABC345", "Owner": "Marcus Whitfield"},
+    {"Name": "Grotti", "Model": "Turismo R", "Plate": "88TUR001", "Owner": "Lena Park", "theme": "light"},
+    {"Name": "Vapid", "Model": "Dominator GTX", "Plate": "07VAP777", "Owner": "Tom Riley", "wrap_owner": True},
+    {"Name": "Bravado", "Model": "Banshee 900R", "Plate": "31BNS900", "Owner": "Alice McKenzie"},
+    {"Name": "Obey", "Model": "9F Cabrio", "Plate": "55OBY009", "Owner": "Sam Cole", "theme": "light"},
+    {"Name": "Benefactor", "Model": "Schafter V12", "Plate": "20BEN412", "Owner": "Priya Natarajan"},
+    {"Name": "Dewbauchee", "Model": "Massacro", "Plate": "63DEW808", "Owner": "Oscar Lindqvist",
+     "wrap_owner": True},
+]
+THEMES = {"dark": ((24, 26, 32), (235, 235, 235)), "light": ((236, 236, 230), (20, 20, 20))}
+
+
+def load_json(path, default=None):
+    """Load a JSON file, or return default if it does not exist"""
+    if not os.path.exists(path):
+        return default
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_json(path, data):
+    """Write data as indented JSON"""
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def build_ocr_config(config):
+    """Tesseract config string for a harness configuration"""
+    parts = [f"--psm {config.get('psm', 6)}"]
+    if config.get("oem") is not None:
+        parts.append(f"--oem {config['oem']}")
+    whitelist = config.get("whitelist", True)
+    if whitelist:
+        parts.append(f"-c tessedit_char_whitelist={OCR_WHITELIST if whitelist is True else whitelist}")
+    return " ".join(parts)
+
+
+def output_fields(formatted):
+    """Split format_output text into its value lines, ignoring the code fences"""
+    return [line for line in formatted.strip().splitlines() if not line.startswith("```")]
+
+
+def score(expected, actual):
+    """(matching field lines, total field lines) between two format_output texts"""
+    expected_lines = output_fields(expected)
+    actual_lines = output_fields(actual)
+    matches = sum(1 for i, line in enumerate(expected_lines) if i < len(actual_lines) and actual_lines[i] == line)
+    return matches, len(expected_lines)
+
+
+def run_config(config, cases, tesseract_cmd, rounds):
+    """Run one configuration over the corpus and return its report
+
+    "confidence" in a configuration enables the re-OCR of low-confidence
+    fields: true for the app's defaults, or a dict of field_confidence
+    settings.
+    """
+    engine = create_named_engine(config.get("engine", "libtesseract"), tesseract_cmd)
+    field_executor = ThreadPoolExecutor(max_workers=4) if config.get("per_field_ocr") or config.get("confidence") else None
+    confidence = config.get("confidence")
+    pipeline = OCRPipeline(
+        lambda: engine,
+        ocr_config=build_ocr_config(config),
+        preprocessor=ImagePreprocessor(config.get("preprocess")),
+        per_field_ocr=config.get("per_field_ocr", False),
+        field_executor=field_executor,
+        confidence=(confidence if isinstance(confidence, dict) else {}) if confidence else None,
+    )
+
+    images = [Image.open(os.path.join(CORPUS_DIR, case["image"])).convert("RGB") for case in cases]
+
+    # Warm up the engine (and learn the field layout) outside the timed runs
+    pipeline.process(images[0])
+
+    latencies = []
+    matches = total = exact = 0
+    failures = []
+    start = time.perf_counter()
+    for round_index in range(rounds):
+        for case, image in zip(cases, images):
+            case_start = time.perf_counter()
+            result = pipeline.process(image)
+            latencies.append((time.perf_counter() - case_start) * 1000)
+            if round_index == 0:
+                case_matches, case_total = score(case["expected"], result["formatted"])
+                matches += case_matches
+                total += case_total
+                if case_matches == case_total:
+                    exact += 1
+                else:
+                    failures.append((case["image"], result["formatted"]))
+    elapsed = time.perf_counter() - start
+
+    engine.close()
+    if field_executor:
+        field_executor.shutdown()
+
+    latencies.sort()
+    return {
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "accuracy": matches / total if total else 1.0,
+        "exact": exact,
+        "cases": len(cases),
+        "failures": failures,
+    }
+
+
+def command_run(args):
+    """Benchmark every configuration and optionally compare against the baseline"""
+    manifest = load_json(MANIFEST, {"cases": []})
+    cases = manifest["cases"]
+    if not cases:
+        print("Corpus is empty - add screenshots with: python benchmarks/ocr_regression.py add SCREENSHOT")
+        return 1
+
+    configs = load_json(args.configs, [])
+    if args.only:
+        configs = [config for config in configs if config["name"] in args.only]
+
+    baseline = load_json(BASELINE, {})
+    reports = {}
+    regressions = []
+    skipped = []
+
+    print(f"Corpus v{manifest.get('version', 1)}: {len(cases)} screenshots, {args.rounds} rounds\n")
+    print(f"{'config':<24}{'img/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'fields':>9}{'exact':>8}")
+    for config in configs:
+        try:
+            report = run_config(config, cases, args.tesseract, args.rounds)
+        except Exception as e:
+            print(f"{config['name']:<24} skipped: {e}")
+            skipped.append(config["name"])
+            continue
+        reports[config["name"]] = report
+        print(f"{config['name']:<24}{report['throughput']:>8.1f}{report['p50_ms']:>9.1f}{report['p95_ms']:>9.1f}"
+              f"{report['p99_ms']:>9.1f}{report['accuracy'] * 100:>8.1f}%{report['exact']:>5}/{report['cases']}")
+
+        if args.verbose:
+            for image, formatted in report["failures"]:
+                print(f"    mismatch {image}: {output_fields(formatted)}")
+
+        reference = baseline.get(config["name"])
+        if not reference and not args.update_baseline:
+            regressions.append(f"{config['name']}: no baseline - record one with --update-baseline")
+        if reference:
+            if report["p95_ms"] > reference["p95_ms"] * (1 + args.max_latency_regression):
+                regressions.append(f"{config['name']}: p95 {report['p95_ms']:.1f} ms vs baseline {reference['p95_ms']:.1f} ms")
+            if report["accuracy"] < reference["accuracy"] - args.max_accuracy_drop:
+                regressions.append(f"{config['name']}: accuracy {report['accuracy']:.3f} vs baseline {reference['accuracy']:.3f}")
+
+    if args.update_baseline:
+        for name, report in reports.items():
+            baseline[name] = {"p95_ms": round(report["p95_ms"], 2), "accuracy": round(report["accuracy"], 4)}
+        save_json(BASELINE, baseline)
+        print(f"\nBaseline updated: {BASELINE}")
+
+    if skipped:
+        regressions.append(f"could not run: {', '.join(skipped)}")
+    if not reports:
+        regressions.append("no configuration ran")
+
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        if args.check:
+            return 1
+    return 0
+
+
+def command_add(args):
+    """Copy a screenshot into the corpus with its expected output"""
+    manifest = load_json(MANIFEST, {"version": 1, "cases": []})
+    name = os.path.basename(args.screenshot)
+    destination = os.path.join(CORPUS_DIR, name)
+    if os.path.exists(destination):
+        print(f"{name} is already in the corpus")
+        return 1
+
+    if args.expected:
+        with open(args.expected, "r") as f:
+            expected = f.read()
+    else:
+        engine = create_named_engine("stdin", args.tesseract)
+        pipeline = OCRPipeline(lambda: engine)
+        expected = pipeline.process(Image.open(args.screenshot).convert("RGB"))["formatted"]
+        print("Recorded current output as expected - check it before committing:")
+        print(expected)
+
+    shutil.copyfile(args.screenshot, destination)
+    manifest["cases"].append({"image": name, "expected": expected})
+    manifest["version"] = manifest.get("version", 1) + 1
+    save_json(MANIFEST, manifest)
+    print(f"Added {name} (corpus v{manifest['version']})")
+    return 0
+
+
+def load_font(size):
+    """A TrueType font for rendering panels, or PIL's built-in bitmap font"""
+    from PIL import ImageFont
+
+    for name in ("arial.ttf", "DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def panel_lines(panel):
+    """Text lines of a synthetic panel, top to bottom"""
+    lines = [f"Name: {panel['Name']}", f"Model: {panel['Model']}", f"Plate: {panel['Plate']}"]
+    if panel.get("wrap_owner"):
+        first, _, rest = panel["Owner"].partition(" ")
+        return lines + [f"Owner: {first}", rest]
+    return lines + [f"Owner: {panel['Owner']}"]
+
+
+def render_panel(panel, font, width=360, line_height=30, padding=12):
+    """Draw a vehicle info panel as the game shows it"""
+    from PIL import ImageDraw
+
+    lines = panel_lines(panel)
+    background, foreground = THEMES[panel.get("theme", "dark")]
+    image = Image.new("RGB", (width, padding * 2 + line_height * len(lines)), background)
+    draw = ImageDraw.Draw(image)
+    for index, line in enumerate(lines):
+        draw.text((padding, padding + index * line_height), line, font=font, fill=foreground)
+    return image
+
+
+def command_synthesize(args):
+    """Render SYNTHETIC_PANELS into the corpus with their exact expected output"""
+    manifest = load_json(MANIFEST, {"version": 1, "cases": []})
+    known = {case["image"] for case in manifest["cases"]}
+    font = load_font(args.font_size)
+    added = 0
+    for index, panel in enumerate(SYNTHETIC_PANELS):
+        name = f"synthetic_{index:02d}.png"
+        render_panel(panel, font).save(os.path.join(CORPUS_DIR, name))
+        if name not in known:
+            # What the app outputs for a perfect read of the panel
+            expected = format_output(parse_vehicle_data("\n".join(panel_lines(panel))))
+            manifest["cases"].append({"image": name, "expected": expected})
+            added += 1
+    if added:
+        manifest["version"] = manifest.get("version", 1) + 1
+        save_json(MANIFEST, manifest)
+    print(f"Rendered {len(SYNTHETIC_PANELS)} panels, {added} new (corpus v{manifest['version']})")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tesseract", default="tesseract", help="Path to the tesseract binary")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="Benchmark the corpus")
+    run_parser.add_argument("--configs", default=CONFIGS)
+    run_parser.add_argument("--only", nargs="*", help="Only run these configuration names")
+    run_parser.add_argument("--rounds", type=int, default=3)
+    run_parser.add_argument("--check", action="store_true", help="Exit 1 on regressions against the baseline")
+    run_parser.add_argument("--update-baseline", action="store_true")
+    run_parser.add_argument("--max-latency-regression", type=float, default=0.25,
+                            help="Allowed p95 increase as a fraction of the baseline")
+    run_parser.add_argument("--max-accuracy-drop", type=float, default=0.0,
+                            help="Allowed drop in field accuracy (0-1)")
+    run_parser.add_argument("--verbose", action="store_true")
+
+    add_parser = subparsers.add_parser("add", help="Add a screenshot to the corpus")
+    add_parser.add_argument("screenshot")
+    add_parser.add_argument("--expected", help="File holding the expected format_output text")
+
+    synthesize_parser = subparsers.add_parser("synthesize", help="Render the synthetic panels into the corpus")
+    synthesize_parser.add_argument("--font-size", type=int, default=20)
+
+    args = parser.parse_args()
+    if args.command == "add":
+        return command_add(args)
+    if args.command == "synthesize":
+        return command_synthesize(args)
+    if args.command is None:
+        args = parser.parse_args(sys.argv[1:] + ["run"])
+    return command_run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
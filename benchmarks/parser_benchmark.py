@@ -0,0 +1,105 @@
+"""Micro-benchmark and accuracy check for parse_vehicle_data on a corpus of raw OCR strings
+
+Usage:
+    python benchmarks/parser_benchmark.py [corpus.json] [--runs N]
+
+The corpus is a JSON list of {"text": raw OCR output, "expected": {field: value}}.
+The original two-pass parser is kept here as the baseline.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vehicle_parser import parse_vehicle_data
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parser_corpus.json")
+
+
+def legacy_parse_vehicle_data(text):
+    """The parser main.py used before the single-pass rewrite, debug prints included"""
+    data = {'Name': '', 'Model': '', 'Plate': '', 'Owner': ''}
+    text = text.strip()
+    print(f"Raw OCR text: '{text}'")
+    import re
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    print(f"OCR lines: {lines}")
+    field_labels = ['name', 'model', 'plate', 'owner']
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if ':' in line:
+            field_name, field_value = line.split(':', 1)
+            field_name = field_name.strip().lower()
+            field_value = field_value.strip()
+            if field_name in field_labels:
+                full_value = field_value
+                j = i + 1
+                while j < len(lines):
+                    next_line = lines[j]
+                    if ':' in next_line:
+                        next_field = next_line.split(':', 1)[0].strip().lower()
+                        if next_field in field_labels:
+                            break
+                    if full_value:
+                        full_value += ' ' + next_line
+                    else:
+                        full_value = next_line
+                    j += 1
+                if field_name in ('model', 'owner') and re.search(r'[a-z][A-Z]', full_value):
+                    full_value = re.sub(r'([a-z])([A-Z])', r'\1 \2', full_value)
+                data[field_name.capitalize()] = full_value
+                print(f"Parsed {field_name}: '{full_value}'")
+                i = j - 1
+        i += 1
+    if not any(data.values()):
+        for line in lines:
+            line_lower = line.lower()
+            for field in ('name', 'model', 'plate', 'owner'):
+                if field in line_lower and ':' in line:
+                    data[field.capitalize()] = line.split(':', 1)[1].strip()
+                    break
+    return data
+
+
+def run(label, parse, corpus, runs):
+    """Time parse over the corpus and count fields that match the expected values"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(runs):
+            for case in corpus:
+                parse(case["text"])
+        elapsed = time.perf_counter() - start
+
+        correct = total = 0
+        for case in corpus:
+            result = parse(case["text"])
+            for field, expected in case["expected"].items():
+                total += 1
+                correct += result.get(field, '') == expected
+
+    per_call_us = elapsed / (runs * len(corpus)) * 1e6
+    print(f"{label:<10} {per_call_us:8.2f} us/parse   field accuracy {correct}/{total} ({100 * correct / total:.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpus", nargs="?", default=DEFAULT_CORPUS)
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(args.corpus, "r") as f:
+        corpus = json.load(f)
+
+    print(f"{len(corpus)} OCR strings x {args.runs} runs\n")
+    run("legacy", legacy_parse_vehicle_data, corpus, args.runs)
+    run("compiled", parse_vehicle_data, corpus, args.runs)
+
+
+if __name__ == "__main__":
+    main()
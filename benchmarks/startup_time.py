@@ -0,0 +1,121 @@
+"""Startup benchmark: time-to-window and time-to-first-capture of the GUI
+
+Usage:
+    python benchmarks/startup_time.py [--runs N] [--exe dist/AutoParse/AutoParse.exe] [--budget-ms 800]
+    python benchmarks/startup_time.py --imports [--top 20]
+
+Launches the app with AUTOPARSE_STARTUP_PROBE=1, which makes main.py print
+a marker when the window is up, when the OCR engine is loaded and when one
+capture of the calibrated region has completed, then exit. Times are taken
+when each marker arrives, measured from process launch. Without a
+calibrated region (or Tesseract) the capture is reported as skipped.
+
+--imports lists the slowest modules imported by 'import main' using
+python -X importtime, to see what still loads before the window.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MILESTONES = ("window", "engine_ready", "first_capture")
+
+
+def launch_once(command, timeout):
+    """Start the app once and return {milestone: ms since launch}"""
+    env = dict(os.environ, AUTOPARSE_STARTUP_PROBE="1", PYTHONUNBUFFERED="1")
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, text=True)
+    times = {}
+    try:
+        for line in process.stdout:
+            if not line.startswith("STARTUP "):
+                continue
+            parts = line.split()
+            times[parts[1]] = (time.perf_counter() - start) * 1000
+            if parts[1] == "first_capture":
+                if len(parts) > 2 and parts[2] != "ok":
+                    times["first_capture_status"] = parts[2]
+                break
+            if time.perf_counter() - start > timeout:
+                break
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        pass
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+    return times
+
+
+def import_times(top):
+    """(cumulative ms, module) of the slowest imports under 'import main'"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=ROOT, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative) / 1000, name.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--exe", help="Frozen executable to launch instead of python main.py")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--budget-ms", type=float, help="Exit 1 if the median time-to-window exceeds this")
+    parser.add_argument("--imports", action="store_true", help="Show the slowest imports of main.py instead")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.imports:
+        for milliseconds, name in import_times(args.top):
+            print(f"{milliseconds:9.1f} ms  {name}")
+        return 0
+
+    command = [args.exe] if args.exe else [sys.executable, os.path.join(ROOT, "main.py")]
+    print(f"Launching {' '.join(command)} x {args.runs}\n")
+
+    samples = {milestone: [] for milestone in MILESTONES}
+    skipped = 0
+    for run in range(args.runs):
+        times = launch_once(command, args.timeout)
+        if "first_capture_status" in times:
+            skipped += 1
+            times.pop("first_capture")
+        for milestone in MILESTONES:
+            if milestone in times:
+                samples[milestone].append(times[milestone])
+        print(f"run {run + 1}: " + "  ".join(f"{milestone} {times[milestone]:.0f} ms"
+                                             for milestone in MILESTONES if milestone in times))
+
+    print(f"\n{'milestone':<16}{'median':>10}{'min':>10}{'max':>10}")
+    for milestone in MILESTONES:
+        values = samples[milestone]
+        if values:
+            print(f"{milestone:<16}{statistics.median(values):>10.0f}{min(values):>10.0f}{max(values):>10.0f}")
+        else:
+            print(f"{milestone:<16}{'-':>10}")
+    if skipped:
+        print(f"\nfirst_capture skipped in {skipped} runs (no calibrated region or Tesseract)")
+
+    if args.budget_ms and samples["window"]:
+        median = statistics.median(samples["window"])
+        if median > args.budget_ms:
+            print(f"\nTime-to-window {median:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
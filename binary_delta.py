@@ -0,0 +1,124 @@
+"""Binary deltas between two builds of the executable
+
+A delta is an LZMA-compressed list of operations that rebuild the new file
+from the old one: COPY a range of the old file, or INSERT literal bytes.
+Matching works like rsync: the old file is indexed in fixed-size blocks and
+the new file is scanned for them at every offset. Matched runs are then
+extended byte by byte, so content that only moved still matches. For two
+PyInstaller builds that differ in a few modules the delta is a small
+fraction of the full executable.
+
+Usage:
+    python binary_delta.py make OLD NEW DELTA
+    python binary_delta.py apply OLD DELTA NEW
+"""
+import hashlib
+import lzma
+import struct
+import sys
+
+MAGIC = b"APDL1"
+BLOCK_SIZE = 64
+OP_COPY = 1
+OP_INSERT = 2
+COPY_OP = struct.Struct("<BQQ")
+INSERT_OP = struct.Struct("<BQ")
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Hex SHA-256 of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_delta(old, new, block_size=BLOCK_SIZE):
+    """Delta bytes that turn old into new"""
+    # First occurrence of every aligned block of the old file
+    index = {}
+    for offset in range(0, len(old) - block_size + 1, block_size):
+        index.setdefault(old[offset:offset + block_size], offset)
+
+    ops = []
+    literal_start = 0
+    position = 0
+    limit = len(new) - block_size + 1
+    while position < limit:
+        old_offset = index.get(new[position:position + block_size])
+        if old_offset is None:
+            position += 1
+            continue
+
+        # Extend the match forwards a block at a time, then byte by byte
+        length = block_size
+        while (position + length + block_size <= len(new) and old_offset + length + block_size <= len(old)
+               and new[position + length:position + length + block_size]
+               == old[old_offset + length:old_offset + length + block_size]):
+            length += block_size
+        while (position + length < len(new) and old_offset + length < len(old)
+               and new[position + length] == old[old_offset + length]):
+            length += 1
+        # ... and backwards into the pending literal bytes
+        while (position > literal_start and old_offset > 0
+               and new[position - 1] == old[old_offset - 1]):
+            position -= 1
+            old_offset -= 1
+            length += 1
+
+        if position > literal_start:
+            ops.append(INSERT_OP.pack(OP_INSERT, position - literal_start) + new[literal_start:position])
+        ops.append(COPY_OP.pack(OP_COPY, old_offset, length))
+        position += length
+        literal_start = position
+
+    if literal_start < len(new):
+        ops.append(INSERT_OP.pack(OP_INSERT, len(new) - literal_start) + new[literal_start:])
+
+    return MAGIC + lzma.compress(b"".join(ops), preset=9)
+
+
+def apply_delta(old, delta):
+    """Rebuild the new file from old and a delta made by make_delta"""
+    if not delta.startswith(MAGIC):
+        raise ValueError("Not a delta file")
+    ops = lzma.decompress(delta[len(MAGIC):])
+    output = bytearray()
+    position = 0
+    while position < len(ops):
+        op = ops[position]
+        if op == OP_COPY:
+            _, offset, length = COPY_OP.unpack_from(ops, position)
+            if offset + length > len(old):
+                raise ValueError("Delta does not match the old file")
+            output += old[offset:offset + length]
+            position += COPY_OP.size
+        elif op == OP_INSERT:
+            _, length = INSERT_OP.unpack_from(ops, position)
+            position += INSERT_OP.size
+            output += ops[position:position + length]
+            position += length
+        else:
+            raise ValueError(f"Unknown delta operation {op}")
+    return bytes(output)
+
+
+def main():
+    if len(sys.argv) != 5 or sys.argv[1] not in ("make", "apply"):
+        print(__doc__)
+        return 1
+    command, first, second, output = sys.argv[1:]
+    with open(first, "rb") as f:
+        old = f.read()
+    with open(second, "rb") as f:
+        data = f.read()
+    result = make_delta(old, data) if command == "make" else apply_delta(old, data)
+    with open(output, "wb") as f:
+        f.write(result)
+    print(f"{output}: {len(result)} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -40,6 +40,15 @@ pip install -r requirements.txt
 echo Installing PyInstaller...
 pip install pyinstaller
 
+:: The exe only installs Tesseract automatically with a pinned installer digest
+echo Pinning the Tesseract installer digest...
+python tesseract_manager.py pin-installer
+if errorlevel 1 (
+    echo ERROR: Could not pin the Tesseract installer digest
+    pause
+    exit /b 1
+)
+
 :: Clean previous builds
 if exist "dist" rmdir /s /q dist
 if exist "build" rmdir /s /q build
@@ -55,19 +64,13 @@ pyinstaller ^
     --name "AutoParse" ^
     --icon=icon.ico ^
     --add-data "tesseract_manager.py;." ^
-    --hidden-import=PIL ^
-    --hidden-import=PIL.Image ^
-    --hidden-import=PIL.ImageTk ^
-    --hidden-import=PIL.ImageGrab ^
-    --hidden-import=pytesseract ^
-    --hidden-import=pyautogui ^
+    --add-data "version_config.json;." ^
     --hidden-import=keyboard ^
     --hidden-import=pyperclip ^
     --hidden-import=tkinter ^
     --hidden-import=tkinter.messagebox ^
     --hidden-import=tkinter.ttk ^
-    --collect-all=PIL ^
-    --collect-all=pytesseract ^
+    --exclude-module=pyautogui ^
     main.py
 
 if errorlevel 1 (
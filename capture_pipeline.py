@@ -0,0 +1,95 @@
+import queue
+import threading
+
+
+class CaptureExecutor:
+    """Run capture jobs on worker threads so the hotkey hook never blocks
+
+    Jobs are identified by a key. Submitting a key that is already waiting
+    in the queue is a no-op, and submitting a key whose job is currently
+    running schedules a single follow-up run once it finishes, so a burst
+    of presses collapses into at most one extra job. The queue is bounded;
+    when it is full new jobs are dropped rather than piling up.
+
+    Results are handed to ``deliver(callback, result, error)``, which is
+    expected to move the callback onto the UI thread (e.g. with
+    ``root.after``).
+    """
+
+    def __init__(self, deliver, workers=2, max_pending=4):
+        self._deliver = deliver
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._running = set()
+        self._rerun = {}
+        self._threads = []
+        self.submitted = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"capture-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, key, job, callback=None):
+        """Queue job under key, returns False if it was coalesced or dropped"""
+        with self._lock:
+            if key in self._pending:
+                self.coalesced += 1
+                return False
+            if key in self._running:
+                if key in self._rerun:
+                    self.coalesced += 1
+                self._rerun[key] = (job, callback)
+                return False
+            try:
+                self._queue.put_nowait((key, job, callback))
+            except queue.Full:
+                self.dropped += 1
+                return False
+            self._pending.add(key)
+            self.submitted += 1
+            return True
+
+    def is_busy(self, key):
+        """Check if a job for key is queued or running"""
+        with self._lock:
+            return key in self._pending or key in self._running
+
+    def _worker(self):
+        """Worker loop, runs jobs until a shutdown sentinel arrives"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            key, job, callback = item
+            with self._lock:
+                self._pending.discard(key)
+                self._running.add(key)
+
+            result = None
+            error = None
+            try:
+                result = job()
+            except Exception as e:
+                error = e
+
+            if callback:
+                try:
+                    self._deliver(callback, result, error)
+                except Exception as e:
+                    print(f"Failed to deliver capture result: {e}")
+
+            with self._lock:
+                self._running.discard(key)
+                rerun = self._rerun.pop(key, None)
+            if rerun:
+                self.submit(key, *rerun)
+
+    def shutdown(self):
+        """Stop the worker threads once the queued jobs are done"""
+        for _ in self._threads:
+            self._queue.put(None)
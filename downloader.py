@@ -0,0 +1,266 @@
+"""Resumable, segmented, hash-verified HTTP downloads
+
+download_file streams to '<destination>.part' and keeps its progress in
+'<destination>.part.json', so an interrupted download continues where it
+stopped with HTTP Range requests. When the server supports ranges, the
+file can be fetched as several parallel segments, each written in place
+at its own offset. The finished file is checked against a SHA-256 digest
+before it is moved to the destination.
+
+Usage:
+    python downloader.py URL DESTINATION [--sha256 HEX] [--segments N]
+"""
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from binary_delta import file_sha256
+
+CHUNK_SIZE = 256 * 1024
+USER_AGENT = "AutoParse-Downloader"
+
+
+class DownloadError(Exception):
+    """Raised when a download cannot be completed or fails verification"""
+
+
+class DownloadProgress:
+    """Byte counter shared by the download threads
+
+    The callback, if any, is called from download threads - GUI code should
+    poll fraction() from its own event loop instead of touching widgets in
+    the callback.
+    """
+
+    def __init__(self, callback=None):
+        self._lock = threading.Lock()
+        self._callback = callback
+        self.done = 0
+        self.total = 0
+
+    def start(self, done, total):
+        with self._lock:
+            self.done = done
+            self.total = total
+        self._notify()
+
+    def add(self, count):
+        with self._lock:
+            self.done += count
+        self._notify()
+
+    def fraction(self):
+        """Completed fraction between 0 and 1 (0 while the size is unknown)"""
+        with self._lock:
+            return self.done / self.total if self.total else 0.0
+
+    def _notify(self):
+        if self._callback:
+            with self._lock:
+                done, total = self.done, self.total
+            self._callback(done, total)
+
+
+def _request(url, headers=None, method="GET", timeout=30):
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT, **(headers or {})}, method=method)
+    return urllib.request.urlopen(request, timeout=timeout)
+
+
+def probe(url):
+    """(size, supports_ranges) of url, size None if unknown"""
+    try:
+        with _request(url, method="HEAD") as response:
+            size = response.headers.get("Content-Length")
+            ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+            return (int(size) if size else None), ranges
+    except urllib.error.HTTPError as e:
+        if e.code not in (405, 501):
+            raise
+    # HEAD not allowed - ask for the first byte instead
+    with _request(url, headers={"Range": "bytes=0-0"}) as response:
+        if response.status == 206:
+            content_range = response.headers.get("Content-Range", "")
+            total = content_range.rsplit("/", 1)[-1]
+            return (int(total) if total.isdigit() else None), True
+        size = response.headers.get("Content-Length")
+        return (int(size) if size else None), False
+
+
+def _split(size, segments):
+    """[start, end] byte ranges (end exclusive) of roughly equal segments"""
+    step = -(-size // segments)
+    return [[start, min(size, start + step)] for start in range(0, size, step)]
+
+
+class _State:
+    """Per-segment progress persisted next to the partial file"""
+
+    def __init__(self, path, url, size, segments, resume=True):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = None
+        if resume and os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+                if data.get("url") == url and data.get("size") == size:
+                    self.data = data
+            except Exception:
+                pass
+        if self.data is None:
+            # [start, end, bytes done] per segment
+            self.data = {"url": url, "size": size,
+                         "segments": [[start, end, 0] for start, end in _split(size, segments)] if size else []}
+
+    def done(self):
+        with self._lock:
+            return sum(segment[2] for segment in self.data["segments"])
+
+    def advance(self, index, count):
+        with self._lock:
+            self.data["segments"][index][2] += count
+
+    def save(self):
+        """Write the progress atomically - segment threads save concurrently"""
+        with self._lock:
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w") as f:
+                json.dump(self.data, f)
+            os.replace(temp_path, self.path)
+
+
+def _fetch_segment(url, part_path, state, index, progress, retries):
+    """Download one segment into part_path at its offset, resuming after errors"""
+    attempt = 0
+    while True:
+        start, end, done = state.data["segments"][index]
+        if start + done >= end:
+            return
+        try:
+            headers = {"Range": f"bytes={start + done}-{end - 1}"}
+            with _request(url, headers=headers) as response, open(part_path, "r+b") as f:
+                if response.status != 206:
+                    raise DownloadError("Server ignored the Range request")
+                f.seek(start + done)
+                last_save = time.monotonic()
+                while True:
+                    chunk = response.read(min(CHUNK_SIZE, end - start - state.data["segments"][index][2]))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    state.advance(index, len(chunk))
+                    progress.add(len(chunk))
+                    attempt = 0
+                    if time.monotonic() - last_save > 1.0:
+                        f.flush()
+                        state.save()
+                        last_save = time.monotonic()
+                f.flush()
+            state.save()
+            if start + state.data["segments"][index][2] < end:
+                # An empty read before the end of the range - retry with backoff rather than spin
+                raise ConnectionError("Connection closed before the segment was complete")
+        except DownloadError:
+            raise
+        except Exception as e:
+            attempt += 1
+            if attempt > retries:
+                raise DownloadError(f"Segment {index} failed after {retries} retries: {e}")
+            delay = min(30, 2 ** attempt)
+            print(f"Download interrupted ({e}), resuming in {delay} s")
+            time.sleep(delay)
+
+
+def _fetch_stream(url, part_path, progress, retries):
+    """Download without ranges support, restarting from zero on errors"""
+    attempt = 0
+    while True:
+        try:
+            with _request(url) as response, open(part_path, "wb") as f:
+                size = response.headers.get("Content-Length")
+                progress.start(0, int(size) if size else 0)
+                for chunk in iter(lambda: response.read(CHUNK_SIZE), b""):
+                    f.write(chunk)
+                    progress.add(len(chunk))
+            return
+        except Exception as e:
+            attempt += 1
+            if attempt > retries:
+                raise DownloadError(f"Download failed after {retries} retries: {e}")
+            time.sleep(min(30, 2 ** attempt))
+
+
+def download_file(url, destination, sha256=None, segments=4, progress_callback=None, retries=5):
+    """Download url to destination, resuming any earlier partial download
+
+    Returns the SHA-256 of the file. Raises DownloadError if it cannot be
+    downloaded or does not match sha256.
+    """
+    part_path = destination + ".part"
+    state_path = part_path + ".json"
+    progress = DownloadProgress(progress_callback)
+
+    size, ranges = probe(url)
+    if ranges and size:
+        resume = os.path.exists(part_path) and os.path.getsize(part_path) == size
+        state = _State(state_path, url, size, max(1, segments), resume)
+        if not resume:
+            # Fresh download (or the partial file is not ours) - preallocate and start over
+            with open(part_path, "wb") as f:
+                f.truncate(size)
+        resumed = state.done()
+        if resumed:
+            print(f"Resuming download at {resumed / size * 100:.0f}%")
+        progress.start(resumed, size)
+        state.save()
+
+        pending = [index for index, (start, end, done) in enumerate(state.data["segments"]) if start + done < end]
+        if pending:
+            with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="download") as pool:
+                futures = [pool.submit(_fetch_segment, url, part_path, state, index, progress, retries)
+                           for index in pending]
+                for future in futures:
+                    future.result()
+    else:
+        _fetch_stream(url, part_path, progress, retries)
+
+    digest = file_sha256(part_path)
+    if sha256 and digest.lower() != sha256.lower():
+        os.remove(part_path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        raise DownloadError(f"SHA-256 mismatch for {url}: got {digest}")
+
+    os.replace(part_path, destination)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    return digest
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("url")
+    parser.add_argument("destination")
+    parser.add_argument("--sha256")
+    parser.add_argument("--segments", type=int, default=4)
+    args = parser.parse_args()
+
+    def report(done, total):
+        if total:
+            sys.stderr.write(f"\r{done / total * 100:5.1f}% of {total / 1e6:.1f} MB")
+
+    start = time.perf_counter()
+    digest = download_file(args.url, args.destination, args.sha256, args.segments, report)
+    print(f"\n{args.destination}: sha256 {digest} in {time.perf_counter() - start:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
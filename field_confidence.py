@@ -0,0 +1,119 @@
+"""Per-field OCR confidence and selective re-OCR of weak fields
+
+The region is read with image_to_data, so every word comes with a box and
+a confidence. Words are assigned to the field whose label precedes them,
+the same way the parser assigns lines, and a field's confidence is that
+of its weakest word. Only fields below min_confidence are OCR'd again -
+cropped to their own words, upscaled and read with a line-oriented page
+segmentation mode - and the retry is kept when it is more confident. A
+clean panel costs exactly one OCR call.
+"""
+from PIL import Image
+
+from field_layout import group_lines, words_to_text
+from ocr_engine import OCR_CONFIG, single_line_config
+
+DEFAULT_SETTINGS = {
+    'enabled': True,
+    'min_confidence': 60,   # Tesseract word confidence (0-100) below which a field is re-OCR'd
+    'upscale': 2,           # Factor the field crop is enlarged by for the retry
+    'padding': 4,           # Pixels around the field's words included in the crop
+}
+
+
+def split_label(line, match_label):
+    """(field, label text, value words) if a line of words starts with a known label, else None"""
+    for index, word in enumerate(line):
+        if ':' not in word['text']:
+            continue
+        before, _, after = word['text'].partition(':')
+        label = " ".join([w['text'] for w in line[:index]] + [before])
+        field = match_label(label)
+        if field is None:
+            return None
+        value_words = list(line[index + 1:])
+        if after.strip():
+            # "Plate:ABC123" read as one word - keep the value part (box is approximate)
+            value_words.insert(0, dict(word, text=after.strip()))
+        return field, label.strip(), value_words
+    return None
+
+
+def assign_words(words, match_label):
+    """Group TSV words under the field whose label precedes them
+
+    Returns {field: {'label': label as read, 'lines': [[word, ...], ...]}}
+    in panel order. Lines before the first label are ignored.
+    """
+    fields = {}
+    current = None
+    for line in group_lines(words):
+        labelled = split_label(line, match_label)
+        if labelled is not None:
+            field, label, value_words = labelled
+            current = fields[field] = {'label': label, 'lines': [value_words] if value_words else []}
+        elif current is not None:
+            current['lines'].append(line)
+    return fields
+
+
+def words_confidence(words):
+    """Confidence of a group of words: that of the weakest one, None without words"""
+    return min((word['conf'] for word in words), default=None)
+
+
+def field_box(lines, image_size, padding):
+    """(left, top, right, bottom) around a field's words, padded and clipped to the image"""
+    words = [word for line in lines for word in line]
+    return (max(min(w['left'] for w in words) - padding, 0),
+            max(min(w['top'] for w in words) - padding, 0),
+            min(max(w['left'] + w['width'] for w in words) + padding, image_size[0]),
+            min(max(w['top'] + w['height'] for w in words) + padding, image_size[1]))
+
+
+def retry_ocr(engine, image, multi_line, settings, ocr_config=OCR_CONFIG):
+    """OCR an image again, enlarged and with a line-oriented config - returns (text, confidence)"""
+    factor = settings.get('upscale', 1)
+    if factor and factor != 1:
+        image = image.resize((image.width * factor, image.height * factor), Image.LANCZOS)
+    config = ocr_config if multi_line else single_line_config(ocr_config)
+    words = engine.image_to_data(image.convert('L'), config=settings.get('retry_config', config))
+    text = " ".join(line.strip() for line in words_to_text(words).splitlines() if line.strip())
+    return text, words_confidence(words)
+
+
+def refine_fields(image, words, engine, match_label, settings, executor=None, ocr_config=OCR_CONFIG):
+    """Re-OCR the low-confidence fields found in words
+
+    image is the picture words were read from with ocr_config. Returns (text, confidences,
+    retried): parser input text, {field: confidence} and the fields whose
+    retry was kept. When nothing needs a retry the text is the original
+    OCR output unchanged.
+    """
+    fields = assign_words(words, match_label)
+    confidences = {field: words_confidence([w for line in entry['lines'] for w in line])
+                   for field, entry in fields.items()}
+    threshold = settings.get('min_confidence', DEFAULT_SETTINGS['min_confidence'])
+    weak = [field for field, confidence in confidences.items() if confidence is not None and confidence < threshold]
+    if not weak:
+        return words_to_text(words), confidences, []
+
+    def retry(field):
+        lines = fields[field]['lines']
+        box = field_box(lines, image.size, settings.get('padding', DEFAULT_SETTINGS['padding']))
+        return retry_ocr(engine, image.crop(box), len(lines) > 1, settings, ocr_config)
+
+    attempts = executor.map(retry, weak) if executor is not None else map(retry, weak)
+    values = {field: " ".join(w['text'] for line in entry['lines'] for w in line) for field, entry in fields.items()}
+    retried = []
+    for field, (text, confidence) in zip(weak, attempts):
+        if text and confidence is not None and confidence > confidences[field]:
+            values[field] = text
+            confidences[field] = confidence
+            retried.append(field)
+
+    if not retried:
+        return words_to_text(words), confidences, []
+    # Rebuild the text from the labels as they were read, so the parser matches them again
+    text = "\n".join(f"{fields[field]['label']}: {value}" for field, value in values.items())
+    return text, confidences, retried
@@ -0,0 +1,233 @@
+from ocr_engine import OCR_CONFIG, single_line_config
+
+FIELD_LABELS = ('Name', 'Model', 'Plate', 'Owner')
+
+# Pixels added above/below a text line when cutting out its zone
+LINE_PADDING = 3
+# Pixels skipped between the end of a label and the start of its value
+LABEL_GAP = 2
+# Size the label pixels are shrunk to when checking that the layout still applies
+FINGERPRINT_SIZE = (24, 8)
+# Mean absolute difference (0-255) above which a label no longer counts as matching
+FINGERPRINT_TOLERANCE = 14
+
+
+def group_lines(words):
+    """Group TSV words into text lines, top to bottom, each sorted left to right"""
+    lines = {}
+    for word in words:
+        key = (word['block_num'], word['par_num'], word['line_num'])
+        lines.setdefault(key, []).append(word)
+    ordered = [sorted(line, key=lambda w: w['left']) for line in lines.values()]
+    ordered.sort(key=lambda line: min(w['top'] for w in line))
+    return ordered
+
+
+def words_to_text(words):
+    """Rebuild image_to_string style text from TSV words"""
+    return "\n".join(" ".join(w['text'] for w in line) for line in group_lines(words))
+
+
+def line_bounds(line):
+    """Top and bottom pixel rows of a line of words"""
+    return min(w['top'] for w in line), max(w['top'] + w['height'] for w in line)
+
+
+def match_label(line, labels):
+    """Return (label, right edge of the label incl. colon) if line starts with a label, else None"""
+    first = line[0]
+    name = first['text'].rstrip(':').strip().lower()
+    for label in labels:
+        if name == label.lower():
+            right = first['left'] + first['width']
+            if not first['text'].endswith(':'):
+                # Tesseract sometimes splits the colon into its own word
+                if len(line) < 2 or not line[1]['text'].startswith(':'):
+                    return None
+                if line[1]['text'] == ':':
+                    right = line[1]['left'] + line[1]['width']
+            return label, right
+    return None
+
+
+def fingerprint(image, box):
+    """Tiny grayscale thumbnail of box, used to tell if a label is still where we learned it"""
+    return list(image.crop(box).convert("L").resize(FINGERPRINT_SIZE).tobytes())
+
+
+class FieldLayout:
+    """Pixel zones of each field's value inside the calibrated region
+
+    Learned once from word boxes; afterwards only the value zones are
+    OCR'd, each with a single-line config, and the label positions are
+    checked with cheap thumbnails so the layout is re-learned when the
+    panel moves or changes.
+    """
+
+    def __init__(self, region_size, zones, anchors, fingerprints):
+        self.region_size = tuple(region_size)
+        self.zones = zones                  # field -> [[l, t, r, b], ...] in reading order
+        self.anchors = anchors              # field -> [l, t, r, b] of its label
+        self.fingerprints = fingerprints    # field -> thumbnail of the label pixels
+
+    def to_dict(self):
+        """Serializable form for calibration_config.json"""
+        return {
+            'region_size': list(self.region_size),
+            'zones': self.zones,
+            'anchors': self.anchors,
+            'fingerprints': self.fingerprints,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a layout saved with to_dict"""
+        return cls(data['region_size'], data['zones'], data['anchors'], data['fingerprints'])
+
+    def anchors_match(self, image):
+        """Check that every label still looks like it did when the layout was learned"""
+        if tuple(image.size) != self.region_size:
+            return False
+        for field, box in self.anchors.items():
+            current = fingerprint(image, tuple(box))
+            learned = self.fingerprints[field]
+            difference = sum(abs(a - b) for a, b in zip(current, learned)) / len(learned)
+            if difference > FINGERPRINT_TOLERANCE:
+                print(f"Label '{field}' moved or changed (difference {difference:.1f}), re-learning layout")
+                return False
+        return True
+
+    def ocr_fields(self, image, engine, executor, preprocessor=None, ocr_config=OCR_CONFIG, timer=None):
+        """OCR every value zone in parallel, returning {field: value text}
+
+        Zones are read with ocr_config, switched to --psm 7 for the
+        single-line ones. The preprocessing steps of all zones are added
+        to timer as 'preprocess.<step>'.
+        """
+        line_config = single_line_config(ocr_config)
+
+        def ocr_zone(box, single_line):
+            zone, steps = self._preprocess(image.crop(tuple(box)), preprocessor)
+            return engine.image_to_string(zone, config=line_config if single_line else ocr_config), steps
+
+        results = self._run_zones(executor, ocr_zone)
+        self._add_preprocess_timings(timer, results)
+        return {field: self._join_parts(text for text, _ in parts) for field, parts in results.items()}
+
+    def ocr_fields_scored(self, image, engine, executor, preprocessor=None, settings=None, ocr_config=OCR_CONFIG,
+                          timer=None):
+        """Like ocr_fields, but also returns ({field: confidence}, fields that were re-OCR'd)
+
+        Each zone is read with word confidences; a zone below
+        settings['min_confidence'] is read again, enlarged, in the same task.
+        """
+        from field_confidence import DEFAULT_SETTINGS, retry_ocr, words_confidence
+
+        settings = settings or DEFAULT_SETTINGS
+        threshold = settings.get('min_confidence', DEFAULT_SETTINGS['min_confidence'])
+        line_config = single_line_config(ocr_config)
+
+        def ocr_zone(box, single_line):
+            crop = image.crop(tuple(box))
+            zone, steps = self._preprocess(crop, preprocessor)
+            words = engine.image_to_data(zone, config=line_config if single_line else ocr_config)
+            text = words_to_text(words)
+            confidence = words_confidence(words)
+            if confidence is not None and confidence < threshold:
+                retry_text, retry_confidence = retry_ocr(engine, crop, not single_line, settings, ocr_config)
+                if retry_text and retry_confidence is not None and retry_confidence > confidence:
+                    return retry_text, retry_confidence, True, steps
+            return text, confidence, False, steps
+
+        results = self._run_zones(executor, ocr_zone)
+        self._add_preprocess_timings(timer, results)
+        values = {}
+        confidences = {}
+        retried = []
+        for field, parts in results.items():
+            values[field] = self._join_parts(part[0] for part in parts)
+            scores = [part[1] for part in parts if part[1] is not None]
+            confidences[field] = min(scores) if scores else None
+            if any(part[2] for part in parts):
+                retried.append(field)
+        return values, confidences, retried
+
+    @staticmethod
+    def _preprocess(zone, preprocessor):
+        """(preprocessed zone, {step: ms}) - the zone unchanged without a preprocessor"""
+        if preprocessor is None:
+            return zone, {}
+        return preprocessor.process(zone)
+
+    @staticmethod
+    def _add_preprocess_timings(timer, results):
+        """Add the summed per-step preprocessing time of every zone to timer
+
+        Zones run in parallel, so these are CPU time and overlap the 'ocr' stage.
+        """
+        if timer is None:
+            return
+        steps = {}
+        for parts in results.values():
+            for part in parts:
+                for step, milliseconds in part[-1].items():
+                    steps[step] = steps.get(step, 0.0) + milliseconds
+        timer.add_steps('preprocess', steps)
+
+    def _run_zones(self, executor, ocr_zone):
+        """{field: [ocr_zone result per zone]} with every zone OCR'd in parallel"""
+        futures = {}
+        for field, boxes in self.zones.items():
+            for index, box in enumerate(boxes):
+                # The first zone is the rest of the label's line, later ones are wrapped lines
+                futures[(field, index)] = executor.submit(ocr_zone, box, index == 0)
+        return {field: [futures[(field, index)].result() for index in range(len(boxes))]
+                for field, boxes in self.zones.items()}
+
+    @staticmethod
+    def _join_parts(parts):
+        """One value from the OCR text of a field's zones"""
+        parts = [part.strip().lstrip(':') for part in parts]
+        return " ".join(" ".join(part.split()) for part in parts if part)
+
+
+def learn_field_layout(image, words, labels=FIELD_LABELS):
+    """Learn value zones from the word boxes of a full-region OCR, or None if a label is missing"""
+    width, height = image.size
+    lines = group_lines(words)
+
+    found = []
+    for index, line in enumerate(lines):
+        match = match_label(line, labels)
+        if match and all(label != match[0] for label, _, _ in found):
+            found.append((match[0], index, match[1]))
+
+    if len(found) != len(labels):
+        return None
+
+    zones = {}
+    anchors = {}
+    fingerprints = {}
+    for position, (label, index, label_right) in enumerate(found):
+        line = lines[index]
+        top, bottom = line_bounds(line)
+        next_index = found[position + 1][1] if position + 1 < len(found) else len(lines)
+        limit = line_bounds(lines[next_index])[0] if next_index < len(lines) else height
+
+        # Rest of the label's own line
+        field_zones = [[min(label_right + LABEL_GAP, width - 1), max(top - LINE_PADDING, 0),
+                        width, min(bottom + LINE_PADDING, limit)]]
+
+        # Wrapped value lines before the next label, cut across the full width
+        continuation = lines[index + 1:next_index]
+        if continuation:
+            cont_top = line_bounds(continuation[0])[0]
+            cont_bottom = line_bounds(continuation[-1])[1]
+            field_zones.append([0, max(cont_top - LINE_PADDING, 0), width, min(cont_bottom + LINE_PADDING, limit)])
+
+        anchor = [line[0]['left'], top, label_right, bottom]
+        zones[label] = field_zones
+        anchors[label] = anchor
+        fingerprints[label] = fingerprint(image, tuple(anchor))
+
+    return FieldLayout((width, height), zones, anchors, fingerprints)
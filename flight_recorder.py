@@ -0,0 +1,281 @@
+"""Capture flight recorder: a fixed-size, memory-mapped ring of recent captures
+
+Each slot holds the raw pixels of one captured region together with its
+OCR text, parsed fields and stage timings. Pixels are copied into the map
+as-is, so recording costs a memcpy and a small JSON dump, never a PNG
+encode. Once every slot is used the oldest capture is overwritten. Only
+captures of the calibrated region are recorded; replay runs them through
+the same single-region pipeline, so profile captures are left out.
+
+Usage:
+    python flight_recorder.py list capture_flight.rec
+    python flight_recorder.py replay capture_flight.rec [--calibration calibration_config.json]
+                                    [--engine stdin] [--tesseract PATH] [--export DIR]
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+MAGIC = b"APFR"
+VERSION = 1
+# magic, version, slot count, slot size
+FILE_HEADER = struct.Struct("<4sIII")
+FILE_HEADER_SIZE = 64
+# sequence, timestamp, width, height, mode code, pixel bytes, metadata bytes
+SLOT_HEADER = struct.Struct("<QdIIBII")
+
+MODE_CODES = {"L": 1, "RGB": 3, "RGBA": 4}
+MODE_NAMES = {code: mode for mode, code in MODE_CODES.items()}
+
+
+class FlightRecorder:
+    """Ring archive of recent captures in a memory-mapped file"""
+
+    def __init__(self, path, slots=256, slot_size=1024 * 1024, readonly=False):
+        """Open the ring in path, creating it if the file is missing or empty
+
+        readonly maps an existing recorder file for reading only. Raises
+        ValueError rather than touch a file that is not a recorder of this
+        version.
+        """
+        self.path = path
+        self.readonly = readonly
+        self._lock = threading.Lock()
+
+        existing = self._read_file_header(path)
+        if existing:
+            slots, slot_size = existing
+        elif readonly:
+            raise ValueError(f"{path} is not a flight recorder file")
+        elif os.path.exists(path) and os.path.getsize(path) > 0:
+            raise ValueError(f"{path} exists and is not a flight recorder file - not overwriting it")
+
+        self.slots = slots
+        self.slot_size = slot_size
+        size = FILE_HEADER_SIZE + slots * slot_size
+
+        if readonly:
+            self._file = open(path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+        else:
+            self._file = open(path, "r+b" if existing else "w+b")
+            if not existing:
+                self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+            if not existing:
+                self._map[:FILE_HEADER.size] = FILE_HEADER.pack(MAGIC, VERSION, slots, slot_size)
+
+        # Continue after the newest record already in the file
+        self._sequence = max((header[0] for header in self._slot_headers()), default=0)
+
+    @staticmethod
+    def _read_file_header(path):
+        """(slots, slot_size) of an existing recorder file, or None"""
+        if not os.path.exists(path) or os.path.getsize(path) < FILE_HEADER_SIZE:
+            return None
+        with open(path, "rb") as f:
+            magic, version, slots, slot_size = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            return None
+        if os.path.getsize(path) < FILE_HEADER_SIZE + slots * slot_size:
+            return None
+        return slots, slot_size
+
+    def _slot_offset(self, index):
+        return FILE_HEADER_SIZE + index * self.slot_size
+
+    def _slot_headers(self):
+        """Unpacked header of every slot"""
+        for index in range(self.slots):
+            offset = self._slot_offset(index)
+            yield SLOT_HEADER.unpack_from(self._map, offset)
+
+    def record(self, image, text, parsed, timings, confidence=None):
+        """Append one capture, overwriting the oldest slot when the ring is full"""
+        if self.readonly:
+            raise ValueError("Flight recorder opened read-only")
+        pixels = image.tobytes() if image.mode in MODE_CODES else image.convert("RGB").tobytes()
+        mode = image.mode if image.mode in MODE_CODES else "RGB"
+        metadata = json.dumps({"text": text, "parsed": parsed, "timings": timings,
+                               "confidence": confidence or {}}).encode("utf-8")
+
+        room = self.slot_size - SLOT_HEADER.size
+        if len(metadata) > room:
+            print("Flight recorder: metadata too large, capture not recorded")
+            return False
+        if len(pixels) + len(metadata) > room:
+            # Region bigger than a slot - keep the text and timings at least
+            pixels = b""
+
+        with self._lock:
+            self._sequence += 1
+            offset = self._slot_offset((self._sequence - 1) % self.slots)
+            data_offset = offset + SLOT_HEADER.size
+            # Invalidate the slot first so a torn write is never read back as a record
+            SLOT_HEADER.pack_into(self._map, offset, 0, 0.0, 0, 0, 0, 0, 0)
+            self._map[data_offset:data_offset + len(pixels)] = pixels
+            self._map[data_offset + len(pixels):data_offset + len(pixels) + len(metadata)] = metadata
+            SLOT_HEADER.pack_into(self._map, offset, self._sequence, time.time(), image.size[0], image.size[1],
+                                  MODE_CODES[mode], len(pixels), len(metadata))
+        return True
+
+    def records(self):
+        """Every archived capture, oldest first, as dicts with a PIL 'image' (None if not stored)"""
+        from PIL import Image
+
+        with self._lock:
+            headers = [(index, header) for index, header in enumerate(self._slot_headers()) if header[0]]
+            headers.sort(key=lambda item: item[1][0])
+            entries = []
+            for index, (sequence, timestamp, width, height, mode_code, pixel_len, meta_len) in headers:
+                data_offset = self._slot_offset(index) + SLOT_HEADER.size
+                pixels = bytes(self._map[data_offset:data_offset + pixel_len])
+                metadata = bytes(self._map[data_offset + pixel_len:data_offset + pixel_len + meta_len])
+                entries.append((sequence, timestamp, width, height, mode_code, pixels, metadata))
+
+        for sequence, timestamp, width, height, mode_code, pixels, metadata in entries:
+            record = json.loads(metadata.decode("utf-8"))
+            record["sequence"] = sequence
+            record["timestamp"] = timestamp
+            record["image"] = Image.frombytes(MODE_NAMES[mode_code], (width, height), pixels) if pixels else None
+            yield record
+
+    def flush(self):
+        """Flush the map to disk"""
+        with self._lock:
+            if not self.readonly:
+                self._map.flush()
+
+    def close(self):
+        """Flush and close the file"""
+        with self._lock:
+            if self._map is not None:
+                if not self.readonly:
+                    self._map.flush()
+                self._map.close()
+                self._file.close()
+                self._map = None
+
+
+def open_for_reading(path):
+    """Recorder in path opened read-only, or None after reporting why it can't be"""
+    try:
+        return FlightRecorder(path, readonly=True)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return None
+
+
+def build_replay_pipeline(engine, calibration_path, ocr_config=None):
+    """Pipeline set up like the app's from a calibration file
+
+    Same preprocessing, OCR config, parser template, dictionaries,
+    confidence re-OCR and learned field layout as the hotkey, so replayed
+    results are comparable with the recorded ones. A layout re-learned
+    during the replay is never saved. Returns (pipeline, field executor).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from batch_ocr import read_calibration, load_template
+    from field_layout import FieldLayout
+    from ocr_engine import OCR_CONFIG
+    from ocr_pipeline import OCRPipeline
+    from parser_templates import TEMPLATES_FILE
+    from preprocessing import ImagePreprocessor
+
+    calibration = read_calibration(calibration_path)
+    template = load_template(calibration.get('parser_template', 'vehicle'),
+                             os.path.join(os.path.dirname(calibration_path), TEMPLATES_FILE),
+                             calibration.get('correction'))
+    field_layout = FieldLayout.from_dict(calibration['field_layout']) if calibration.get('field_layout') else None
+    if field_layout is not None and set(field_layout.zones) != set(template.layout_labels):
+        field_layout = None
+
+    executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="replay-field-ocr")
+    pipeline = OCRPipeline(lambda: engine, ocr_config=ocr_config or calibration.get('ocr_config') or OCR_CONFIG,
+                           preprocessor=ImagePreprocessor(calibration.get('preprocess')),
+                           per_field_ocr=calibration.get('per_field_ocr', True), field_layout=field_layout,
+                           field_executor=executor, parse=template.parse, format_output=template.format_output,
+                           field_labels=template.layout_labels, confidence=calibration.get('confidence', {}),
+                           match_label=template.match_label)
+    return pipeline, executor
+
+
+def command_list(args):
+    """Print a one-line summary of every archived capture"""
+    recorder = open_for_reading(args.file)
+    if recorder is None:
+        return 1
+    for record in recorder.records():
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record["timestamp"]))
+        size = f"{record['image'].size[0]}x{record['image'].size[1]}" if record["image"] else "no pixels"
+        total = record["timings"].get("total", 0.0)
+        print(f"#{record['sequence']:<6} {stamp}  {size:<10} {total:7.1f} ms  {record['parsed']}")
+    recorder.close()
+    return 0
+
+
+def command_replay(args):
+    """Feed archived frames back through the OCR pipeline and compare with what was recorded"""
+    from ocr_engine import create_named_engine
+
+    recorder = open_for_reading(args.file)
+    if recorder is None:
+        return 1
+    engine = create_named_engine(args.engine, args.tesseract)
+    pipeline, executor = build_replay_pipeline(engine, args.calibration, args.config)
+
+    if args.export:
+        os.makedirs(args.export, exist_ok=True)
+
+    replayed = changed = 0
+    for record in recorder.records():
+        if record["image"] is None:
+            continue
+        result = pipeline.process(record["image"])
+        replayed += 1
+        differs = result["parsed"] != record["parsed"]
+        changed += differs
+        marker = "CHANGED" if differs else "same   "
+        print(f"#{record['sequence']:<6} {marker} ocr {result['timings'].get('ocr', 0.0):7.1f} ms  {result['parsed']}")
+        if differs:
+            print(f"         recorded: {record['parsed']}")
+        if args.export:
+            record["image"].save(os.path.join(args.export, f"capture_{record['sequence']:06d}.png"))
+
+    recorder.close()
+    executor.shutdown()
+    engine.close()
+    print(f"\nReplayed {replayed} captures, {changed} parsed differently than recorded")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="List archived captures")
+    list_parser.add_argument("file")
+
+    replay_parser = subparsers.add_parser("replay", help="Re-run archived captures through the pipeline")
+    replay_parser.add_argument("file")
+    replay_parser.add_argument("--engine", default="libtesseract", choices=["libtesseract", "stdin", "pytesseract"])
+    replay_parser.add_argument("--tesseract", default="tesseract", help="Path to the tesseract binary")
+    replay_parser.add_argument("--calibration", default="calibration_config.json",
+                               help="Replay with the settings saved in this calibration file")
+    replay_parser.add_argument("--config", default=None,
+                               help="Tesseract config string (default: the one in the calibration file)")
+    replay_parser.add_argument("--export", help="Also save every frame as PNG into this directory")
+
+    args = parser.parse_args()
+    if args.command == "list":
+        return command_list(args)
+    return command_replay(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
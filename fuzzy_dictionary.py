@@ -0,0 +1,299 @@
+"""Snap OCR'd values to the nearest entry of a dictionary of known values
+
+A dictionary is a UTF-8 text file with one entry per line, optionally
+followed by a tab and a frequency used to break ties ("Sultan RS\t120").
+Entries are compared on a key of their lowercase letters and digits, so
+"Su1tanRS" is one substitution away from "Sultan RS".
+
+Lookups use a symmetric-delete index (as in SymSpell): every string made
+by deleting up to max_distance characters from the first prefix_length
+characters of each key is hashed, and the (hash, entry) pairs are kept in
+two sorted NumPy arrays. A lookup generates the deletes of the input,
+finds the entries sharing one with a binary search and verifies only
+those with a bounded edit distance - a few tens of microseconds even for
+100k+ entries. Building the index takes a few seconds for such a file, so
+it is saved next to the dictionary as '<file>.index.npz' and reused while
+the dictionary is unchanged.
+
+Usage:
+    python fuzzy_dictionary.py DICTIONARY VALUE...
+"""
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+
+INDEX_VERSION = 1
+DEFAULT_MAX_DISTANCE = 2
+DEFAULT_PREFIX_LENGTH = 7
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]')
+
+
+def normalize_key(value):
+    """Lowercase letters and digits of a value, the form entries are compared in"""
+    return _NON_ALNUM.sub('', value.lower())
+
+
+def deletes(key, max_distance, prefix_length):
+    """Every string made by deleting up to max_distance characters from the key's prefix"""
+    key = key[:prefix_length]
+    result = {key}
+    frontier = {key}
+    for _ in range(max_distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))} - result
+        result |= frontier
+    return result
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance between a and b, or limit + 1 once it exceeds limit
+
+    Only the diagonal band |i - j| <= limit is computed, as cells outside
+    it are always over the limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    before_previous = None
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        row_min = current[0]
+        char = a[i - 1]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            value = previous[j - 1] + (char != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if (before_previous is not None and j > 1 and char == b[j - 2] and a[i - 2] == b[j - 1]
+                    and before_previous[j - 2] + 1 < value):
+                value = before_previous[j - 2] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return over
+        before_previous, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else over
+
+
+def _hash(text):
+    return zlib.crc32(text.encode('utf-8'))
+
+
+def read_entries(path):
+    """(entries, counts) of a dictionary file"""
+    entries = []
+    counts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            entry, _, count = line.rstrip('\r\n').partition('\t')
+            entry = entry.strip()
+            if entry:
+                entries.append(entry)
+                counts.append(int(count) if count.strip().isdigit() else 0)
+    return entries, counts
+
+
+class SymSpellIndex:
+    """Symmetric-delete index over a list of entries"""
+
+    def __init__(self, entries, counts=None, max_distance=DEFAULT_MAX_DISTANCE,
+                 prefix_length=DEFAULT_PREFIX_LENGTH, hashes=None, ids=None):
+        self.entries = list(entries)
+        self.counts = list(counts) if counts is not None else [0] * len(self.entries)
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.keys = [normalize_key(entry) for entry in self.entries]
+
+        # Exact keys skip the index; on duplicates the most frequent entry wins
+        self._exact = {}
+        for entry_id, key in enumerate(self.keys):
+            best = self._exact.get(key)
+            if key and (best is None or self.counts[entry_id] > self.counts[best]):
+                self._exact[key] = entry_id
+
+        if hashes is None:
+            hashes, ids = self._build()
+        self.hashes = hashes
+        self.ids = ids
+
+    def _build(self):
+        """Sorted (delete hash, entry id) arrays"""
+        hashes = []
+        ids = []
+        for key, entry_id in self._exact.items():
+            for variant in deletes(key, self.max_distance, self.prefix_length):
+                hashes.append(_hash(variant))
+                ids.append(entry_id)
+        hashes = np.array(hashes, dtype=np.uint32)
+        ids = np.array(ids, dtype=np.uint32)
+        order = np.argsort(hashes, kind='stable')
+        return hashes[order], ids[order]
+
+    def lookup(self, value, max_distance=None):
+        """(entry, distance) nearest to value, or None if nothing is close enough
+
+        Short keys get a smaller distance (a third of their length), so
+        "RS" is never turned into some other two-letter entry.
+        """
+        key = normalize_key(value)
+        if not key:
+            return None
+        entry_id = self._exact.get(key)
+        if entry_id is not None:
+            return self.entries[entry_id], 0
+
+        limit = min(self.max_distance if max_distance is None else max_distance, len(key) // 3)
+        if limit <= 0:
+            return None
+
+        # Probe one distance at a time: most misreads are a single edit, and
+        # once a match at distance d is verified nothing further away can beat it
+        checked = set()
+        best = None
+        for distance in range(1, limit + 1):
+            probes = np.fromiter((_hash(variant) for variant in deletes(key, distance, self.prefix_length)),
+                                 dtype=np.uint32)
+            starts = np.searchsorted(self.hashes, probes, side='left')
+            ends = np.searchsorted(self.hashes, probes, side='right')
+            candidates = set()
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                if end > start:
+                    candidates.update(self.ids[start:end].tolist())
+
+            for entry_id in candidates - checked:
+                found = edit_distance(key, self.keys[entry_id], limit)
+                if found > limit:
+                    continue
+                rank = (found, -self.counts[entry_id], len(self.keys[entry_id]))
+                if best is None or rank < best[0]:
+                    best = (rank, entry_id)
+            checked |= candidates
+            if best is not None and best[0][0] <= distance:
+                break
+
+        if best is None:
+            return None
+        return self.entries[best[1]], best[0][0]
+
+    def save(self, path, source_stat=None):
+        """Write the index (and the stat of its source file) as an .npz"""
+        meta = [INDEX_VERSION, self.max_distance, self.prefix_length,
+                source_stat.st_mtime_ns if source_stat else 0, source_stat.st_size if source_stat else 0]
+        text = np.frombuffer('\n'.join(self.entries).encode('utf-8'), dtype=np.uint8)
+        # Write beside the target and rename, so a crash never leaves a torn index behind
+        temporary = path + '.tmp.npz'
+        np.savez(temporary, meta=np.array(meta, dtype=np.int64), entries=text,
+                 counts=np.array(self.counts, dtype=np.int64), hashes=self.hashes, ids=self.ids)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path, source_stat=None, max_distance=DEFAULT_MAX_DISTANCE, prefix_length=DEFAULT_PREFIX_LENGTH):
+        """Index saved with save(), or None if it is missing or stale"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            meta = data['meta'].tolist()
+            expected = [INDEX_VERSION, max_distance, prefix_length,
+                        source_stat.st_mtime_ns if source_stat else 0, source_stat.st_size if source_stat else 0]
+            if meta != expected:
+                return None
+            text = data['entries'].tobytes().decode('utf-8')
+            return cls(text.split('\n') if text else [], data['counts'].tolist(), max_distance, prefix_length,
+                       hashes=data['hashes'], ids=data['ids'])
+
+
+def load_index(path, max_distance=DEFAULT_MAX_DISTANCE, prefix_length=DEFAULT_PREFIX_LENGTH):
+    """Index of a dictionary file, from its disk cache when the file is unchanged"""
+    source_stat = os.stat(path)
+    index_path = path + '.index.npz'
+    try:
+        index = SymSpellIndex.load(index_path, source_stat, max_distance, prefix_length)
+        if index is not None:
+            return index
+    except Exception as e:
+        print(f"Rebuilding dictionary index for {path}: {e}")
+
+    start = time.perf_counter()
+    entries, counts = read_entries(path)
+    index = SymSpellIndex(entries, counts, max_distance, prefix_length)
+    print(f"Indexed {len(entries)} dictionary entries from {path} in {time.perf_counter() - start:.1f} s")
+    try:
+        index.save(index_path, source_stat)
+    except Exception as e:
+        print(f"Could not save dictionary index: {e}")
+    return index
+
+
+class FieldCorrector:
+    """Normalizer that snaps a field's value to its dictionary and counts what it did"""
+
+    def __init__(self, index):
+        self.index = index
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.corrections = 0
+        self.unmatched = 0
+
+    def __call__(self, value):
+        match = self.index.lookup(value)
+        with self._lock:
+            self.lookups += 1
+            if match is None:
+                self.unmatched += 1
+            elif match[0] != value:
+                self.corrections += 1
+        return value if match is None else match[0]
+
+    def stats(self):
+        with self._lock:
+            return {'lookups': self.lookups, 'corrections': self.corrections, 'unmatched': self.unmatched}
+
+
+def load_correctors(settings, base_dir=''):
+    """{field: FieldCorrector} for settings {'fields': {field: dictionary file}, 'max_distance': n}
+
+    Fields naming the same file share one index. A dictionary that cannot
+    be loaded is reported and its fields are left uncorrected.
+    """
+    max_distance = settings.get('max_distance', DEFAULT_MAX_DISTANCE)
+    indexes = {}
+    correctors = {}
+    for field, path in (settings.get('fields') or {}).items():
+        path = os.path.join(base_dir, path)
+        try:
+            if path not in indexes:
+                indexes[path] = load_index(path, max_distance)
+            correctors[field] = FieldCorrector(indexes[path])
+        except Exception as e:
+            print(f"Could not load dictionary {path} for {field}: {e}")
+    return correctors
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        return 1
+    start = time.perf_counter()
+    index = load_index(sys.argv[1])
+    print(f"{len(index.entries)} entries ready in {(time.perf_counter() - start) * 1000:.0f} ms")
+    for value in sys.argv[2:]:
+        start = time.perf_counter()
+        match = index.lookup(value)
+        elapsed = (time.perf_counter() - start) * 1e6
+        print(f"{value!r} -> {match[0]!r} (distance {match[1]})" if match else f"{value!r} -> no match",
+              f"in {elapsed:.0f} us")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""Local history of parsed captures, kept in SQLite
+
+Every capture is queued by record() and written by a background thread in
+batches, one transaction per batch, so the capture path never waits on
+the disk. The database runs in WAL mode: searches from the GUI read while
+the writer appends.
+
+Rows are never deleted. A capture of a plate already recorded within
+merge_window seconds updates that row (last_seen, count, latest fields)
+instead of adding a duplicate; captures without a plate merge on their
+formatted output. Plate and owner are stored in normalized form with
+indexes, so prefix searches stay fast with hundreds of thousands of rows.
+
+Usage:
+    python history_store.py search QUERY [--db capture_history.db] [--limit 20]
+"""
+import argparse
+import hashlib
+import json
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+DEFAULT_PATH = "capture_history.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    count INTEGER NOT NULL DEFAULT 1,
+    merge_key TEXT NOT NULL,
+    plate TEXT,
+    owner TEXT,
+    plate_key TEXT,
+    owner_key TEXT,
+    fields TEXT NOT NULL,
+    formatted TEXT,
+    raw_text TEXT
+);
+CREATE INDEX IF NOT EXISTS captures_merge ON captures (merge_key, last_seen);
+CREATE INDEX IF NOT EXISTS captures_plate ON captures (plate_key);
+CREATE INDEX IF NOT EXISTS captures_owner ON captures (owner_key);
+CREATE INDEX IF NOT EXISTS captures_last_seen ON captures (last_seen);
+"""
+
+_NON_ALNUM = re.compile(r'[^0-9A-Za-z]')
+_STOP = object()
+
+
+def plate_key(plate):
+    """Uppercase letters and digits of a plate, as it is indexed and searched"""
+    return _NON_ALNUM.sub('', plate or '').upper() or None
+
+
+def owner_key(owner):
+    """Lowercase owner with single spaces, as it is indexed and searched"""
+    return " ".join((owner or '').lower().split()) or None
+
+
+def find_field(parsed, field):
+    """Value of field in parsed data, looking inside per-region results of a profile capture"""
+    value = parsed.get(field)
+    if isinstance(value, str):
+        return value
+    for region in parsed.values():
+        if isinstance(region, dict) and isinstance(region.get(field), str):
+            return region[field]
+    return None
+
+
+def prefix_range(prefix):
+    """(low, high) bounds matching every text starting with prefix, for an indexed range query"""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def connect(path):
+    """Connection in WAL mode with the schema in place"""
+    connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # WAL keeps the database consistent with NORMAL; a crash can only lose the last batches
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class HistoryStore:
+    """Append-only capture history with batched background writes"""
+
+    def __init__(self, path=DEFAULT_PATH, merge_window=60.0, batch_size=64, flush_interval=0.5):
+        self.path = path
+        self.merge_window = merge_window
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.merged = 0
+        self._queue = queue.Queue()
+        self._writer = connect(path)
+        self._reader = connect(path)
+        self._reader_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, parsed, formatted, raw_text=None, timestamp=None):
+        """Queue one capture for writing - returns immediately"""
+        self._queue.put((timestamp or time.time(), parsed, formatted, raw_text))
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # Collect whatever else arrives shortly after, up to one batch
+            deadline = time.monotonic() + self.flush_interval
+            while item is not _STOP and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            stop = batch[-1] is _STOP
+            records = [record for record in batch if record is not _STOP]
+            if records:
+                try:
+                    with self._writer:
+                        for record in records:
+                            self._write(*record)
+                except Exception as e:
+                    print(f"History write failed: {e}")
+            if stop:
+                return
+
+    def _write(self, timestamp, parsed, formatted, raw_text):
+        """Insert a capture, or merge it into the recent row for the same plate"""
+        plate = find_field(parsed, 'Plate')
+        owner = find_field(parsed, 'Owner')
+        key = plate_key(plate)
+        merge_key = f"plate:{key}" if key else "text:" + hashlib.sha1((formatted or '').encode('utf-8')).hexdigest()
+        fields = json.dumps(parsed)
+
+        row = self._writer.execute(
+            "SELECT id FROM captures WHERE merge_key = ? AND last_seen >= ? ORDER BY last_seen DESC LIMIT 1",
+            (merge_key, timestamp - self.merge_window)).fetchone()
+        if row is not None:
+            self._writer.execute(
+                "UPDATE captures SET last_seen = ?, count = count + 1, owner = ?, owner_key = ?, fields = ?,"
+                " formatted = ?, raw_text = COALESCE(?, raw_text) WHERE id = ?",
+                (timestamp, owner, owner_key(owner), fields, formatted, raw_text, row[0]))
+            self.merged += 1
+        else:
+            self._writer.execute(
+                "INSERT INTO captures (first_seen, last_seen, merge_key, plate, owner, plate_key, owner_key,"
+                " fields, formatted, raw_text) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (timestamp, timestamp, merge_key, plate, owner, key, owner_key(owner), fields, formatted, raw_text))
+        self.written += 1
+
+    def search(self, query, limit=50):
+        """Most recent captures whose plate or owner starts with query (all captures if empty)
+
+        Returns dicts with id, first_seen, last_seen, count, plate, owner,
+        fields, formatted and raw_text.
+        """
+        columns = "id, first_seen, last_seen, count, plate, owner, fields, formatted, raw_text"
+        plate_prefix = plate_key(query)
+        owner_prefix = owner_key(query)
+        with self._reader_lock:
+            if not plate_prefix and not owner_prefix:
+                rows = self._reader.execute(
+                    f"SELECT {columns} FROM captures ORDER BY last_seen DESC LIMIT ?", (limit,)).fetchall()
+            else:
+                # One indexed range scan per column, merged with UNION
+                parts = []
+                parameters = []
+                if plate_prefix:
+                    parts.append(f"SELECT {columns} FROM captures WHERE plate_key >= ? AND plate_key < ?")
+                    parameters.extend(prefix_range(plate_prefix))
+                if owner_prefix:
+                    parts.append(f"SELECT {columns} FROM captures WHERE owner_key >= ? AND owner_key < ?")
+                    parameters.extend(prefix_range(owner_prefix))
+                rows = self._reader.execute(
+                    " UNION ".join(parts) + " ORDER BY last_seen DESC LIMIT ?", (*parameters, limit)).fetchall()
+        names = [column.strip() for column in columns.split(',')]
+        results = []
+        for row in rows:
+            result = dict(zip(names, row))
+            result['fields'] = json.loads(result['fields'])
+            results.append(result)
+        return results
+
+    def close(self):
+        """Write everything still queued and close the database"""
+        self._queue.put(_STOP)
+        # The writer owns its connection until the queue is drained - never close it under the thread
+        self._thread.join()
+        self._writer.close()
+        with self._reader_lock:
+            self._reader.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=['search'])
+    parser.add_argument('query', nargs='?', default='')
+    parser.add_argument('--db', default=DEFAULT_PATH)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    store = HistoryStore(args.db)
+    try:
+        start = time.perf_counter()
+        results = store.search(args.query, args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+    finally:
+        store.close()
+    for result in results:
+        seen = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(result['last_seen']))
+        print(f"{seen}  {result['plate'] or '-':<10} {result['owner'] or '-':<24} x{result['count']}")
+    print(f"{len(results)} results in {elapsed:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,344 @@
+"""Local service mode: capture-and-parse for other tools on the same machine
+
+Protocol: every frame is a 4-byte big-endian length followed by that many
+bytes. A request is one JSON frame {"id": ..., "command": ...}; the 'parse'
+command is followed by a second frame holding the encoded image (PNG,
+BMP, ...). Each request gets one JSON response frame:
+
+    {"id": ..., "ok": true, "result": {"parsed", "formatted", "confidence", "timings", "cached"},
+     "latency_ms": server-side time for the request}
+
+or {"id": ..., "ok": false, "error": "..."}. Commands:
+
+    capture   grab the calibrated region now and parse it
+    parse     parse the image sent in the next frame
+    last      the most recent result (from any client, the hotkey or watch mode)
+    ping      liveness check
+
+Connections stay open for any number of requests and are served on their
+own threads. The socket only listens on 127.0.0.1.
+
+Usage:
+    python ipc_service.py serve [--port 47800]             headless service
+    python ipc_service.py capture|last|ping [--port 47800]  stand-in client
+    python ipc_service.py parse SCREENSHOT [--port 47800]
+"""
+import argparse
+import io
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PORT = 47800
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 32 * 1024 * 1024
+
+
+def send_frame(sock, payload):
+    """Write one length-prefixed frame"""
+    sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+
+
+def recv_exact(sock, size):
+    """Read exactly size bytes, or None if the peer closed the connection first"""
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_frame(sock):
+    """Read one length-prefixed frame, or None at end of stream"""
+    header = recv_exact(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    (size,) = FRAME_HEADER.unpack(header)
+    if size > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame of {size} bytes exceeds limit")
+    return recv_exact(sock, size) if size else b""
+
+
+def result_payload(result):
+    """The JSON-safe part of an OCRPipeline result"""
+    return {'parsed': result['parsed'], 'formatted': result['formatted'],
+            'confidence': result.get('confidence', {}),
+            'timings': result.get('timings', {}), 'cached': result.get('cached', False)}
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """Serves the requests of one client connection"""
+
+    def handle(self):
+        service = self.server.service
+        sock = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            try:
+                frame = recv_frame(sock)
+                if frame is None:
+                    return
+                request = json.loads(frame.decode("utf-8"))
+                image_data = None
+                if isinstance(request, dict) and request.get('command') == 'parse':
+                    image_data = recv_frame(sock)
+                    if image_data is None:
+                        return
+            except (OSError, ValueError) as e:
+                print(f"Service connection error: {e}")
+                return
+
+            response = service.handle_request(request, image_data)
+            try:
+                send_frame(sock, json.dumps(response).encode("utf-8"))
+            except OSError:
+                return
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class OCRService:
+    """Serves capture/parse/last requests over a localhost socket
+
+    capture is a zero-argument callable that grabs the calibrated region
+    and returns an OCRPipeline result; parse_image takes a PIL image and
+    returns one. Captures run one at a time on a dedicated thread (there
+    is only one screen region to grab); parse requests run on the
+    connection threads.
+    """
+
+    def __init__(self, capture, parse_image, port=DEFAULT_PORT, host="127.0.0.1"):
+        self.capture = capture
+        self.parse_image = parse_image
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+        self._capture_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="service-capture")
+        self._lock = threading.Lock()
+        self._last = None
+        self.requests = 0
+        self.errors = 0
+
+    def start(self):
+        """Bind the socket and serve on a background thread"""
+        self._server = _Server((self.host, self.port), _RequestHandler)
+        self._server.service = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="ocr-service", daemon=True)
+        self._thread.start()
+        print(f"OCR service listening on {self.host}:{self.port}")
+
+    def stop(self):
+        """Stop serving and release the socket"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self._capture_pool.shutdown(wait=False)
+
+    def publish(self, result):
+        """Make result the one returned by 'last'"""
+        with self._lock:
+            self._last = result_payload(result)
+            self._last['captured_at'] = time.time()
+
+    def last(self):
+        """Most recent published result, or None"""
+        with self._lock:
+            return self._last
+
+    def handle_request(self, request, image_data=None):
+        """Run one request and build its response"""
+        start = time.perf_counter()
+        response = {'id': request.get('id') if isinstance(request, dict) else None}
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            command = request.get('command')
+            if command == 'capture':
+                result = result_payload(self._capture_pool.submit(self.capture).result())
+                self.publish(result)
+            elif command == 'parse':
+                from PIL import Image
+                image = Image.open(io.BytesIO(image_data or b"")).convert("RGB")
+                result = result_payload(self.parse_image(image))
+                self.publish(result)
+            elif command == 'last':
+                result = self.last()
+            elif command == 'ping':
+                result = 'pong'
+            else:
+                raise ValueError(f"Unknown command '{command}'")
+            response.update(ok=True, result=result)
+        except Exception as e:
+            response.update(ok=False, error=str(e))
+            with self._lock:
+                self.errors += 1
+        with self._lock:
+            self.requests += 1
+        response['latency_ms'] = (time.perf_counter() - start) * 1000
+        return response
+
+
+class ServiceClient:
+    """Blocking client for OCRService, keeps one connection open"""
+
+    def __init__(self, port=DEFAULT_PORT, host="127.0.0.1", timeout=10.0):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._next_id = 0
+
+    def request(self, command, image_data=None):
+        """Send one command and return the decoded response"""
+        self._next_id += 1
+        send_frame(self._sock, json.dumps({'id': self._next_id, 'command': command}).encode("utf-8"))
+        if command == 'parse':
+            send_frame(self._sock, image_data)
+        frame = recv_frame(self._sock)
+        if frame is None:
+            raise ConnectionError("Service closed the connection")
+        return json.loads(frame.decode("utf-8"))
+
+    def capture(self):
+        return self.request('capture')
+
+    def parse(self, image_data):
+        return self.request('parse', image_data)
+
+    def last(self):
+        return self.request('last')
+
+    def close(self):
+        self._sock.close()
+
+
+def serve_headless(args):
+    """Run the service without the GUI, using the saved calibration"""
+    from batch_ocr import find_tesseract
+    from ocr_engine import OCR_CONFIG, create_ocr_engine
+    from ocr_pipeline import OCRPipeline
+    from batch_ocr import load_template
+    from preprocessing import ImagePreprocessor
+    from latency_stats import StageTimer
+    from screen_capture import select_capture_backend, grab_stable
+    from parser_templates import TEMPLATES_FILE
+
+    try:
+        with open(args.calibration, 'r') as f:
+            settings = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Cannot load calibration from {args.calibration}: {e}", file=sys.stderr)
+        return 1
+    region = tuple(settings.get('region') or ())
+    stability = {'tolerance': 1.0, 'max_wait_ms': 300, 'poll_ms': 20}
+    stability.update(settings.get('stability', {}))
+
+    template = load_template(settings.get('parser_template', 'vehicle'),
+                             os.path.join(os.path.dirname(args.calibration), TEMPLATES_FILE),
+                             settings.get('correction'))
+
+    ocr_config = settings.get('ocr_config') or OCR_CONFIG
+    engine = create_ocr_engine(args.tesseract or find_tesseract(settings.get('tesseract')), warm_up_config=ocr_config)
+    pipeline = OCRPipeline(lambda: engine, ocr_config=ocr_config,
+                           preprocessor=ImagePreprocessor(settings.get('preprocess')),
+                           parse=template.parse, format_output=template.format_output,
+                           confidence=settings.get('confidence', {}), match_label=template.match_label)
+    backend = select_capture_backend(region) if len(region) == 4 else None
+
+    def capture():
+        if backend is None:
+            raise Exception("No calibrated region")
+        timer = StageTimer()
+        image, grab_timings = grab_stable(
+            backend, region,
+            tolerance=stability['tolerance'],
+            max_wait=stability['max_wait_ms'] / 1000,
+            poll_interval=stability['poll_ms'] / 1000
+        )
+        timer.add('settle', grab_timings['settle'])
+        timer.add('grab', grab_timings['grab'])
+        result = pipeline.process(image, timer)
+        timer.finish()
+        return result
+
+    service = OCRService(capture, pipeline.process, port=args.port)
+    service.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        if backend is not None:
+            backend.close()
+        engine.close()
+    return 0
+
+
+def run_client(args):
+    """Send one command to a running service and print the response"""
+    image_data = None
+    if args.command == 'parse':
+        try:
+            with open(args.screenshot, 'rb') as f:
+                image_data = f.read()
+        except OSError as e:
+            print(f"Cannot read {args.screenshot}: {e}", file=sys.stderr)
+            return 1
+
+    try:
+        client = ServiceClient(port=args.port)
+        try:
+            start = time.perf_counter()
+            response = client.request(args.command, image_data)
+            round_trip = (time.perf_counter() - start) * 1000
+        finally:
+            client.close()
+    except OSError as e:
+        print(f"Cannot reach the OCR service on port {args.port}: {e}", file=sys.stderr)
+        return 1
+
+    print(json.dumps(response, indent=2))
+    print(f"round trip {round_trip:.1f} ms (server {response.get('latency_ms', 0.0):.1f} ms)", file=sys.stderr)
+    return 0 if response.get('ok') else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='service', description=__doc__.splitlines()[0])
+    # Every command takes --port after its name, e.g. 'ping --port 47999'
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--port', type=int, default=DEFAULT_PORT)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', parents=[common], help='Run the service headless')
+    serve_parser.add_argument('--tesseract', help='Path to the tesseract binary (default: auto-detect)')
+    serve_parser.add_argument('--calibration', default='calibration_config.json')
+
+    subparsers.add_parser('capture', parents=[common], help='Capture the calibrated region now')
+    subparsers.add_parser('last', parents=[common], help='Print the last result')
+    subparsers.add_parser('ping', parents=[common], help='Check the service is running')
+    parse_parser = subparsers.add_parser('parse', parents=[common], help='Parse a screenshot file')
+    parse_parser.add_argument('screenshot')
+
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        return serve_headless(args)
+    return run_client(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import csv
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Order stages are listed in the stats panel and exports, unknown stages go last.
+# Sub-stages such as 'preprocess.threshold' follow their stage.
+STAGE_ORDER = ('queue', 'settle', 'grab', 'cache', 'preprocess', 'ocr', 'reocr', 'parse', 'clipboard', 'total')
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, math.ceil(fraction * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+class StageTimer:
+    """Collects the duration of each named stage of one capture, in milliseconds"""
+
+    def __init__(self):
+        self.timings = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        """Time the body of a with block as stage name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def add(self, name, milliseconds):
+        """Record a duration measured elsewhere"""
+        self.timings[name] = self.timings.get(name, 0.0) + milliseconds
+
+    def add_steps(self, stage, steps):
+        """Record {step: ms} measured elsewhere as 'stage.step' sub-stages"""
+        for step, milliseconds in steps.items():
+            self.add(f"{stage}.{step}", milliseconds)
+
+    def finish(self):
+        """Record the total time since the timer was created and return all timings"""
+        self.timings['total'] = (time.perf_counter() - self._start) * 1000
+        return self.timings
+
+
+class LatencyStats:
+    """Rolling per-stage latency windows with percentile summaries and JSON/CSV export"""
+
+    def __init__(self, window=500):
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, timings):
+        """Add one capture's {stage: ms} timings"""
+        with self._lock:
+            for stage, milliseconds in timings.items():
+                if stage not in self._samples:
+                    self._samples[stage] = deque(maxlen=self.window)
+                    self._counts[stage] = 0
+                self._samples[stage].append(milliseconds)
+                self._counts[stage] += 1
+
+    def stages(self):
+        """Stage names in display order"""
+        with self._lock:
+            names = list(self._samples)
+
+        def order(stage):
+            base = stage.split('.')[0]
+            return (STAGE_ORDER.index(base) if base in STAGE_ORDER else len(STAGE_ORDER), base, stage)
+        return sorted(names, key=order)
+
+    def summary(self):
+        """{stage: {count, p50, p95, p99, max}} over the rolling window"""
+        result = {}
+        for stage in self.stages():
+            with self._lock:
+                samples = sorted(self._samples[stage])
+                count = self._counts[stage]
+            result[stage] = {
+                'count': count,
+                'p50': percentile(samples, 0.50),
+                'p95': percentile(samples, 0.95),
+                'p99': percentile(samples, 0.99),
+                'max': samples[-1] if samples else 0.0,
+            }
+        return result
+
+    def format_table(self):
+        """Fixed-width text table of the summary for the stats panel"""
+        summary = self.summary()
+        if not summary:
+            return "No captures yet"
+        width = max(11, max(len(stage) for stage in summary) + 1)
+        lines = [f"{'stage':<{width}}{'n':>5}{'p50':>8}{'p95':>8}{'p99':>8}"]
+        for stage, row in summary.items():
+            lines.append(f"{stage:<{width}}{row['count']:>5}{row['p50']:>8.1f}{row['p95']:>8.1f}{row['p99']:>8.1f}")
+        return "\n".join(lines)
+
+    def export_json(self, path, extra=None):
+        """Write the summary and raw windows as JSON"""
+        with self._lock:
+            raw = {stage: list(samples) for stage, samples in self._samples.items()}
+        data = {'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'summary': self.summary(), 'samples': raw}
+        if extra:
+            data.update(extra)
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    def export_csv(self, path):
+        """Write one row per stage with its percentiles"""
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['stage', 'count', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'])
+            for stage, row in self.summary().items():
+                writer.writerow([stage, row['count'], f"{row['p50']:.3f}", f"{row['p95']:.3f}",
+                                 f"{row['p99']:.3f}", f"{row['max']:.3f}"])
@@ -1,21 +1,33 @@
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import messagebox, filedialog
 import json
 import os
+import sys
 import threading
+import multiprocessing
 import time
-from PIL import Image, ImageTk, ImageGrab
-import pytesseract
-import pyautogui
-import keyboard
-import pyperclip
-import re
+from concurrent.futures import ThreadPoolExecutor
 from tesseract_manager import TesseractManager
-from auto_updater import check_for_updates_on_startup
+from capture_pipeline import CaptureExecutor
+from field_layout import FieldLayout
+import vehicle_parser
+from latency_stats import LatencyStats, StageTimer
+from ocr_engine import OCR_CONFIG
+from profiles import Profile, ProfileCapture, get_parser
+
+# Pillow, NumPy, mss, keyboard, pyperclip and requests are imported where they
+# are first used so the window appears before they load (see benchmarks/startup_time.py)
+
+def app_directory():
+    """Folder of the executable when frozen, otherwise of this script"""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
 
 class ScreenCalibrator:
     def __init__(self):
-        self.config_file = "calibration_config.json"
+        # Settings and capture data live next to the app, not in whatever directory it was started from
+        self.config_file = os.path.join(app_directory(), "calibration_config.json")
         self.calibrated_region = None
         self.is_calibrating = False
         self.start_x = None
@@ -29,27 +41,99 @@ class ScreenCalibrator:
         self.tesseract_ready = False
         self.capture_hotkey = 'm'  # Default hotkey
         self.hotkey_thread = None
+        self.capture_backend = None
+        self.fallback_capture_backend = None
+        self.result_cache_settings = {'max_entries': 64, 'perceptual_tolerance': None, 'persist': False}
+        self.result_cache = None
+        self.ocr_pipeline = None
+        self.preprocess_settings = {}
+        self.preprocessor = None
+        self.ocr_config = OCR_CONFIG
+        self.autotune_info = None
+        self.per_field_ocr = True
+        self.field_layout = None
+        self.field_ocr_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="field-ocr")
+        self.watch_settings = {'enabled': False, 'interval_ms': 250, 'max_interval_ms': 2000}
+        self.region_watcher = None
+        self.latency_stats = LatencyStats()
+        self.stability_settings = {'tolerance': 1.0, 'max_wait_ms': 300, 'poll_ms': 20}
+        self.confidence_settings = {'enabled': True, 'min_confidence': 60, 'upscale': 2, 'padding': 4}
+        self.correction_settings = {'fields': {}, 'max_distance': 2}
+        self.field_correctors = {}
+        self.flight_recorder_settings = {'enabled': False, 'path': 'capture_flight.rec', 'slots': 256, 'slot_size_kb': 1024}
+        self.flight_recorder = None
+        self.history_settings = {'enabled': True, 'path': 'capture_history.db', 'merge_window_s': 60}
+        self.history_store = None
+        self.history_results = []
+        self.service_settings = {'enabled': False}
+        self.ocr_service = None
+        self.service_pipeline = None
+        self.parser_template_name = 'vehicle'
+        self.parser_templates = {}
+        self.parser_template = None
+        self.profiles = []
+        self.profile_captures = {}
+        self.region_ocr_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="region-ocr")
         
-        # Initialize Tesseract
-        self.initialize_tesseract()
+        # Capture jobs run off the keyboard hook thread
+        self.capture_executor = CaptureExecutor(self.deliver_capture_result)
         
         # Load existing calibration and settings
         self.load_calibration()
         
+        # Create main window
+        self.create_main_window()
+        
+        # Everything slow happens once the window is on screen
+        if os.environ.get('AUTOPARSE_STARTUP_PROBE'):
+            self.root.after_idle(lambda: print("STARTUP window", flush=True))
+        self.root.after_idle(self.finish_startup)
+    
+    def finish_startup(self):
+        """Load the OCR engine and background services - runs on the Tk thread after the window is shown"""
+        # Initialize Tesseract
+        self.initialize_tesseract()
+        self.update_status_display()
+        
+        # Grab-free part of the capture pipeline; identical captures reuse their previous result
+        self.create_ocr_pipeline()
+        
+        # One pipeline per region of every extra profile
+        self.create_profile_captures()
+        
+        # Index the known-value dictionaries off the Tk thread
+        self.start_dictionary_loading()
+        
+        # Keep the last captures on disk for offline replay
+        self.open_flight_recorder()
+        
+        # Searchable history of every parsed capture
+        self.open_history_store()
+        
+        # Serve capture/parse requests from other local tools
+        self.start_ocr_service()
+        
+        # Pick the fastest screen capture backend for the calibrated region
+        self.start_capture_backend_selection()
+        
         # Check for updates from GitHub
+        from auto_updater import check_for_updates_on_startup
         check_for_updates_on_startup()
         
         # Start hotkey listener in background
         self.start_hotkey_listener()
         
-        # Create main window
-        self.create_main_window()
+        if self.watch_settings['enabled']:
+            self.start_watch_mode()
+        
+        if os.environ.get('AUTOPARSE_STARTUP_PROBE'):
+            self.run_startup_probe()
     
     def create_main_window(self):
         """Create the main application window"""
         self.root = tk.Tk()
         self.root.title("AutoParse - Screen Region OCR")
-        self.root.geometry("400x300")
+        self.root.geometry("420x720")
         self.root.resizable(False, False)
         
         # Main frame
@@ -90,6 +174,39 @@ class ScreenCalibrator:
         test_btn.pack(pady=10, fill=tk.X)
         self.test_btn = test_btn  # Store reference for updating
         
+        # Watch mode toggle
+        self.watch_var = tk.BooleanVar(value=self.watch_settings['enabled'])
+        watch_check = tk.Checkbutton(main_frame, text="Watch mode (capture automatically when the panel changes)",
+                                     variable=self.watch_var, command=self.toggle_watch_mode, font=("Arial", 9))
+        watch_check.pack(anchor=tk.W)
+        # Watch captures report here instead of in a dialog
+        self.watch_status_label = tk.Label(main_frame, text="", font=("Arial", 9), anchor=tk.W, justify=tk.LEFT)
+        self.watch_status_label.pack(fill=tk.X)
+        
+        # Per-stage capture latency
+        stats_frame = tk.LabelFrame(main_frame, text="Capture latency (ms)", font=("Arial", 9))
+        stats_frame.pack(pady=(10, 0), fill=tk.X)
+        self.stats_label = tk.Label(stats_frame, text="", font=("Courier", 8), justify=tk.LEFT, anchor=tk.W)
+        self.stats_label.pack(fill=tk.X, padx=5)
+        export_btn = tk.Button(stats_frame, text="Export Stats...", command=self.export_latency_stats, font=("Arial", 8))
+        export_btn.pack(anchor=tk.E, padx=5, pady=(0, 5))
+        self.refresh_stats_panel()
+        
+        # Capture history search
+        history_frame = tk.LabelFrame(main_frame, text="History (plate or owner)", font=("Arial", 9))
+        history_frame.pack(pady=(10, 0), fill=tk.X)
+        search_row = tk.Frame(history_frame)
+        search_row.pack(fill=tk.X, padx=5, pady=(5, 0))
+        self.history_search_var = tk.StringVar()
+        search_entry = tk.Entry(search_row, textvariable=self.history_search_var, font=("Arial", 10))
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        search_entry.bind("<Return>", lambda event: self.search_history())
+        tk.Button(search_row, text="Search", command=self.search_history, font=("Arial", 8)).pack(side=tk.LEFT, padx=(5, 0))
+        self.history_list = tk.Listbox(history_frame, height=6, font=("Courier", 8))
+        self.history_list.pack(fill=tk.X, padx=5, pady=5)
+        # Double-click copies a past result back to the clipboard
+        self.history_list.bind("<Double-Button-1>", self.copy_history_entry)
+        
         # Instructions
         instructions = tk.Text(main_frame, height=8, width=50, wrap=tk.WORD)
         instructions.pack(pady=(20, 0), fill=tk.BOTH, expand=True)
@@ -162,6 +279,51 @@ Output format: Customer Name, Vehicle Make/Model, Plate""")
                     # Load hotkey setting
                     self.capture_hotkey = data.get('hotkey', 'm')
                     print(f"Loaded hotkey: {self.capture_hotkey}")
+                    
+                    # Load result cache settings
+                    self.result_cache_settings.update(data.get('result_cache', {}))
+                    
+                    # Load preprocessing steps for the region
+                    self.preprocess_settings = data.get('preprocess', {})
+                    
+                    # Load the OCR config picked by autotune.py for the region
+                    self.ocr_config = data.get('ocr_config') or OCR_CONFIG
+                    self.autotune_info = data.get('autotune')
+                    
+                    # Load the learned field layout
+                    self.per_field_ocr = data.get('per_field_ocr', True)
+                    if data.get('field_layout'):
+                        self.field_layout = FieldLayout.from_dict(data['field_layout'])
+                    
+                    # Load watch mode settings
+                    self.watch_settings.update(data.get('watch', {}))
+                    
+                    # Load frame stability settings
+                    self.stability_settings.update(data.get('stability', {}))
+                    
+                    # Load the confidence threshold for re-OCR of weak fields
+                    self.confidence_settings.update(data.get('confidence', {}))
+                    
+                    # Load the dictionaries OCR'd values are snapped to
+                    self.correction_settings.update(data.get('correction', {}))
+                    
+                    # Load flight recorder settings
+                    self.flight_recorder_settings.update(data.get('flight_recorder', {}))
+                    
+                    # Load capture history settings
+                    self.history_settings.update(data.get('history', {}))
+                    
+                    # Load local service settings
+                    self.service_settings.update(data.get('service', {}))
+                    
+                    # Load the parser template used for the calibrated region
+                    self.parser_template_name = data.get('parser_template', 'vehicle')
+                    
+                    # Load extra capture profiles (several regions on one hotkey)
+                    self.profiles = [Profile.from_dict(profile) for profile in data.get('profiles', [])]
+                    
+                    # Load the cached Tesseract location so startup can skip discovery
+                    self.tesseract_manager.discovery_cache = data.get('tesseract')
         except Exception as e:
             print(f"Error loading calibration: {e}")
             self.calibrated_region = None
@@ -172,7 +334,23 @@ Output format: Customer Name, Vehicle Make/Model, Plate""")
         try:
             data = {
                 'region': self.calibrated_region,
-                'hotkey': self.capture_hotkey
+                'hotkey': self.capture_hotkey,
+                'result_cache': self.result_cache_settings,
+                'preprocess': self.preprocess_settings,
+                'ocr_config': self.ocr_config,
+                'autotune': self.autotune_info,
+                'per_field_ocr': self.per_field_ocr,
+                'field_layout': self.field_layout.to_dict() if self.field_layout else None,
+                'watch': self.watch_settings,
+                'stability': self.stability_settings,
+                'confidence': self.confidence_settings,
+                'correction': self.correction_settings,
+                'flight_recorder': self.flight_recorder_settings,
+                'history': self.history_settings,
+                'service': self.service_settings,
+                'parser_template': self.parser_template_name,
+                'profiles': [profile.to_dict() for profile in self.profiles],
+                'tesseract': self.tesseract_manager.discovery_cache
             }
             with open(self.config_file, 'w') as f:
                 json.dump(data, f)
@@ -245,7 +423,10 @@ Output format: Customer Name, Vehicle Make/Model, Plate""")
             y2 = max(self.start_y, self.end_y)
             
             self.calibrated_region = (x1, y1, x2, y2)
+            self.field_layout = None  # Learned again on the next capture
+            self.ocr_pipeline.field_layout = None
             self.save_calibration()
+            self.start_capture_backend_selection()
             
             # Close overlay and show main window
             self.finish_calibration()
@@ -270,6 +451,8 @@ Output format: Customer Name, Vehicle Make/Model, Plate""")
     
     def start_hotkey_listener(self):
         """Start the hotkey listener in a background thread with improved reliability"""
+        import keyboard
+        
         def hotkey_thread():
             try:
                 # Clear any existing hotkeys first
@@ -282,6 +465,13 @@ Output format: Customer Name, Vehicle Make/Model, Plate""")
                 
                 print(f"Hotkey '{self.capture_hotkey}' registered successfully")
                 
+                # Each profile captures all of its regions from a single grab
+                for profile in self.profiles:
+                    if profile.hotkey:
+                        keyboard.add_hotkey(profile.hotkey, lambda name=profile.name: self.capture_profile(name),
+                                            suppress=False)
+                        print(f"Hotkey '{profile.hotkey}' registered for profile '{profile.name}'")
+                
                 # Keep the thread alive with a simple loop
                 while True:
                     time.sleep(1)  # Check every second
@@ -305,13 +495,348 @@ Output format: Customer Name, Vehicle Make/Model, Plate""")
         self.hotkey_thread.start()
         print(f"Started hotkey listener thread for '{self.capture_hotkey}'")
     
+    def create_ocr_pipeline(self):
+        """Create the result cache and OCR pipeline from the loaded settings"""
+        from preprocessing import ImagePreprocessor
+        from result_cache import ResultCache
+        from ocr_pipeline import OCRPipeline
+        from parser_templates import TEMPLATES_FILE, load_templates, get_template
+        
+        # Templates are compiled once here; captures only run the compiled matcher and formatter
+        self.parser_templates = load_templates(self.data_path(TEMPLATES_FILE))
+        self.parser_template = get_template(self.parser_templates, self.parser_template_name)
+        if self.field_layout is not None and set(self.field_layout.zones) != set(self.parser_template.layout_labels):
+            self.field_layout = None  # Learned for another template's labels
+        
+        self.preprocessor = ImagePreprocessor(self.preprocess_settings)
+        settings = self.result_cache_settings
+        self.result_cache = ResultCache(
+            max_entries=settings.get('max_entries', 64),
+            perceptual_tolerance=settings.get('perceptual_tolerance'),
+            disk_path=self.data_path("ocr_result_cache") if settings.get('persist') else None,
+            namespace=self.ocr_config + json.dumps(self.preprocessor.settings, sort_keys=True) + self.parser_template.fingerprint
+                      + self.correction_fingerprint()
+        )
+        self.ocr_pipeline = OCRPipeline(
+            self.tesseract_manager.get_ocr_engine,
+            ocr_config=self.ocr_config,
+            preprocessor=self.preprocessor,
+            result_cache=self.result_cache,
+            per_field_ocr=self.per_field_ocr,
+            field_layout=self.field_layout,
+            field_executor=self.field_ocr_pool,
+            on_layout_learned=self.on_field_layout_learned,
+            parse=self.parser_template.parse,
+            format_output=self.parser_template.format_output,
+            field_labels=self.parser_template.layout_labels,
+            confidence=self.confidence_settings,
+            match_label=self.parser_template.match_label
+        )
+    
+    def start_dictionary_loading(self):
+        """Load (or build and cache) the dictionary indexes and attach them to the active template"""
+        if not self.correction_settings.get('fields'):
+            return
+        
+        def loading_thread():
+            from fuzzy_dictionary import load_correctors
+            correctors = load_correctors(self.correction_settings)
+            if correctors:
+                self.run_on_ui_thread(self.attach_correctors, correctors)
+        
+        threading.Thread(target=loading_thread, name="dictionary-index", daemon=True).start()
+    
+    def attach_correctors(self, correctors):
+        """Enable the loaded dictionaries and drop the results parsed without them - runs on the Tk thread"""
+        for field, corrector in correctors.items():
+            self.parser_template.add_corrector(field, corrector)
+        self.field_correctors = correctors
+        
+        # Key corrected results apart from those of captures still in flight, then forget the uncorrected ones
+        corrected = self.correction_fingerprint()
+        for cache in (self.result_cache, getattr(self.service_pipeline, 'result_cache', None)):
+            if cache is not None:
+                if not cache.namespace.endswith(corrected):
+                    cache.namespace += corrected
+                cache.clear()
+        print(f"Dictionary correction enabled for {', '.join(correctors)}")
+    
+    def correction_fingerprint(self):
+        """Correction settings as mixed into result cache namespaces, empty until the correctors are attached"""
+        if not self.field_correctors:
+            return ''
+        return json.dumps(self.correction_settings, sort_keys=True)
+    
+    def make_region_pipeline(self, region):
+        """OCR pipeline for one region of a profile, with its own parser and result cache"""
+        from preprocessing import ImagePreprocessor
+        from result_cache import ResultCache
+        from ocr_pipeline import OCRPipeline
+        
+        parse, format_output = get_parser(region.parser, self.parser_templates)
+        template = self.parser_templates.get(region.parser)
+        ocr_config = region.ocr_config or self.ocr_config
+        preprocessor = ImagePreprocessor(region.preprocess)
+        settings = self.result_cache_settings
+        result_cache = ResultCache(
+            max_entries=settings.get('max_entries', 64),
+            perceptual_tolerance=settings.get('perceptual_tolerance'),
+            namespace=ocr_config + region.parser + json.dumps(preprocessor.settings, sort_keys=True)
+                      + (template.fingerprint if template else '')
+        )
+        return OCRPipeline(
+            self.tesseract_manager.get_ocr_engine,
+            ocr_config=ocr_config,
+            preprocessor=preprocessor,
+            result_cache=result_cache,
+            parse=parse,
+            format_output=format_output,
+            # Only templates have labels to tell the fields' words apart
+            confidence=self.confidence_settings if template else None,
+            match_label=template.match_label if template else None
+        )
+    
+    def create_profile_captures(self):
+        """Build the concurrent region pipelines of every profile"""
+        self.profile_captures = {}
+        for profile in self.profiles:
+            if not profile.regions:
+                continue
+            try:
+                self.profile_captures[profile.name] = ProfileCapture(profile, self.make_region_pipeline,
+                                                                     self.region_ocr_pool)
+                print(f"Loaded profile '{profile.name}' with {len(profile.regions)} regions on '{profile.hotkey}'")
+            except Exception as e:
+                print(f"Error loading profile '{profile.name}': {e}")
+    
+    def data_path(self, path):
+        """Resolve a relative data file path against the folder of the calibration file"""
+        return os.path.join(os.path.dirname(self.config_file), path)
+    
+    def open_flight_recorder(self):
+        """Open the capture flight recorder if it is enabled"""
+        settings = self.flight_recorder_settings
+        if not settings.get('enabled'):
+            return
+        from flight_recorder import FlightRecorder
+        try:
+            self.flight_recorder = FlightRecorder(
+                self.data_path(settings.get('path', 'capture_flight.rec')),
+                slots=settings.get('slots', 256),
+                slot_size=settings.get('slot_size_kb', 1024) * 1024
+            )
+            print(f"Flight recorder: {self.flight_recorder.path} ({self.flight_recorder.slots} slots)")
+        except Exception as e:
+            print(f"Could not open flight recorder: {e}")
+            self.flight_recorder = None
+    
+    def start_ocr_service(self):
+        """Start the local IPC service if it is enabled"""
+        if not self.service_settings.get('enabled'):
+            return
+        from ipc_service import OCRService, DEFAULT_PORT
+        try:
+            self.service_pipeline = self.make_service_pipeline()
+            self.ocr_service = OCRService(self.capture_for_service, self.service_pipeline.process,
+                                          port=self.service_settings.get('port', DEFAULT_PORT))
+            self.ocr_service.start()
+        except Exception as e:
+            print(f"Could not start OCR service: {e}")
+            self.ocr_service = None
+    
+    def make_service_pipeline(self):
+        """Pipeline for images sent by service clients
+        
+        Client images can be any size, so they are OCR'd as whole regions:
+        no learned field layout is used or re-learned (and saved) from them,
+        and their results are cached apart from the hotkey's.
+        """
+        from result_cache import ResultCache
+        from ocr_pipeline import OCRPipeline
+        
+        settings = self.result_cache_settings
+        result_cache = ResultCache(
+            max_entries=settings.get('max_entries', 64),
+            perceptual_tolerance=settings.get('perceptual_tolerance'),
+            namespace='service' + self.ocr_config + json.dumps(self.preprocessor.settings, sort_keys=True)
+                      + self.parser_template.fingerprint + self.correction_fingerprint()
+        )
+        return OCRPipeline(
+            self.tesseract_manager.get_ocr_engine,
+            ocr_config=self.ocr_config,
+            preprocessor=self.preprocessor,
+            result_cache=result_cache,
+            per_field_ocr=False,
+            field_executor=self.field_ocr_pool,
+            parse=self.parser_template.parse,
+            format_output=self.parser_template.format_output,
+            confidence=self.confidence_settings,
+            match_label=self.parser_template.match_label
+        )
+    
+    def capture_for_service(self):
+        """Capture and parse for a service client - no clipboard or dialogs"""
+        if not self.calibrated_region:
+            raise Exception("No calibrated region")
+        timer = StageTimer()
+        screenshot, result = self.capture_region(timer)
+        self.latency_stats.record(timer.finish())
+        return result
+    
+    def on_field_layout_learned(self, layout):
+        """Persist a newly learned field layout - called from a worker thread"""
+        print("Learned field layout from capture")
+        self.field_layout = layout
+        self.run_on_ui_thread(self.save_calibration)
+    
+    def refresh_stats_panel(self):
+        """Show the current latency percentiles in the stats panel"""
+        text = self.latency_stats.format_table()
+        if self.field_correctors:
+            text += "\nCorrected: " + ", ".join(
+                f"{field} {corrector.stats()['corrections']}/{corrector.stats()['lookups']}"
+                for field, corrector in self.field_correctors.items())
+        self.stats_label.config(text=text)
+    
+    def export_latency_stats(self):
+        """Save the latency histograms as JSON or CSV"""
+        path = filedialog.asksaveasfilename(
+            title="Export latency stats",
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("CSV", "*.csv")]
+        )
+        if not path:
+            return
+        try:
+            if path.lower().endswith('.csv'):
+                self.latency_stats.export_csv(path)
+            else:
+                backend = self.get_capture_backend()
+                self.latency_stats.export_json(path, extra={
+                    'ocr_engine': self.tesseract_manager.get_ocr_engine().name,
+                    'capture_backend': backend.name,
+                    'result_cache': self.result_cache.stats(),
+                    'corrections': {field: corrector.stats() for field, corrector in self.field_correctors.items()}
+                })
+            messagebox.showinfo("Stats Exported", f"Latency stats saved to {path}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export stats: {str(e)}")
+    
+    def open_history_store(self):
+        """Open the capture history database if it is enabled"""
+        settings = self.history_settings
+        if not settings.get('enabled'):
+            return
+        try:
+            from history_store import HistoryStore
+            self.history_store = HistoryStore(self.data_path(settings['path']),
+                                              merge_window=settings.get('merge_window_s', 60))
+        except Exception as e:
+            print(f"Could not open capture history: {e}")
+            self.history_store = None
+    
+    def search_history(self):
+        """Fill the history list with the captures matching the search box"""
+        self.history_list.delete(0, tk.END)
+        if self.history_store is None:
+            return
+        try:
+            self.history_results = self.history_store.search(self.history_search_var.get())
+        except Exception as e:
+            print(f"History search failed: {e}")
+            self.history_results = []
+        for entry in self.history_results:
+            seen = time.strftime('%m-%d %H:%M', time.localtime(entry['last_seen']))
+            repeats = f" x{entry['count']}" if entry['count'] > 1 else ""
+            self.history_list.insert(tk.END, f"{seen}  {entry['plate'] or '-':<9} {entry['owner'] or ''}{repeats}")
+    
+    def copy_history_entry(self, event=None):
+        """Copy the selected history entry's output to the clipboard"""
+        selection = self.history_list.curselection()
+        if not selection:
+            return
+        import pyperclip
+        pyperclip.copy(self.history_results[selection[0]]['formatted'] or '')
+    
+    def toggle_watch_mode(self):
+        """Turn watch mode on or off from the checkbox"""
+        self.watch_settings['enabled'] = self.watch_var.get()
+        if self.watch_settings['enabled']:
+            self.start_watch_mode()
+        else:
+            self.stop_watch_mode()
+        self.save_calibration()
+    
+    def get_capture_backend(self):
+        """The selected capture backend, or ImageGrab until selection has finished"""
+        if self.capture_backend is not None:
+            return self.capture_backend
+        if self.fallback_capture_backend is None:
+            from screen_capture import ImageGrabBackend
+            self.fallback_capture_backend = ImageGrabBackend()
+        return self.fallback_capture_backend
+    
+    def start_watch_mode(self):
+        """Start sampling the calibrated region and capture whenever it changes"""
+        from watch_mode import RegionWatcher
+        
+        self.stop_watch_mode()
+        
+        def grab():
+            if not self.calibrated_region:
+                raise Exception("No calibrated region")
+            backend = self.get_capture_backend()
+            return backend.grab(self.calibrated_region)
+        
+        self.region_watcher = RegionWatcher(
+            grab, self.watch_capture,
+            min_interval=self.watch_settings['interval_ms'] / 1000,
+            max_interval=self.watch_settings['max_interval_ms'] / 1000
+        )
+        self.region_watcher.start()
+        print("Watch mode started")
+    
+    def stop_watch_mode(self):
+        """Stop watch mode if it is running"""
+        if self.region_watcher is not None:
+            self.region_watcher.stop()
+            self.region_watcher = None
+            self.watch_status_label.config(text="")
+            print("Watch mode stopped")
+    
+    def start_capture_backend_selection(self):
+        """Benchmark the capture backends on the calibrated region in the background"""
+        if not self.calibrated_region:
+            return
+        
+        region = self.calibrated_region
+        
+        def selection_thread():
+            try:
+                from screen_capture import select_capture_backend
+                backend = select_capture_backend(region)
+            except Exception as e:
+                print(f"Capture backend selection failed: {e}")
+                return
+            previous = self.capture_backend
+            self.capture_backend = backend
+            if previous is not None and previous is not backend:
+                previous.close()
+        
+        threading.Thread(target=selection_thread, daemon=True).start()
+    
     def initialize_tesseract(self):
         """Initialize and verify Tesseract OCR"""
         try:
             if self.tesseract_manager.ensure_tesseract_available():
-                self.tesseract_manager.configure_pytesseract()
+                self.tesseract_manager.configure_pytesseract(self.ocr_config)
                 self.tesseract_ready = True
                 print("Tesseract OCR initialized successfully")
+                
+                # Remember where it was found for the next launch
+                if self.tesseract_manager.discovery_cache_changed:
+                    self.tesseract_manager.discovery_cache_changed = False
+                    self.save_calibration()
             else:
                 self.tesseract_ready = False
                 print("Tesseract OCR not available")
@@ -345,7 +870,41 @@ Output format: Customer Name, Vehicle Make/Model, Plate""")
             self.status_label.config(text=status_text, fg="orange")
     
     def capture_and_parse(self):
-        """Capture screenshot of calibrated region and parse with OCR - Gaming optimized"""
+        """Queue a capture of the calibrated region - safe to call from the hotkey thread"""
+        if not self.tesseract_ready or not self.calibrated_region:
+            # Prompts must run on the Tk thread
+            self.run_on_ui_thread(self.prompt_capture_prerequisites)
+            return
+        
+        # Repeated presses while a capture is in flight collapse into one follow-up capture
+        submitted_at = time.perf_counter()
+        self.capture_executor.submit('capture', lambda: self.run_capture_job(submitted_at), self.on_capture_complete)
+    
+    def watch_capture(self):
+        """Queue a capture for watch mode - called from the watcher thread, never prompts"""
+        if not self.tesseract_ready or not self.calibrated_region:
+            return
+        submitted_at = time.perf_counter()
+        self.capture_executor.submit('capture', lambda: self.run_capture_job(submitted_at),
+                                     self.on_watch_capture_complete)
+    
+    def run_on_ui_thread(self, callback, *args):
+        """Schedule callback on the Tk event loop"""
+        root = getattr(self, 'root', None)
+        if root is None:
+            print("Main window not ready, dropping UI update")
+            return
+        try:
+            root.after(0, callback, *args)
+        except RuntimeError as e:
+            print(f"Could not schedule UI update: {e}")
+    
+    def deliver_capture_result(self, callback, result, error):
+        """Hand a finished capture job back to the Tk event loop"""
+        self.run_on_ui_thread(callback, result, error)
+    
+    def prompt_capture_prerequisites(self):
+        """Ask the user to fix a missing Tesseract install or calibration, then capture"""
         # Check if Tesseract is ready
         if not self.tesseract_ready:
             response = messagebox.askyesno(
@@ -364,215 +923,211 @@ Output format: Customer Name, Vehicle Make/Model, Plate""")
             messagebox.showwarning("No Calibration", "Please calibrate a screen region first.")
             return
         
-        try:
-            # Add a small delay to ensure game rendering is complete
-            time.sleep(0.1)
-            
-            # Capture screenshot of the calibrated region with retry logic
-            screenshot = None
-            for attempt in range(3):  # Try up to 3 times
-                try:
-                    screenshot = ImageGrab.grab(bbox=self.calibrated_region)
-                    if screenshot:
-                        break
-                except Exception as e:
-                    print(f"Screenshot attempt {attempt + 1} failed: {e}")
-                    time.sleep(0.05)  # Brief pause before retry
-            
-            if not screenshot:
-                raise Exception("Failed to capture screenshot after multiple attempts")
-            
-            # Perform OCR with gaming-optimized settings
-            text = pytesseract.image_to_string(screenshot, config='--psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789: ')
-            
-            # Parse the text for required fields
-            parsed_data = self.parse_vehicle_data(text)
-            
-            # Format and copy to clipboard
-            formatted_output = self.format_output(parsed_data)
-            pyperclip.copy(formatted_output)
-            
-            # Show success message (only if not in game mode - check if main window is focused)
+        self.capture_and_parse()
+    
+    def grab_settled(self, bbox, timer):
+        """Grab bbox once the game has finished drawing it"""
+        from screen_capture import grab_stable
+        
+        # Capture only the requested rectangle with the fastest available backend,
+        # waiting just long enough for the game to finish drawing the panel
+        backend = self.get_capture_backend()
+        screenshot, grab_timings = grab_stable(
+            backend, bbox,
+            tolerance=self.stability_settings['tolerance'],
+            max_wait=self.stability_settings['max_wait_ms'] / 1000,
+            poll_interval=self.stability_settings['poll_ms'] / 1000
+        )
+        timer.add('settle', grab_timings['settle'])
+        timer.add('grab', grab_timings['grab'])
+        return screenshot
+    
+    def capture_region(self, timer):
+        """Grab the calibrated region and run the OCR pipeline on it, returning (screenshot, result)"""
+        screenshot = self.grab_settled(self.calibrated_region, timer)
+        result = self.ocr_pipeline.process(screenshot, timer)
+        return screenshot, result
+    
+    def run_capture_job(self, submitted_at=None):
+        """Capture screenshot of calibrated region and parse with OCR - runs on a worker thread"""
+        timer = StageTimer()
+        if submitted_at is not None:
+            timer.add('queue', (time.perf_counter() - submitted_at) * 1000)
+        
+        screenshot, result = self.capture_region(timer)
+        return self.finish_capture(screenshot, result, timer)
+    
+    def capture_profile(self, name):
+        """Queue a capture of every region in a profile - safe to call from the hotkey thread"""
+        if not self.tesseract_ready or name not in self.profile_captures:
+            self.run_on_ui_thread(self.prompt_capture_prerequisites)
+            return
+        submitted_at = time.perf_counter()
+        self.capture_executor.submit(f'profile:{name}', lambda: self.run_profile_job(name, submitted_at),
+                                     self.on_capture_complete)
+    
+    def run_profile_job(self, name, submitted_at=None):
+        """Grab a profile's bounding box once and OCR its regions concurrently - runs on a worker thread"""
+        timer = StageTimer()
+        if submitted_at is not None:
+            timer.add('queue', (time.perf_counter() - submitted_at) * 1000)
+        
+        capture = self.profile_captures[name]
+        screenshot = self.grab_settled(capture.profile.bounding_box(), timer)
+        result = capture.process(screenshot, timer)
+        # Replay runs the single-region pipeline, which cannot reproduce a multi-region grab
+        return self.finish_capture(screenshot, result, timer, archive=False)
+    
+    def finish_capture(self, screenshot, result, timer, archive=True):
+        """Copy a capture's output, record its timings and return the formatted text
+        
+        archive=False keeps the capture out of the flight recorder.
+        """
+        # Copy to clipboard
+        with timer.stage('clipboard'):
+            import pyperclip
+            pyperclip.copy(result['formatted'])
+        
+        timings = timer.finish()
+        self.latency_stats.record(timings)
+        
+        if result.get('retried'):
+            print(f"Re-OCR'd low-confidence fields: {', '.join(result['retried'])}")
+        
+        # Archive the frame with what it produced so bad captures can be replayed later
+        if archive and self.flight_recorder is not None:
             try:
-                if self.root.focus_get():
-                    messagebox.showinfo("Success", f"Data captured and copied to clipboard!\n\n{formatted_output}")
-                else:
-                    # Just print to console if game is likely focused
-                    print(f"Data captured and copied to clipboard: {formatted_output}")
-            except:
-                print(f"Data captured and copied to clipboard: {formatted_output}")
-            
-        except Exception as e:
-            error_msg = f"Failed to capture and parse: {str(e)}"
+                self.flight_recorder.record(screenshot, result['text'], result['parsed'], timings,
+                                            result.get('confidence'))
+            except Exception as e:
+                print(f"Flight recorder error: {e}")
+        
+        # Queued for the history database, written in batches by its own thread
+        if self.history_store is not None:
+            self.history_store.record(result['parsed'], result['formatted'], result['text'])
+        
+        # Service clients asking for 'last' get the hotkey and watch mode captures too
+        if self.ocr_service is not None:
+            self.ocr_service.publish(result)
+        
+        return result['formatted']
+    
+    def on_capture_complete(self, formatted_output, error):
+        """Report a finished capture - runs on the Tk thread"""
+        self.refresh_stats_panel()
+        
+        if error is not None:
+            error_msg = f"Failed to capture and parse: {str(error)}"
             print(error_msg)
             try:
                 if self.root.focus_get():
                     messagebox.showerror("Error", error_msg)
             except:
                 pass  # Don't show error dialog if game is focused
+            return
+        
+        # Show success message (only if not in game mode - check if main window is focused)
+        try:
+            if self.root.focus_get():
+                messagebox.showinfo("Success", f"Data captured and copied to clipboard!\n\n{formatted_output}")
+            else:
+                # Just print to console if game is likely focused
+                print(f"Data captured and copied to clipboard: {formatted_output}")
+        except:
+            print(f"Data captured and copied to clipboard: {formatted_output}")
     
-    def parse_vehicle_data(self, text):
-        """Parse OCR text to extract vehicle information"""
-        data = {
-            'Name': '',
-            'Model': '',
-            'Plate': '',
-            'Owner': ''
-        }
-        
-        # Clean up the text
-        text = text.strip()
-        print(f"Raw OCR text: '{text}'")  # Debug output
-        
-        import re
-        
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        print(f"OCR lines: {lines}")  # Debug output
-        
-        # Define field labels to look for
-        field_labels = ['name', 'model', 'plate', 'owner']
-        
-        # Parse multi-line fields
-        i = 0
-        while i < len(lines):
-            line = lines[i]
-            
-            # Check if this line contains a field label
-            if ':' in line:
-                field_name, field_value = line.split(':', 1)
-                field_name = field_name.strip().lower()
-                field_value = field_value.strip()
-                
-                # If this is a recognized field, collect all lines until the next field
-                if field_name in field_labels:
-                    # Start with the value on the same line as the field label
-                    full_value = field_value
-                    
-                    # Look ahead to collect continuation lines
-                    j = i + 1
-                    while j < len(lines):
-                        next_line = lines[j]
-                        
-                        # Stop if we hit another field label
-                        if ':' in next_line:
-                            next_field = next_line.split(':', 1)[0].strip().lower()
-                            if next_field in field_labels:
-                                break
-                        
-                        # This line is a continuation of the current field
-                        if full_value:
-                            full_value += ' ' + next_line
-                        else:
-                            full_value = next_line
-                        j += 1
-                    
-                    # Store the complete field value
-                    if field_name == 'name':
-                        data['Name'] = full_value
-                        print(f"Parsed Name: '{data['Name']}'")
-                        
-                    elif field_name == 'model':
-                        # Fix common spacing issues in model names
-                        if re.search(r'[a-z][A-Z]', full_value):
-                            full_value = re.sub(r'([a-z])([A-Z])', r'\1 \2', full_value)
-                            print(f"Fixed model spacing: '{full_value}'")
-                        
-                        data['Model'] = full_value
-                        print(f"Parsed Model: '{data['Model']}'")
-                        
-                    elif field_name == 'plate':
-                        data['Plate'] = full_value
-                        print(f"Parsed Plate: '{data['Plate']}'")
-                        
-                    elif field_name == 'owner':
-                        # Fix common spacing issues in owner names
-                        if re.search(r'[a-z][A-Z]', full_value):
-                            full_value = re.sub(r'([a-z])([A-Z])', r'\1 \2', full_value)
-                            print(f"Fixed owner spacing: '{full_value}'")
-                        
-                        data['Owner'] = full_value
-                        print(f"Parsed Owner: '{data['Owner']}'")
-                    
-                    # Skip the lines we've already processed
-                    i = j - 1
-            
-            i += 1
-        
-        # Fallback: try line-by-line parsing if no fields were found
-        if not any(data.values()):
-            print("Fallback parsing: No field labels found, trying line-by-line")
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                line_lower = line.lower()
-                
-                # Name field
-                if 'name' in line_lower and ':' in line:
-                    data['Name'] = line.split(':', 1)[1].strip()
-                
-                # Model field
-                elif 'model' in line_lower and ':' in line:
-                    data['Model'] = line.split(':', 1)[1].strip()
-                
-                # Plate field
-                elif 'plate' in line_lower and ':' in line:
-                    data['Plate'] = line.split(':', 1)[1].strip()
-                
-                # Owner field
-                elif 'owner' in line_lower and ':' in line:
-                    data['Owner'] = line.split(':', 1)[1].strip()
+    def on_watch_capture_complete(self, formatted_output, error):
+        """Report a finished watch mode capture on the status line - runs on the Tk thread
         
-        return data
+        The panel can change many times a minute, so unlike on_capture_complete
+        this never opens a dialog; the output is already on the clipboard and
+        in the history.
+        """
+        self.refresh_stats_panel()
+        stamp = time.strftime('%H:%M:%S')
+        if error is not None:
+            print(f"Watch capture failed: {error}")
+            self.watch_status_label.config(text=f"{stamp} capture failed: {error}", fg="red")
+            return
+        first_line = formatted_output.splitlines()[0] if formatted_output else "(nothing parsed)"
+        self.watch_status_label.config(text=f"{stamp} copied: {first_line}", fg="green")
+    
+    def parse_vehicle_data(self, text):
+        """Parse OCR text with the active parser template"""
+        if self.parser_template is None:
+            return vehicle_parser.parse_vehicle_data(text)
+        return self.parser_template.parse(text)
     
     def format_output(self, data):
-        """Format the parsed data according to specifications"""
-        # Customer Name comes from Owner field
-        customer_name = data.get('Owner', '')
-        
-        # Vehicle Make/Model combines Name and Model fields
-        name = data.get('Name', '').strip()
-        model = data.get('Model', '').strip()
-        
-        # Ensure proper spacing between name and model
-        if name and model:
-            vehicle_make_model = f"{name} {model}"
-        elif name:
-            vehicle_make_model = name
-        elif model:
-            vehicle_make_model = model
-        else:
-            vehicle_make_model = ""
-        
-        # Plate stays the same
-        plate = data.get('Plate', '')
-        
-        return f"""```
-Customer Name: {customer_name}
-Vehicle | [Make/Model]: {vehicle_make_model}
-Plate: {plate}
-```"""
+        """Format the parsed data with the active parser template"""
+        if self.parser_template is None:
+            return vehicle_parser.format_output(data)
+        return self.parser_template.format_output(data)
     
     def on_closing(self):
         """Handle application closing"""
+        self.stop_watch_mode()
+        if self.ocr_service is not None:
+            self.ocr_service.stop()
+        self.capture_executor.shutdown()
+        # Let running OCR calls finish before the engine frees its handles below
+        self.field_ocr_pool.shutdown(wait=True)
+        self.region_ocr_pool.shutdown(wait=True)
+        if self.capture_backend is not None:
+            self.capture_backend.close()
+        if self.result_cache is not None:
+            self.result_cache.close()
+        if self.flight_recorder is not None:
+            self.flight_recorder.close()
+        if self.history_store is not None:
+            self.history_store.close()
+        self.tesseract_manager.close()
         self.root.quit()
         self.root.destroy()
     
+    def run_startup_probe(self):
+        """Report startup milestones on stdout for benchmarks/startup_time.py, then exit"""
+        print("STARTUP engine_ready", flush=True)
+        
+        def finished(result, error):
+            status = 'error' if error is not None else 'ok'
+            print(f"STARTUP first_capture {status}", flush=True)
+            self.on_closing()
+        
+        if not self.tesseract_ready or not self.calibrated_region:
+            finished(None, Exception("not calibrated"))
+            return
+        self.capture_executor.submit('startup-probe', self.run_capture_job, finished)
+    
     def run(self):
         """Run the application"""
         self.root.mainloop()
 
 if __name__ == "__main__":
-    # Check if required dependencies are available
-    try:
-        import pyautogui
-        import keyboard
-        import pyperclip
-        from PIL import Image, ImageTk, ImageGrab
-        # pytesseract will be handled by TesseractManager
-    except ImportError as e:
-        print(f"Missing required dependency: {e}")
+    # Needed for the batch worker processes in the frozen executable
+    multiprocessing.freeze_support()
+    
+    # Headless batch mode: python main.py batch SCREENSHOTS... (see batch_ocr.py)
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        from batch_ocr import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
+    
+    # OCR config autotuner: python main.py autotune [SAMPLES...] [--capture N] (see autotune.py)
+    if len(sys.argv) > 1 and sys.argv[1] == "autotune":
+        from autotune import main as autotune_main
+        sys.exit(autotune_main(sys.argv[2:]))
+    
+    # Headless service mode and client: python main.py service serve|capture|parse|last (see ipc_service.py)
+    if len(sys.argv) > 1 and sys.argv[1] == "service":
+        from ipc_service import main as service_main
+        sys.exit(service_main(sys.argv[2:]))
+    
+    # Check if required dependencies are available without importing them yet
+    import importlib.util
+    missing = [name for name in ('keyboard', 'pyperclip', 'PIL', 'numpy') if importlib.util.find_spec(name) is None]
+    # pytesseract will be handled by TesseractManager
+    if missing:
+        print(f"Missing required dependency: {', '.join(missing)}")
         print("Please install required packages using: pip install -r requirements.txt")
         exit(1)
     
@@ -0,0 +1,425 @@
+import os
+import re
+import sys
+import glob
+import ctypes
+import ctypes.util
+import threading
+import shutil
+import subprocess
+
+OCR_WHITELIST = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789: '
+
+# Tesseract options used for every capture
+OCR_CONFIG = f'--psm 6 -c tessedit_char_whitelist={OCR_WHITELIST}'
+
+# Options for a zone that holds a single line of text
+FIELD_OCR_CONFIG = f'--psm 7 -c tessedit_char_whitelist={OCR_WHITELIST}'
+
+_PSM_OPTION = re.compile(r'--psm\s+\d+')
+
+
+def single_line_config(config):
+    """config with its page segmentation mode switched to a single text line (--psm 7)"""
+    config = config or ''
+    if _PSM_OPTION.search(config):
+        return _PSM_OPTION.sub('--psm 7', config)
+    return f'--psm 7 {config}'.strip()
+
+
+TSV_COLUMNS = ('level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+               'left', 'top', 'width', 'height', 'conf', 'text')
+
+
+def parse_tesseract_config(config):
+    """Split a pytesseract style config string into (psm, oem, variables)"""
+    psm = None
+    oem = None
+    variables = {}
+
+    tokens = config.split() if config else []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == '--psm' and i + 1 < len(tokens):
+            psm = int(tokens[i + 1])
+            i += 1
+        elif token == '--oem' and i + 1 < len(tokens):
+            oem = int(tokens[i + 1])
+            i += 1
+        elif token == '-c' and i + 1 < len(tokens):
+            name, _, value = tokens[i + 1].partition('=')
+            variables[name] = value
+            i += 1
+        i += 1
+
+    return psm, oem, variables
+
+
+def parse_tsv(tsv):
+    """Parse tesseract TSV output into a list of word dicts, skipping empty words"""
+    words = []
+    for line in tsv.splitlines():
+        columns = line.split('\t')
+        if len(columns) < len(TSV_COLUMNS) or columns[0] == 'level':
+            continue
+        if columns[0] != '5' or not columns[11].strip():
+            continue
+        word = {name: int(value) for name, value in zip(TSV_COLUMNS[:10], columns[:10])}
+        word['conf'] = float(columns[10])
+        word['text'] = columns[11].strip()
+        words.append(word)
+    return words
+
+
+def find_tesseract_library(tesseract_path=None):
+    """Locate the libtesseract shared library that belongs to a tesseract install"""
+    search_dirs = []
+    if tesseract_path and os.path.dirname(tesseract_path):
+        exe_dir = os.path.dirname(os.path.abspath(tesseract_path))
+        search_dirs.append(exe_dir)
+        search_dirs.append(os.path.join(os.path.dirname(exe_dir), "lib"))
+
+    if sys.platform == "win32":
+        patterns = ["libtesseract-*.dll", "tesseract*.dll"]
+    elif sys.platform == "darwin":
+        patterns = ["libtesseract.*.dylib", "libtesseract.dylib"]
+    else:
+        patterns = ["libtesseract.so.*", "libtesseract.so"]
+
+    for directory in search_dirs:
+        for pattern in patterns:
+            matches = sorted(glob.glob(os.path.join(directory, pattern)))
+            if matches:
+                return matches[-1]
+
+    return ctypes.util.find_library("tesseract")
+
+
+def find_tessdata_dir(tesseract_path=None):
+    """Locate the tessdata directory for a tesseract install, if it is not on the default path"""
+    if os.environ.get("TESSDATA_PREFIX"):
+        return None
+
+    if tesseract_path and os.path.dirname(tesseract_path):
+        exe_dir = os.path.dirname(os.path.abspath(tesseract_path))
+        candidate = os.path.join(exe_dir, "tessdata")
+        if os.path.isdir(candidate):
+            return candidate
+
+    return None
+
+
+class PytesseractEngine:
+    """OCR engine that runs the tesseract command line tool for every call"""
+
+    name = "pytesseract"
+
+    def image_to_string(self, image, config=''):
+        """Recognize text in a PIL image"""
+        import pytesseract
+        return pytesseract.image_to_string(image, config=config)
+
+    def image_to_data(self, image, config=''):
+        """Recognize words in a PIL image with their boxes and confidences"""
+        import pytesseract
+        return parse_tsv(pytesseract.image_to_data(image, config=config))
+
+    def warm_up(self, config=''):
+        """Nothing to preload, every call starts a new process"""
+        return True
+
+    def close(self):
+        """Nothing to release"""
+        pass
+
+
+def image_to_pnm(image):
+    """Wrap raw PIL pixels in a PGM/PPM header without any compression"""
+    if image.mode == "RGBA" or image.mode not in ("L", "RGB"):
+        image = image.convert("RGB")
+    magic = b"P5" if image.mode == "L" else b"P6"
+    width, height = image.size
+    return b"%s\n%d %d\n255\n" % (magic, width, height) + image.tobytes()
+
+
+class TesseractStdinEngine:
+    """OCR engine that pipes uncompressed pixels to the tesseract CLI
+
+    pytesseract saves every image to a temporary PNG and reads the result
+    back from a .txt file. Here the image goes to tesseract's stdin as a
+    PNM and the text comes back on stdout, so nothing touches the disk and
+    no PNG compression is done.
+    """
+
+    name = "tesseract-stdin"
+
+    def __init__(self, tesseract_cmd="tesseract", timeout=30):
+        self.tesseract_cmd = tesseract_cmd
+        self.timeout = timeout
+        self._creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+
+    def build_command(self, config='', output_format=None):
+        """Build the tesseract command line for a stdin/stdout run"""
+        psm, oem, variables = parse_tesseract_config(config)
+        command = [self.tesseract_cmd, "stdin", "stdout"]
+        if psm is not None:
+            command += ["--psm", str(psm)]
+        if oem is not None:
+            command += ["--oem", str(oem)]
+        for name, value in variables.items():
+            command += ["-c", f"{name}={value}"]
+        if output_format:
+            command.append(output_format)
+        return command
+
+    def run(self, image, config='', output_format=None):
+        """Run tesseract on image and return its stdout as text"""
+        result = subprocess.run(
+            self.build_command(config, output_format),
+            input=image_to_pnm(image),
+            capture_output=True,
+            timeout=self.timeout,
+            creationflags=self._creationflags,
+        )
+        if result.returncode != 0:
+            error = result.stderr.decode("utf-8", "replace").strip()
+            raise RuntimeError(f"tesseract failed: {error}")
+        return result.stdout.decode("utf-8", "replace")
+
+    def image_to_string(self, image, config=''):
+        """Recognize text in a PIL image"""
+        return self.run(image, config)
+
+    def image_to_data(self, image, config=''):
+        """Recognize words in a PIL image with their boxes and confidences"""
+        return parse_tsv(self.run(image, config, output_format='tsv'))
+
+    def warm_up(self, config=''):
+        """Nothing to preload, every call starts a new process"""
+        return True
+
+    def close(self):
+        """Nothing to release"""
+        pass
+
+
+class TesseractAPIEngine:
+    """OCR engine that keeps libtesseract loaded in-process through its C API
+
+    Initialising a TessBaseAPI loads the traineddata and sets up the LSTM
+    network, so handles are created once per distinct (oem, variables)
+    combination and reused for every later call. A TessBaseAPI handle is
+    not safe to use from two threads at once, so handles are checked out of
+    a small pool and a second concurrent caller gets its own handle.
+    """
+
+    name = "libtesseract"
+
+    # TessOcrEngineMode OEM_DEFAULT
+    DEFAULT_OEM = 3
+    # Matches the resolution the tesseract CLI assumes for images without DPI info
+    SOURCE_RESOLUTION = 70
+
+    def __init__(self, library_path, datapath=None, lang="eng"):
+        if sys.platform == "win32" and hasattr(os, "add_dll_directory"):
+            # The UB-Mannheim build keeps leptonica and friends next to libtesseract
+            os.add_dll_directory(os.path.dirname(os.path.abspath(library_path)))
+
+        self.library_path = library_path
+        self.datapath = datapath
+        self.lang = lang
+        self.lib = ctypes.CDLL(library_path)
+        self._declare_functions()
+        self._pool = {}
+        self._pool_lock = threading.Lock()
+        self._all_handles = []
+        # Handles currently checked out; close() waits for them before freeing anything
+        self._checked_out = 0
+        self._idle = threading.Condition(self._pool_lock)
+        self._closed = False
+
+    def _declare_functions(self):
+        """Declare argument and return types for the C API functions we use"""
+        lib = self.lib
+        lib.TessVersion.restype = ctypes.c_char_p
+        lib.TessVersion.argtypes = []
+        lib.TessBaseAPICreate.restype = ctypes.c_void_p
+        lib.TessBaseAPICreate.argtypes = []
+        lib.TessBaseAPIDelete.restype = None
+        lib.TessBaseAPIDelete.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIEnd.restype = None
+        lib.TessBaseAPIEnd.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIInit2.restype = ctypes.c_int
+        lib.TessBaseAPIInit2.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
+        lib.TessBaseAPISetVariable.restype = ctypes.c_int
+        lib.TessBaseAPISetVariable.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
+        lib.TessBaseAPISetPageSegMode.restype = None
+        lib.TessBaseAPISetPageSegMode.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.TessBaseAPISetImage.restype = None
+        lib.TessBaseAPISetImage.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int,
+                                            ctypes.c_int, ctypes.c_int, ctypes.c_int]
+        lib.TessBaseAPISetSourceResolution.restype = None
+        lib.TessBaseAPISetSourceResolution.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.TessBaseAPIGetUTF8Text.restype = ctypes.c_void_p
+        lib.TessBaseAPIGetUTF8Text.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIGetTsvText.restype = ctypes.c_void_p
+        lib.TessBaseAPIGetTsvText.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.TessBaseAPIClear.restype = None
+        lib.TessBaseAPIClear.argtypes = [ctypes.c_void_p]
+        lib.TessDeleteText.restype = None
+        lib.TessDeleteText.argtypes = [ctypes.c_void_p]
+
+    def version(self):
+        """Return the libtesseract version string"""
+        return self.lib.TessVersion().decode("utf-8", "replace")
+
+    def _create_handle(self, oem, variables):
+        """Create and initialise a new TessBaseAPI handle"""
+        handle = self.lib.TessBaseAPICreate()
+        if not handle:
+            raise RuntimeError("TessBaseAPICreate failed")
+
+        datapath = self.datapath.encode("utf-8") if self.datapath else None
+        if self.lib.TessBaseAPIInit2(handle, datapath, self.lang.encode("utf-8"), oem) != 0:
+            self.lib.TessBaseAPIDelete(handle)
+            raise RuntimeError(f"Could not initialize tesseract with language '{self.lang}'")
+
+        for name, value in variables:
+            if not self.lib.TessBaseAPISetVariable(handle, name.encode("utf-8"), value.encode("utf-8")):
+                print(f"Tesseract rejected variable '{name}'")
+
+        with self._pool_lock:
+            self._all_handles.append(handle)
+        return handle
+
+    def _acquire(self, key):
+        """Check a ready handle out of the pool, creating one if none is free"""
+        with self._pool_lock:
+            if self._closed:
+                raise RuntimeError("OCR engine is closed")
+            self._checked_out += 1
+            free = self._pool.get(key)
+            if free:
+                return free.pop()
+        try:
+            return self._create_handle(*key)
+        except Exception:
+            with self._pool_lock:
+                self._checked_out -= 1
+                self._idle.notify_all()
+            raise
+
+    def _release(self, key, handle):
+        """Return a handle to the pool"""
+        with self._pool_lock:
+            self._pool.setdefault(key, []).append(handle)
+            self._checked_out -= 1
+            self._idle.notify_all()
+
+    def _recognize(self, image, config, get_text):
+        """Set up a pooled handle for image and config and read its result with get_text"""
+        psm, oem, variables = parse_tesseract_config(config)
+        key = (oem if oem is not None else self.DEFAULT_OEM, tuple(sorted(variables.items())))
+
+        if image.mode not in ("L", "RGB", "RGBA"):
+            image = image.convert("RGB")
+        bytes_per_pixel = len(image.mode)
+        width, height = image.size
+        pixels = image.tobytes()
+
+        handle = self._acquire(key)
+        try:
+            if psm is not None:
+                self.lib.TessBaseAPISetPageSegMode(handle, psm)
+            self.lib.TessBaseAPISetImage(handle, pixels, width, height,
+                                         bytes_per_pixel, width * bytes_per_pixel)
+            self.lib.TessBaseAPISetSourceResolution(handle, self.SOURCE_RESOLUTION)
+
+            text_ptr = get_text(handle)
+            if not text_ptr:
+                return ''
+            try:
+                return ctypes.string_at(text_ptr).decode("utf-8", "replace")
+            finally:
+                self.lib.TessDeleteText(text_ptr)
+        finally:
+            self.lib.TessBaseAPIClear(handle)
+            self._release(key, handle)
+
+    def image_to_string(self, image, config=''):
+        """Recognize text in a PIL image"""
+        return self._recognize(image, config, self.lib.TessBaseAPIGetUTF8Text)
+
+    def image_to_data(self, image, config=''):
+        """Recognize words in a PIL image with their boxes and confidences"""
+        tsv = self._recognize(image, config, lambda handle: self.lib.TessBaseAPIGetTsvText(handle, 0))
+        return parse_tsv(tsv)
+
+    def warm_up(self, config=''):
+        """Create a handle for config ahead of the first capture"""
+        psm, oem, variables = parse_tesseract_config(config)
+        key = (oem if oem is not None else self.DEFAULT_OEM, tuple(sorted(variables.items())))
+        self._release(key, self._acquire(key))
+        return True
+
+    def close(self, timeout=10.0):
+        """Release every handle owned by this engine
+
+        New calls are refused from here on, and handles still in use by
+        other threads are waited for - freeing one under a running OCR call
+        would crash the process. If they are not back within timeout, the
+        handles are leaked instead.
+        """
+        with self._pool_lock:
+            self._closed = True
+            if not self._idle.wait_for(lambda: self._checked_out == 0, timeout):
+                print(f"{self._checked_out} Tesseract handles still in use, not freeing them")
+                return
+            handles = self._all_handles
+            self._all_handles = []
+            self._pool = {}
+        for handle in handles:
+            self.lib.TessBaseAPIEnd(handle)
+            self.lib.TessBaseAPIDelete(handle)
+
+
+def create_ocr_engine(tesseract_path=None, warm_up_config=''):
+    """Create the fastest available OCR engine
+
+    Prefers libtesseract in-process, then the tesseract CLI over stdin, and
+    finally pytesseract's temp-file CLI path.
+    """
+    library_path = find_tesseract_library(tesseract_path)
+    if library_path:
+        try:
+            engine = TesseractAPIEngine(library_path, datapath=find_tessdata_dir(tesseract_path))
+            engine.warm_up(warm_up_config)
+            print(f"Using in-process Tesseract {engine.version()} from {library_path}")
+            return engine
+        except Exception as e:
+            print(f"Could not load libtesseract from {library_path}: {e}")
+
+    if tesseract_path:
+        print("Using tesseract command line engine over stdin")
+        return TesseractStdinEngine(tesseract_path)
+
+    print("Using pytesseract command line engine")
+    return PytesseractEngine()
+
+
+def create_named_engine(name, tesseract_cmd="tesseract"):
+    """Create a specific engine ('libtesseract', 'stdin' or 'pytesseract') for tools and benchmarks"""
+    if name == "libtesseract":
+        resolved = tesseract_cmd if os.path.dirname(tesseract_cmd) else shutil.which(tesseract_cmd)
+        library = find_tesseract_library(resolved)
+        if not library:
+            raise RuntimeError("libtesseract not found")
+        return TesseractAPIEngine(library, datapath=find_tessdata_dir(resolved))
+    if name == "stdin":
+        return TesseractStdinEngine(tesseract_cmd)
+    if name == "pytesseract":
+        import pytesseract
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        return PytesseractEngine()
+    raise ValueError(f"Unknown engine '{name}'")
@@ -0,0 +1,130 @@
+from ocr_engine import OCR_CONFIG
+from preprocessing import ImagePreprocessor
+from field_layout import FIELD_LABELS, learn_field_layout, words_to_text
+from field_confidence import DEFAULT_SETTINGS as CONFIDENCE_DEFAULTS, refine_fields
+from latency_stats import StageTimer
+import vehicle_parser
+
+
+class OCRPipeline:
+    """Everything capture_and_parse does after the screen grab
+
+    cache lookup -> preprocessing -> OCR (whole region or learned value
+    zones) -> re-OCR of low-confidence fields -> parse_vehicle_data ->
+    format_output. Kept free of Tk and
+    clipboard code so the benchmark harness, batch mode and service mode
+    run exactly the same steps as the hotkey.
+
+    get_engine is a zero-argument callable returning the OCR engine, so the
+    engine can be swapped after the pipeline is built (e.g. once Tesseract
+    is installed).
+
+    confidence holds field_confidence settings; when it is given, OCR is
+    done with word confidences and match_label (a parser's label matcher)
+    is used to tell which field each word belongs to.
+    """
+
+    def __init__(self, get_engine, ocr_config=OCR_CONFIG, preprocessor=None, result_cache=None,
+                 per_field_ocr=False, field_layout=None, field_executor=None, on_layout_learned=None,
+                 parse=vehicle_parser.parse_vehicle_data, format_output=vehicle_parser.format_output,
+                 field_labels=FIELD_LABELS, confidence=None, match_label=vehicle_parser.match_vehicle_label):
+        self.get_engine = get_engine
+        self.ocr_config = ocr_config
+        self.preprocessor = preprocessor or ImagePreprocessor()
+        self.result_cache = result_cache
+        self.per_field_ocr = per_field_ocr and field_executor is not None
+        self.field_layout = field_layout
+        self.field_executor = field_executor
+        self.on_layout_learned = on_layout_learned
+        self.parse = parse
+        self.format_output = format_output
+        self.field_labels = field_labels
+        self.confidence = None
+        if confidence is not None and confidence.get('enabled', True):
+            self.confidence = dict(CONFIDENCE_DEFAULTS, **confidence)
+        self.match_label = match_label
+
+    def process(self, image, timer=None):
+        """Run the pipeline on a captured region
+
+        Returns a dict with the raw OCR text ('text', None on a cache hit),
+        'parsed' fields, 'formatted' output, per-field OCR 'confidence'
+        (empty unless confidence settings are given), the fields that were
+        re-OCR'd ('retried'), per-stage 'timings' in ms and whether the
+        result came from the cache.
+        """
+        timer = timer or StageTimer()
+
+        cache_key = None
+        if self.result_cache is not None:
+            # An unchanged panel gives the same pixels, so skip OCR and parsing entirely
+            with timer.stage('cache'):
+                cache_key, cached = self.result_cache.lookup(image)
+            if cached is not None:
+                return {'text': None, 'parsed': cached['parsed'], 'formatted': cached['formatted'],
+                        'confidence': cached.get('confidence', {}), 'retried': [],
+                        'timings': timer.timings, 'cached': True}
+
+        text, confidence, retried = self.recognize(image, timer)
+
+        # Parse the text for required fields and format it
+        with timer.stage('parse'):
+            parsed_data = self.parse(text)
+            formatted_output = self.format_output(parsed_data)
+
+        if self.result_cache is not None:
+            self.result_cache.store(cache_key, image, parsed_data, formatted_output, confidence)
+
+        return {'text': text, 'parsed': parsed_data, 'formatted': formatted_output,
+                'confidence': confidence, 'retried': retried,
+                'timings': timer.timings, 'cached': False}
+
+    def recognize(self, image, timer):
+        """OCR a captured region into (parser input text, {field: confidence}, re-OCR'd fields)"""
+        engine = self.get_engine()
+
+        layout = self.field_layout
+        if self.per_field_ocr and layout is not None and layout.anchors_match(image):
+            # Known layout - OCR only the value zones, in parallel
+            confidence, retried = {}, []
+            with timer.stage('ocr'):
+                if self.confidence is not None:
+                    values, confidence, retried = layout.ocr_fields_scored(
+                        image, engine, self.field_executor, self.preprocessor, self.confidence, self.ocr_config,
+                        timer)
+                else:
+                    values = layout.ocr_fields(image, engine, self.field_executor, self.preprocessor,
+                                               self.ocr_config, timer)
+            return "\n".join(f"{field}: {value}" for field, value in values.items()), confidence, retried
+
+        if self.per_field_ocr:
+            # Full-region OCR with word boxes so the layout can be (re-)learned
+            with timer.stage('ocr'):
+                words = engine.image_to_data(image, config=self.ocr_config)
+            self.field_layout = learn_field_layout(image, words, self.field_labels)
+            if self.field_layout is not None and self.on_layout_learned:
+                self.on_layout_learned(self.field_layout)
+            if self.confidence is not None:
+                return self.refine(image, words, engine, timer)
+            return words_to_text(words), {}, []
+
+        # Clean up the image so tesseract has fewer pixels and less noise to deal with
+        with timer.stage('preprocess'):
+            ocr_image, steps = self.preprocessor.process(image)
+        timer.add_steps('preprocess', steps)
+
+        if self.confidence is not None:
+            # Words with confidences cost the same tesseract run as plain text
+            with timer.stage('ocr'):
+                words = engine.image_to_data(ocr_image, config=self.ocr_config)
+            return self.refine(ocr_image, words, engine, timer)
+
+        # Perform OCR with gaming-optimized settings
+        with timer.stage('ocr'):
+            return engine.image_to_string(ocr_image, config=self.ocr_config), {}, []
+
+    def refine(self, image, words, engine, timer):
+        """Score the fields in words and re-OCR only the low-confidence ones"""
+        with timer.stage('reocr'):
+            return refine_fields(image, words, engine, self.match_label, self.confidence, self.field_executor,
+                                 self.ocr_config)
@@ -0,0 +1,189 @@
+"""Declarative parser templates
+
+A template describes a panel: its fields, the label (and aliases) each
+field appears under, normalizers applied to each value and the output
+format string. Templates are read from parser_templates.json next to
+calibration_config.json, keyed by name:
+
+    {
+      "dealer": {
+        "fields": {
+          "Stock": {"aliases": ["Stock No", "Stk"], "normalize": ["upper"]},
+          "Price": {"label": "Asking", "normalize": ["digits"]}
+        },
+        "joins": {},
+        "output": "Stock {Stock} for ${Price}"
+      }
+    }
+
+'label' defaults to the field name. 'joins' defines extra output values
+made of several fields joined by spaces, skipping empty ones. A file entry
+with the name of a built-in template replaces it.
+
+Each template is compiled once when it is loaded: labels and aliases go
+into the fuzzy label index of a VehicleParser, normalizers are composed
+into one function per field and the output string is split into literal
+and field segments, so a capture only runs the precompiled pieces.
+"""
+import json
+import os
+import re
+import string
+
+from vehicle_parser import VehicleParser, split_camel_case
+
+TEMPLATES_FILE = "parser_templates.json"
+DEFAULT_TEMPLATE = 'vehicle'
+
+_WHITESPACE = re.compile(r'\s+')
+_NON_DIGITS = re.compile(r'[^0-9]')
+_NON_ALNUM = re.compile(r'[^0-9A-Za-z ]')
+
+NORMALIZERS = {
+    'strip': str.strip,
+    'collapse_spaces': lambda value: _WHITESPACE.sub(' ', value).strip(),
+    'split_camel_case': split_camel_case,
+    'upper': str.upper,
+    'lower': str.lower,
+    'title': str.title,
+    'digits': lambda value: _NON_DIGITS.sub('', value),
+    'alnum': lambda value: _NON_ALNUM.sub('', value),
+}
+
+# The vehicle info panel - the format AutoParse has always produced
+BUILTIN_TEMPLATES = {
+    'vehicle': {
+        'fields': {
+            'Name': {},
+            'Model': {'normalize': ['split_camel_case']},
+            'Plate': {},
+            'Owner': {'normalize': ['split_camel_case']},
+        },
+        'joins': {'MakeModel': ['Name', 'Model']},
+        'output': "```\nCustomer Name: {Owner}\nVehicle | [Make/Model]: {MakeModel}\nPlate: {Plate}\n```",
+    },
+}
+
+
+def compose(names):
+    """One function applying the named normalizers in order"""
+    functions = []
+    for name in names:
+        if name not in NORMALIZERS:
+            raise ValueError(f"Unknown normalizer '{name}'")
+        functions.append(NORMALIZERS[name])
+    if len(functions) == 1:
+        return functions[0]
+
+    def normalize(value):
+        for function in functions:
+            value = function(value)
+        return value
+    return normalize
+
+
+def compile_output(output, names):
+    """Split a format string into (literal, field, format_spec) segments"""
+    segments = []
+    for literal, field, format_spec, conversion in string.Formatter().parse(output):
+        if field is not None:
+            if field not in names:
+                raise ValueError(f"Output refers to unknown field '{field}'")
+            if conversion:
+                raise ValueError(f"Conversions are not supported in the output ('{field}!{conversion}')")
+        segments.append((literal, field, format_spec or None))
+    return tuple(segments)
+
+
+class ParserTemplate:
+    """A template compiled into a label matcher and an output formatter"""
+
+    def __init__(self, name, definition):
+        self.name = name
+        self.definition = definition
+
+        fields = definition.get('fields') or {}
+        if not fields:
+            raise ValueError(f"Template '{name}' has no fields")
+        labels = {}
+        normalizers = {}
+        for field, spec in fields.items():
+            for label in [spec.get('label', field)] + list(spec.get('aliases', [])):
+                labels[label] = field
+            if spec.get('normalize'):
+                normalizers[field] = compose(spec['normalize'])
+        self.parser = VehicleParser(fields, camel_case_fields=(), labels=labels, normalizers=normalizers)
+        # Primary label of each field, as printed on the panel (used to learn the field layout)
+        self.layout_labels = tuple(spec.get('label', field) for field, spec in fields.items())
+
+        self.joins = tuple((joined, tuple(parts)) for joined, parts in (definition.get('joins') or {}).items())
+        for joined, parts in self.joins:
+            unknown = [part for part in parts if part not in fields]
+            if unknown:
+                raise ValueError(f"Join '{joined}' refers to unknown fields {unknown}")
+        self.segments = compile_output(definition.get('output', ''), set(fields) | {joined for joined, _ in self.joins})
+        # Changes whenever the template does, so cached results of an older version are not reused
+        self.fingerprint = json.dumps(definition, sort_keys=True)
+
+    def parse(self, text):
+        """Parse OCR text into a dict with one entry per field"""
+        return self.parser.parse(text)
+
+    def match_label(self, token):
+        """Field a label token refers to, or None"""
+        return self.parser.match_label(token)
+
+    def add_corrector(self, field, corrector):
+        """Run corrector (e.g. a fuzzy_dictionary.FieldCorrector) on field after its normalizers"""
+        if field not in self.parser.fields:
+            print(f"Template '{self.name}' has no field '{field}' to correct")
+            return
+        normalize = self.parser.normalizers.get(field)
+        if normalize is None:
+            self.parser.normalizers[field] = corrector
+        else:
+            self.parser.normalizers[field] = lambda value: corrector(normalize(value))
+
+    def format_output(self, data):
+        """Render parsed data with the template's output string"""
+        values = dict(data)
+        for joined, parts in self.joins:
+            values[joined] = ' '.join(part for part in (data.get(field, '').strip() for field in parts) if part)
+        pieces = []
+        for literal, field, format_spec in self.segments:
+            pieces.append(literal)
+            if field is not None:
+                value = values.get(field, '')
+                pieces.append(format(value, format_spec) if format_spec else value)
+        return ''.join(pieces)
+
+
+def load_templates(path=TEMPLATES_FILE):
+    """Compile the built-in templates and those in path, by name
+
+    A template that fails to compile is reported and skipped; the others
+    still load.
+    """
+    definitions = dict(BUILTIN_TEMPLATES)
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                definitions.update(json.load(f))
+        except Exception as e:
+            print(f"Error loading parser templates from {path}: {e}")
+
+    templates = {}
+    for name, definition in definitions.items():
+        try:
+            templates[name] = ParserTemplate(name, definition)
+        except Exception as e:
+            print(f"Skipping parser template '{name}': {e}")
+    return templates
+
+
+def get_template(templates, name):
+    """The template called name, falling back to the default one"""
+    if name in templates:
+        return templates[name]
+    print(f"Unknown parser template '{name}', using '{DEFAULT_TEMPLATE}'")
+    return templates.get(DEFAULT_TEMPLATE) or ParserTemplate(DEFAULT_TEMPLATE, BUILTIN_TEMPLATES[DEFAULT_TEMPLATE])
@@ -0,0 +1,161 @@
+import time
+import numpy as np
+from PIL import Image
+
+# Every step is off by default; enable them per region under 'preprocess' in calibration_config.json
+DEFAULT_PREPROCESS_SETTINGS = {
+    'grayscale': False,           # Convert to 8-bit luminance
+    'threshold': None,            # None, 'otsu' or 'adaptive'
+    'adaptive_block_size': 31,    # Window size in pixels for 'adaptive'
+    'adaptive_offset': 10,        # How far from the local mean a pixel must be to count as ink
+    'crop_to_ink': False,         # Drop empty margins around the text
+    'crop_margin': 6,             # Pixels of background kept around the ink
+    'target_text_height': None,   # Rescale so text lines are about this many pixels tall
+}
+
+
+def to_grayscale(pixels):
+    """ITU-R 601 luminance of an RGB(A) or gray pixel array as uint8"""
+    if pixels.ndim == 2:
+        return pixels
+    weights = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    return (pixels[..., :3].astype(np.float32) @ weights).astype(np.uint8)
+
+
+def otsu_threshold(gray):
+    """Otsu's threshold for a uint8 array, computed from its histogram"""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    prob = hist / hist.sum()
+    omega = np.cumsum(prob)
+    mu = np.cumsum(prob * np.arange(256))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = (mu[-1] * omega - mu) ** 2 / (omega * (1.0 - omega))
+    between[~np.isfinite(between)] = 0
+    return int(np.argmax(between))
+
+
+def local_mean(gray, block_size):
+    """Mean over a block_size x block_size window around each pixel, via an integral image"""
+    radius = block_size // 2
+    size = 2 * radius + 1
+    padded = np.pad(gray.astype(np.int64), radius + 1, mode='edge')
+    integral = padded.cumsum(axis=0).cumsum(axis=1)
+    height, width = gray.shape
+    window = (integral[size:size + height, size:size + width]
+              - integral[:height, size:size + width]
+              - integral[size:size + height, :width]
+              + integral[:height, :width])
+    return window / (size * size)
+
+
+def has_dark_background(gray):
+    """True if most pixels fall below the Otsu threshold, i.e. light text on a dark panel"""
+    return (gray > otsu_threshold(gray)).mean() < 0.5
+
+
+def otsu_ink_mask(gray):
+    """Ink mask from a global Otsu split, assuming the background is the majority"""
+    bright = gray > otsu_threshold(gray)
+    return bright if bright.mean() < 0.5 else ~bright
+
+
+def adaptive_ink_mask(gray, block_size=31, offset=10):
+    """Ink mask of pixels that stand out from their local mean by more than offset"""
+    mean = local_mean(gray, block_size)
+    if has_dark_background(gray):
+        return gray > mean + offset
+    return gray < mean - offset
+
+
+def ink_bounding_box(ink, margin):
+    """(top, bottom, left, right) slice bounds around the ink, or None if there is none"""
+    rows = np.flatnonzero(ink.any(axis=1))
+    cols = np.flatnonzero(ink.any(axis=0))
+    if rows.size == 0 or cols.size == 0:
+        return None
+    height, width = ink.shape
+    return (max(rows[0] - margin, 0), min(rows[-1] + margin + 1, height),
+            max(cols[0] - margin, 0), min(cols[-1] + margin + 1, width))
+
+
+def median_line_height(ink):
+    """Median height in pixels of the horizontal bands that contain ink"""
+    has_ink = np.concatenate(([False], ink.any(axis=1), [False]))
+    edges = np.flatnonzero(has_ink[1:] != has_ink[:-1])
+    heights = edges[1::2] - edges[0::2]
+    heights = heights[heights > 2]  # Ignore specks
+    return float(np.median(heights)) if heights.size else None
+
+
+class ImagePreprocessor:
+    """Configurable preprocessing between the grab and the OCR call
+
+    process() returns the image to OCR together with the time each enabled
+    step took, so the effect on OCR latency can be measured per region.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = dict(DEFAULT_PREPROCESS_SETTINGS)
+        self.settings.update(settings or {})
+
+    @property
+    def enabled(self):
+        """True if any step is switched on"""
+        s = self.settings
+        return bool(s['grayscale'] or s['threshold'] or s['crop_to_ink'] or s['target_text_height'])
+
+    def process(self, image):
+        """Run the enabled steps on a PIL image, returning (image, {step: ms})"""
+        timings = {}
+        if not self.enabled:
+            return image, timings
+
+        s = self.settings
+        start = time.perf_counter()
+        pixels = np.asarray(image)
+        gray = None
+        ink = None
+
+        if s['grayscale'] or s['threshold']:
+            gray = to_grayscale(pixels)
+            pixels = gray
+            timings['grayscale'] = (time.perf_counter() - start) * 1000
+
+        if s['threshold']:
+            start = time.perf_counter()
+            if s['threshold'] == 'adaptive':
+                ink = adaptive_ink_mask(gray, s['adaptive_block_size'], s['adaptive_offset'])
+            else:
+                ink = otsu_ink_mask(gray)
+            # Tesseract expects dark text on a light background
+            pixels = np.where(ink, 0, 255).astype(np.uint8)
+            timings['threshold'] = (time.perf_counter() - start) * 1000
+
+        if s['crop_to_ink'] or s['target_text_height']:
+            start = time.perf_counter()
+            if ink is None:
+                ink = otsu_ink_mask(gray if gray is not None else to_grayscale(pixels))
+            timings['ink_mask'] = (time.perf_counter() - start) * 1000
+
+        if s['crop_to_ink']:
+            start = time.perf_counter()
+            box = ink_bounding_box(ink, s['crop_margin'])
+            if box is not None:
+                top, bottom, left, right = box
+                pixels = pixels[top:bottom, left:right]
+                ink = ink[top:bottom, left:right]
+            timings['crop_to_ink'] = (time.perf_counter() - start) * 1000
+
+        result = Image.fromarray(np.ascontiguousarray(pixels))
+
+        if s['target_text_height']:
+            start = time.perf_counter()
+            line_height = median_line_height(ink)
+            if line_height:
+                scale = min(max(s['target_text_height'] / line_height, 0.5), 4.0)
+                if abs(scale - 1.0) > 0.1:
+                    size = (max(1, round(result.width * scale)), max(1, round(result.height * scale)))
+                    result = result.resize(size, Image.BILINEAR)
+            timings['rescale'] = (time.perf_counter() - start) * 1000
+
+        return result, timings
@@ -0,0 +1,128 @@
+import time
+
+import vehicle_parser
+from latency_stats import StageTimer
+
+
+def parse_raw_text(text):
+    """Parser for regions that are copied verbatim"""
+    return {'Text': text.strip()}
+
+
+def format_raw_text(data):
+    return data.get('Text', '')
+
+
+# Parsers a region can name in its 'parser' setting: name -> (parse, format_output)
+PARSERS = {
+    'vehicle': (vehicle_parser.parse_vehicle_data, vehicle_parser.format_output),
+    'raw': (parse_raw_text, format_raw_text),
+}
+
+
+def get_parser(name, templates=None):
+    """(parse, format_output) for a parser name
+
+    Names of compiled parser templates (see parser_templates.py) take
+    precedence over the built-in PARSERS.
+    """
+    if templates and name in templates:
+        return templates[name].parse, templates[name].format_output
+    if name not in PARSERS:
+        raise ValueError(f"Unknown parser '{name}'")
+    return PARSERS[name]
+
+
+def bounding_box(bboxes):
+    """Smallest (left, top, right, bottom) containing every bbox"""
+    return (min(b[0] for b in bboxes), min(b[1] for b in bboxes),
+            max(b[2] for b in bboxes), max(b[3] for b in bboxes))
+
+
+class Region:
+    """One calibrated screen rectangle and the parser for its text"""
+
+    def __init__(self, name, bbox, parser='vehicle', preprocess=None, ocr_config=None, autotune=None):
+        self.name = name
+        self.bbox = tuple(bbox)
+        self.parser = parser
+        self.preprocess = preprocess or {}
+        self.ocr_config = ocr_config    # None uses the main region's config
+        self.autotune = autotune        # What autotune.py measured for ocr_config, if it picked it
+
+    def to_dict(self):
+        data = {'name': self.name, 'bbox': list(self.bbox), 'parser': self.parser, 'preprocess': self.preprocess}
+        if self.ocr_config:
+            data['ocr_config'] = self.ocr_config
+            data['autotune'] = self.autotune
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['bbox'], data.get('parser', 'vehicle'), data.get('preprocess'),
+                   data.get('ocr_config'), data.get('autotune'))
+
+
+class Profile:
+    """A named set of regions captured together by one hotkey"""
+
+    def __init__(self, name, hotkey, regions):
+        self.name = name
+        self.hotkey = hotkey
+        self.regions = regions
+
+    def bounding_box(self):
+        return bounding_box([region.bbox for region in self.regions])
+
+    def to_dict(self):
+        return {'name': self.name, 'hotkey': self.hotkey, 'regions': [region.to_dict() for region in self.regions]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data.get('hotkey'), [Region.from_dict(region) for region in data.get('regions', [])])
+
+
+def crop_boxes(origin, regions):
+    """(left, top, right, bottom) of each region inside a frame grabbed at origin"""
+    left, top = origin[0], origin[1]
+    return [(region.bbox[0] - left, region.bbox[1] - top, region.bbox[2] - left, region.bbox[3] - top)
+            for region in regions]
+
+
+class ProfileCapture:
+    """Runs every region of a profile through its own OCR pipeline, concurrently
+
+    One grab of the profile's bounding box is cropped into the regions;
+    each region keeps its own pipeline (parser, preprocessing, result cache)
+    so an unchanged panel is still a cache hit while its neighbour changes.
+    """
+
+    def __init__(self, profile, make_pipeline, executor):
+        self.profile = profile
+        self.executor = executor
+        self.pipelines = [make_pipeline(region) for region in profile.regions]
+
+    def process(self, image, timer=None):
+        """OCR and parse a grab of the profile's bounding box
+
+        Returns the same shape of dict as OCRPipeline.process, with 'parsed'
+        and 'confidence' keyed by region name, 'retried' as 'region.field'
+        names and the region outputs joined in 'formatted'.
+        """
+        timer = timer or StageTimer()
+        boxes = crop_boxes(self.profile.bounding_box(), self.profile.regions)
+
+        def run(pipeline, box):
+            return pipeline.process(image.crop(box))
+
+        start = time.perf_counter()
+        results = list(self.executor.map(run, self.pipelines, boxes))
+        timer.add('ocr', (time.perf_counter() - start) * 1000)
+
+        regions = self.profile.regions
+        parsed = {region.name: result['parsed'] for region, result in zip(regions, results)}
+        confidence = {region.name: result['confidence'] for region, result in zip(regions, results)}
+        retried = [f"{region.name}.{field}" for region, result in zip(regions, results) for field in result['retried']]
+        formatted = "\n".join(result['formatted'] for result in results)
+        return {'text': None, 'parsed': parsed, 'formatted': formatted, 'confidence': confidence, 'retried': retried,
+                'timings': timer.timings, 'cached': all(result['cached'] for result in results)}
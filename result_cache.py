@@ -0,0 +1,146 @@
+import hashlib
+import shelve
+import threading
+from collections import OrderedDict
+
+
+def exact_digest(image, namespace=''):
+    """Fast digest of the exact pixels of a PIL image"""
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(f"{namespace}|{image.mode}|{image.size[0]}x{image.size[1]}|".encode("utf-8"))
+    hasher.update(image.tobytes())
+    return hasher.hexdigest()
+
+
+def namespace_tag(namespace):
+    """Short digest of a namespace, prefixed to every cache key"""
+    return hashlib.blake2b(namespace.encode("utf-8"), digest_size=4).hexdigest()
+
+
+def perceptual_hash(image, hash_size=8):
+    """64-bit difference hash (dHash) of a PIL image"""
+    small = image.convert("L").resize((hash_size + 1, hash_size))
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+class ResultCache:
+    """Bounded LRU cache of OCR results keyed by the captured pixels
+
+    Exact lookups use a blake2b digest of the raw pixels. If
+    perceptual_tolerance is set, a miss falls back to the cached entry
+    whose dHash is within that many bits, which tolerates compression or
+    anti-aliasing noise but can also match a panel that differs by a
+    single character, so keep it at 0-2 bits. If disk_path is set, entries
+    are also written to a shelve database and exact hits survive restarts.
+
+    namespace is mixed into every key so results produced with a different
+    OCR config or parser are never reused.
+    """
+
+    def __init__(self, max_entries=64, perceptual_tolerance=None, disk_path=None, namespace=''):
+        self.max_entries = max_entries
+        self.perceptual_tolerance = perceptual_tolerance
+        self.namespace = namespace
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        self.hits = 0
+        self.perceptual_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if disk_path:
+            try:
+                self._disk = shelve.open(disk_path)
+            except Exception as e:
+                print(f"Could not open result cache at {disk_path}: {e}")
+
+    def lookup(self, image):
+        """Return (key, cached value or None) for a captured image"""
+        namespace = self.namespace
+        # The key records the namespace of the lookup, so a result stored after the namespace
+        # changed stays under the old one and is never a perceptual match for the new one
+        prefix = namespace_tag(namespace) + ":"
+        key = prefix + exact_digest(image, namespace)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return key, value
+
+            if self._disk is not None:
+                value = self._disk.get(key)
+                if value is not None:
+                    self._store(key, value)
+                    self.disk_hits += 1
+                    return key, value
+
+        if self.perceptual_tolerance is not None:
+            phash = perceptual_hash(image)
+            with self._lock:
+                for cached_key, cached in reversed(self._entries.items()):
+                    if not cached_key.startswith(prefix):
+                        continue
+                    if bin(cached["phash"] ^ phash).count("1") <= self.perceptual_tolerance:
+                        self._entries.move_to_end(cached_key)
+                        self.perceptual_hits += 1
+                        return key, cached
+
+        with self._lock:
+            self.misses += 1
+        return key, None
+
+    def store(self, key, image, parsed_data, formatted_output, confidence=None):
+        """Cache the result produced for an image previously passed to lookup"""
+        value = {
+            "parsed": parsed_data,
+            "formatted": formatted_output,
+            "confidence": confidence or {},
+            "phash": perceptual_hash(image) if self.perceptual_tolerance is not None else 0,
+        }
+        with self._lock:
+            self._store(key, value)
+            if self._disk is not None:
+                try:
+                    self._disk[key] = value
+                except Exception as e:
+                    print(f"Could not persist cached result: {e}")
+
+    def _store(self, key, value):
+        """Insert into the in-memory LRU, evicting the oldest entry when full"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """Hit/miss counters"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "perceptual_hits": self.perceptual_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+            if self._disk is not None:
+                self._disk.clear()
+
+    def close(self):
+        """Flush and close the on-disk tier"""
+        with self._lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
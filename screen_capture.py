@@ -0,0 +1,374 @@
+import sys
+import time
+import ctypes
+import ctypes.util
+import threading
+import statistics
+import numpy as np
+from PIL import Image, ImageGrab
+
+
+class CaptureBackend:
+    """Base class for screen capture backends
+
+    bbox is always (left, top, right, bottom) in screen pixels, the same
+    format ImageGrab and calibration_config.json use.
+    """
+
+    name = "base"
+
+    def grab(self, bbox):
+        """Grab bbox and return it as an RGB PIL image"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the backend"""
+        pass
+
+
+class ImageGrabBackend(CaptureBackend):
+    """PIL ImageGrab - works everywhere but may grab the whole desktop and crop"""
+
+    name = "imagegrab"
+
+    def grab(self, bbox):
+        """Grab bbox and return it as an RGB PIL image"""
+        return ImageGrab.grab(bbox=bbox)
+
+
+class MSSBackend(CaptureBackend):
+    """python-mss backend, copies only the requested rectangle (BitBlt/XGetImage/CGWindowList)"""
+
+    name = "mss"
+
+    def __init__(self):
+        import mss
+        self._mss = mss
+        # mss instances must be used on the thread that created them
+        self._local = threading.local()
+        self._instances = []
+        self._instances_lock = threading.Lock()
+
+    def _instance(self):
+        """Get the mss instance for the calling thread"""
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._mss.mss()
+            self._local.sct = sct
+            with self._instances_lock:
+                self._instances.append(sct)
+        return sct
+
+    def grab(self, bbox):
+        """Grab bbox and return it as an RGB PIL image"""
+        left, top, right, bottom = bbox
+        shot = self._instance().grab({"left": left, "top": top,
+                                      "width": right - left, "height": bottom - top})
+        return Image.frombuffer("RGB", shot.size, shot.bgra, "raw", "BGRX", 0, 1)
+
+    def close(self):
+        """Release any resources held by the backend"""
+        with self._instances_lock:
+            instances = self._instances
+            self._instances = []
+        for sct in instances:
+            try:
+                sct.close()
+            except Exception:
+                pass
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong),
+        ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p),
+        ("readOnly", ctypes.c_int),
+    ]
+
+
+class _XImage(ctypes.Structure):
+    # Only the leading fields we read; the struct is always allocated by Xlib
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+    ]
+
+
+class XShmBackend(CaptureBackend):
+    """X11 MIT-SHM backend, the server copies only the region into shared memory"""
+
+    name = "xshm"
+
+    ZPIXMAP = 2
+    ALL_PLANES = 0xFFFFFFFF
+    IPC_PRIVATE = 0
+    IPC_CREAT = 0o1000
+    IPC_RMID = 0
+
+    def __init__(self, display_name=None):
+        if not sys.platform.startswith("linux"):
+            raise RuntimeError("XShm is only available on X11")
+
+        x11_path = ctypes.util.find_library("X11")
+        xext_path = ctypes.util.find_library("Xext")
+        if not x11_path or not xext_path:
+            raise RuntimeError("libX11/libXext not found")
+
+        self.x11 = ctypes.CDLL(x11_path)
+        self.xext = ctypes.CDLL(xext_path)
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._declare_functions()
+
+        self.display = self.x11.XOpenDisplay(display_name.encode() if display_name else None)
+        if not self.display:
+            raise RuntimeError("Cannot open X display")
+        if not self.xext.XShmQueryExtension(self.display):
+            self.x11.XCloseDisplay(self.display)
+            raise RuntimeError("X server does not support MIT-SHM")
+
+        screen = self.x11.XDefaultScreen(self.display)
+        self.root = self.x11.XDefaultRootWindow(self.display)
+        self.visual = self.x11.XDefaultVisual(self.display, screen)
+        self.depth = self.x11.XDefaultDepth(self.display, screen)
+
+        # Xlib is not initialised for threads, so all calls go through this lock
+        self._lock = threading.Lock()
+        self._shminfo = None
+        self._ximage = None
+        self._size = None
+
+    def _declare_functions(self):
+        """Declare argument and return types for the Xlib/XShm/SysV calls we use"""
+        x11, xext, libc = self.x11, self.xext, self.libc
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XDefaultScreen.restype = ctypes.c_int
+        x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        x11.XDefaultRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        x11.XDefaultVisual.restype = ctypes.c_void_p
+        x11.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDefaultDepth.restype = ctypes.c_int
+        x11.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XFree.argtypes = [ctypes.c_void_p]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+
+        xext.XShmQueryExtension.restype = ctypes.c_int
+        xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        xext.XShmCreateImage.restype = ctypes.POINTER(_XImage)
+        xext.XShmCreateImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+                                         ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo),
+                                         ctypes.c_uint, ctypes.c_uint]
+        xext.XShmAttach.restype = ctypes.c_int
+        xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmDetach.restype = ctypes.c_int
+        xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmGetImage.restype = ctypes.c_int
+        xext.XShmGetImage.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(_XImage),
+                                      ctypes.c_int, ctypes.c_int, ctypes.c_ulong]
+
+        libc.shmget.restype = ctypes.c_int
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmdt.restype = ctypes.c_int
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmctl.restype = ctypes.c_int
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+    def _allocate(self, width, height):
+        """Create a shared memory XImage of the given size"""
+        self._release_image()
+
+        shminfo = _XShmSegmentInfo()
+        ximage = self.xext.XShmCreateImage(self.display, self.visual, self.depth, self.ZPIXMAP,
+                                           None, ctypes.byref(shminfo), width, height)
+        if not ximage:
+            raise RuntimeError("XShmCreateImage failed")
+        if ximage.contents.bits_per_pixel != 32:
+            self.x11.XFree(ximage)
+            raise RuntimeError(f"Unsupported X visual ({ximage.contents.bits_per_pixel} bpp)")
+
+        size = ximage.contents.bytes_per_line * height
+        shminfo.shmid = self.libc.shmget(self.IPC_PRIVATE, size, self.IPC_CREAT | 0o600)
+        if shminfo.shmid < 0:
+            self.x11.XFree(ximage)
+            raise OSError(ctypes.get_errno(), "shmget failed")
+
+        address = self.libc.shmat(shminfo.shmid, None, 0)
+        if address in (None, ctypes.c_void_p(-1).value):
+            self.libc.shmctl(shminfo.shmid, self.IPC_RMID, None)
+            self.x11.XFree(ximage)
+            raise OSError(ctypes.get_errno(), "shmat failed")
+
+        shminfo.shmaddr = address
+        shminfo.readOnly = 0
+        ximage.contents.data = address
+
+        self.xext.XShmAttach(self.display, ctypes.byref(shminfo))
+        self.x11.XSync(self.display, 0)
+        # Mark the segment for removal now so it cannot leak if we crash
+        self.libc.shmctl(shminfo.shmid, self.IPC_RMID, None)
+
+        self._shminfo = shminfo
+        self._ximage = ximage
+        self._size = (width, height)
+
+    def _release_image(self):
+        """Detach and free the current shared memory image"""
+        if self._ximage is None:
+            return
+        self.xext.XShmDetach(self.display, ctypes.byref(self._shminfo))
+        self.x11.XSync(self.display, 0)
+        self.libc.shmdt(self._shminfo.shmaddr)
+        self.x11.XFree(self._ximage)
+        self._ximage = None
+        self._shminfo = None
+        self._size = None
+
+    def grab(self, bbox):
+        """Grab bbox and return it as an RGB PIL image"""
+        left, top, right, bottom = bbox
+        width, height = right - left, bottom - top
+
+        with self._lock:
+            if self._size != (width, height):
+                self._allocate(width, height)
+            if not self.xext.XShmGetImage(self.display, self.root, self._ximage,
+                                          left, top, self.ALL_PLANES):
+                raise RuntimeError("XShmGetImage failed")
+            stride = self._ximage.contents.bytes_per_line
+            pixels = ctypes.string_at(self._shminfo.shmaddr, stride * height)
+
+        return Image.frombuffer("RGB", (width, height), pixels, "raw", "BGRX", stride, 1)
+
+    def close(self):
+        """Release any resources held by the backend"""
+        with self._lock:
+            self._release_image()
+            if self.display:
+                self.x11.XCloseDisplay(self.display)
+                self.display = None
+
+
+# Tried in this order, anything that fails to initialise is skipped
+BACKEND_CLASSES = [MSSBackend, XShmBackend, ImageGrabBackend]
+
+
+def available_backends():
+    """Instantiate every capture backend that works on this machine"""
+    backends = []
+    for backend_class in BACKEND_CLASSES:
+        try:
+            backends.append(backend_class())
+        except Exception as e:
+            print(f"Capture backend '{backend_class.name}' unavailable: {e}")
+    return backends
+
+
+def benchmark_backend(backend, bbox, rounds=5):
+    """Return the median grab latency of backend for bbox in milliseconds"""
+    backend.grab(bbox)  # First grab pays for lazy setup
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        backend.grab(bbox)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def select_capture_backend(bbox, rounds=5):
+    """Pick the fastest working backend for bbox with a short micro-benchmark"""
+    results = []
+    for backend in available_backends():
+        try:
+            latency = benchmark_backend(backend, bbox, rounds)
+            results.append((latency, backend))
+            print(f"Capture backend '{backend.name}': {latency:.2f} ms")
+        except Exception as e:
+            print(f"Capture backend '{backend.name}' failed benchmark: {e}")
+            backend.close()
+
+    if not results:
+        return ImageGrabBackend()
+
+    results.sort(key=lambda result: result[0])
+    for _, backend in results[1:]:
+        backend.close()
+    chosen = results[0][1]
+    print(f"Selected capture backend '{chosen.name}'")
+    return chosen
+
+
+def grab_region(backend, bbox, attempts=3, retry_delay=0.05):
+    """Grab bbox with retries, returning (image, latency_ms)"""
+    for attempt in range(attempts):
+        try:
+            start = time.perf_counter()
+            image = backend.grab(bbox)
+            if image:
+                return image, (time.perf_counter() - start) * 1000
+        except Exception as e:
+            print(f"Screenshot attempt {attempt + 1} failed: {e}")
+            time.sleep(retry_delay)  # Brief pause before retry
+
+    raise Exception("Failed to capture screenshot after multiple attempts")
+
+
+def frames_match(a, b, tolerance):
+    """True if two grabs of the same region differ by at most tolerance gray levels on average"""
+    if a.size != b.size:
+        return False
+    first = a.tobytes()
+    second = b.tobytes()
+    if first == second:
+        return True
+    difference = np.abs(np.frombuffer(first, np.uint8).astype(np.int16) - np.frombuffer(second, np.uint8))
+    return float(difference.mean()) <= tolerance
+
+
+def grab_stable(backend, bbox, tolerance=1.0, max_wait=0.3, poll_interval=0.02):
+    """Grab bbox once the region stops changing
+
+    Takes grabs poll_interval apart (about one frame at 50-60 fps) and
+    returns as soon as two consecutive grabs match within tolerance, or the
+    latest grab once max_wait has passed. Returns (image, timings) where
+    timings holds the last grab latency, the time spent waiting for the
+    region to settle and the number of frames grabbed.
+    """
+    start = time.perf_counter()
+    image, grab_ms = grab_region(backend, bbox)
+    frames = 1
+
+    while time.perf_counter() - start < max_wait:
+        time.sleep(poll_interval)
+        current, grab_ms = grab_region(backend, bbox)
+        frames += 1
+        stable = frames_match(image, current, tolerance)
+        image = current
+        if stable:
+            break
+
+    settle_ms = (time.perf_counter() - start) * 1000 - grab_ms
+    return image, {'grab': grab_ms, 'settle': settle_ms, 'frames': frames}
+
+
+if __name__ == "__main__":
+    # Benchmark every backend, e.g. under Xvfb: xvfb-run python screen_capture.py 0 0 330 213
+    region = tuple(int(value) for value in sys.argv[1:5]) if len(sys.argv) >= 5 else (0, 0, 330, 213)
+    backend = select_capture_backend(region, rounds=20)
+    image, latency = grab_region(backend, region)
+    print(f"{backend.name}: grabbed {image.size[0]}x{image.size[1]} in {latency:.2f} ms")
+    backend.close()
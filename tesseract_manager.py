@@ -2,55 +2,147 @@ import os
 import sys
 import subprocess
 import platform
-import urllib.request
-import zipfile
 import shutil
 from pathlib import Path
 import tkinter as tk
 from tkinter import messagebox, ttk
+from ocr_engine import create_ocr_engine, PytesseractEngine
+
+TESSERACT_INSTALLER_URL = "https://github.com/UB-Mannheim/tesseract/releases/download/v5.3.3.20231005/tesseract-ocr-w64-setup-5.3.3.20231005.exe"
+
+
+def installer_sha256():
+    """SHA-256 pinned for the installer in version_config.json, or None
+
+    build_exe.bat pins it with 'python tesseract_manager.py pin-installer'.
+    Without a pinned digest the installer is never downloaded or run.
+    """
+    from auto_updater import load_version_config
+    return load_version_config().get('tesseract_installer_sha256')
+
+
+def pin_installer(installer=None):
+    """Store the installer's SHA-256 in version_config.json and return it
+
+    Hashes installer if given, otherwise downloads TESSERACT_INSTALLER_URL.
+    """
+    import json
+    import tempfile
+    from downloader import download_file, file_sha256
+    
+    if installer:
+        digest = file_sha256(installer)
+    else:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            digest = download_file(TESSERACT_INSTALLER_URL, os.path.join(temp_dir, "tesseract_installer.exe"))
+    
+    config_path = Path(__file__).parent / "version_config.json"
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    config['tesseract_installer_sha256'] = digest
+    with open(config_path, "w") as f:
+        json.dump(config, f, indent=4)
+        f.write("\n")
+    return digest
+
 
 class TesseractManager:
-    def __init__(self):
+    def __init__(self, discovery_cache=None):
         self.system = platform.system().lower()
         self.tesseract_path = None
+        self.tesseract_version = None
         self.tesseract_dir = os.path.join(os.getcwd(), "tesseract")
+        self.ocr_engine = None
+        # {'path', 'version', 'mtime', 'size'} of the last binary found, persisted by the caller
+        self.discovery_cache = discovery_cache or None
+        self.discovery_cache_changed = False
+    
+    def candidate_paths(self):
+        """Every place Tesseract may be installed, including PATH"""
+        candidates = [
+            r"C:\Program Files\Tesseract-OCR\tesseract.exe",
+            r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
+            "/usr/bin/tesseract",
+            "/usr/local/bin/tesseract",
+            "/opt/homebrew/bin/tesseract",
+            os.path.join(self.tesseract_dir, "tesseract.exe"),
+            os.path.join(self.tesseract_dir, "tesseract")
+        ]
+        on_path = shutil.which("tesseract")
+        if on_path:
+            candidates.append(os.path.abspath(on_path))
         
-    def check_tesseract_installed(self):
-        """Check if Tesseract is installed and accessible"""
+        existing = []
+        for path in candidates:
+            if os.path.exists(path) and path not in existing:
+                existing.append(path)
+        return existing
+    
+    @staticmethod
+    def probe_tesseract(path):
+        """Run tesseract --version, returning the version string or None if it does not work"""
         try:
-            # Try common installation paths first
-            common_paths = [
-                r"C:\Program Files\Tesseract-OCR\tesseract.exe",
-                r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
-                "/usr/bin/tesseract",
-                "/usr/local/bin/tesseract",
-                "/opt/homebrew/bin/tesseract",
-                os.path.join(self.tesseract_dir, "tesseract.exe"),
-                os.path.join(self.tesseract_dir, "tesseract")
-            ]
-            
-            for path in common_paths:
-                if os.path.exists(path):
-                    try:
-                        result = subprocess.run([path, "--version"], 
-                                              capture_output=True, text=True, timeout=10)
-                        if result.returncode == 0:
-                            self.tesseract_path = path
-                            return True
-                    except:
-                        continue
-            
-            # Try system PATH
-            try:
-                result = subprocess.run(["tesseract", "--version"], 
-                                      capture_output=True, text=True, timeout=10)
-                if result.returncode == 0:
-                    self.tesseract_path = "tesseract"
+            result = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=10)
+        except Exception:
+            return None
+        if result.returncode != 0:
+            return None
+        # Older releases print the version to stderr
+        output = (result.stdout or result.stderr).strip()
+        first_line = output.splitlines()[0] if output else ""
+        return first_line.split()[-1] if first_line else "unknown"
+    
+    def validate_discovery_cache(self):
+        """Use the cached binary if it is still the same file - a stat call, no subprocess"""
+        cache = self.discovery_cache
+        if not cache or not cache.get('path'):
+            return False
+        try:
+            stat = os.stat(cache['path'])
+        except OSError:
+            return False
+        if stat.st_mtime != cache.get('mtime') or stat.st_size != cache.get('size'):
+            return False
+        self.tesseract_path = cache['path']
+        self.tesseract_version = cache.get('version')
+        return True
+    
+    def discover_tesseract(self):
+        """Probe every candidate concurrently and take the first one that works"""
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        
+        candidates = self.candidate_paths()
+        if not candidates:
+            return False
+        
+        executor = ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix="tesseract-probe")
+        try:
+            futures = {executor.submit(self.probe_tesseract, path): path for path in candidates}
+            for future in as_completed(futures):
+                version = future.result()
+                if version:
+                    self.remember_tesseract(futures[future], version)
                     return True
-            except:
-                pass
-                
             return False
+        finally:
+            # Slower probes finish (or time out) in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def remember_tesseract(self, path, version):
+        """Use path and record it in the discovery cache"""
+        stat = os.stat(path)
+        self.tesseract_path = path
+        self.tesseract_version = version
+        self.discovery_cache = {'path': path, 'version': version, 'mtime': stat.st_mtime, 'size': stat.st_size}
+        self.discovery_cache_changed = True
+        print(f"Found Tesseract {version} at {path}")
+    
+    def check_tesseract_installed(self):
+        """Check if Tesseract is installed and accessible"""
+        try:
+            if self.validate_discovery_cache():
+                return True
+            return self.discover_tesseract()
         except Exception as e:
             print(f"Error checking Tesseract: {e}")
             return False
@@ -59,24 +151,43 @@ class TesseractManager:
         """Get the path to Tesseract executable"""
         return self.tesseract_path
     
+    def download_tesseract_installer(self, progress_callback=None):
+        """Download the Windows installer, resuming a previous attempt, and return its path
+
+        progress_callback(percent) is called from download threads. Raises
+        RuntimeError when no installer digest is pinned, so an unverified
+        executable is never fetched.
+        """
+        from downloader import download_file, file_sha256
+        
+        expected = installer_sha256()
+        if not expected:
+            raise RuntimeError("No SHA-256 is pinned for the Tesseract installer - install it manually")
+        
+        # Create tesseract directory
+        os.makedirs(self.tesseract_dir, exist_ok=True)
+        installer_path = os.path.join(self.tesseract_dir, "tesseract_installer.exe")
+        
+        # Already downloaded and verified on an earlier run
+        if os.path.exists(installer_path):
+            if file_sha256(installer_path) == expected:
+                return installer_path
+        
+        def download_progress(done, total):
+            if progress_callback and total > 0:
+                progress_callback(min(100, done * 100 // total))
+        
+        download_file(TESSERACT_INSTALLER_URL, installer_path, sha256=expected,
+                      segments=4, progress_callback=download_progress)
+        return installer_path
+    
     def download_tesseract_windows(self, progress_callback=None):
         """Download and install Tesseract for Windows"""
+        if not installer_sha256():
+            # Reported to the install window, which then shows the manual instructions
+            raise RuntimeError("Automatic install is unavailable (installer digest not pinned)")
         try:
-            # Tesseract Windows installer URL (portable version)
-            url = "https://github.com/UB-Mannheim/tesseract/releases/download/v5.3.3.20231005/tesseract-ocr-w64-setup-5.3.3.20231005.exe"
-            
-            # Create tesseract directory
-            os.makedirs(self.tesseract_dir, exist_ok=True)
-            
-            installer_path = os.path.join(self.tesseract_dir, "tesseract_installer.exe")
-            
-            # Download with progress
-            def download_progress(block_num, block_size, total_size):
-                if progress_callback and total_size > 0:
-                    percent = min(100, (block_num * block_size * 100) // total_size)
-                    progress_callback(percent)
-            
-            urllib.request.urlretrieve(url, installer_path, download_progress)
+            installer_path = self.download_tesseract_installer(progress_callback)
             
             # Run silent installation
             install_dir = os.path.join(self.tesseract_dir, "install")
@@ -126,35 +237,44 @@ class TesseractManager:
         progress = ttk.Progressbar(frame, mode='determinate', length=300)
         progress.pack(pady=(0, 20))
         
+        # The worker thread only writes here; widgets are updated by poll() on the Tk thread
+        shared = {'percent': 0, 'success': None, 'error': None}
+        
         def update_progress(percent):
-            progress['value'] = percent
-            install_window.update()
+            shared['percent'] = percent
         
         def install_thread():
             try:
                 if self.system == "windows":
-                    success = self.download_tesseract_windows(update_progress)
+                    shared['success'] = self.download_tesseract_windows(update_progress)
                 else:
                     # For non-Windows systems, show instructions
-                    success = False
-                
-                if success:
-                    status_label.config(text="✓ Tesseract installed successfully!")
-                    progress['value'] = 100
-                    install_window.after(2000, install_window.destroy)
+                    shared['success'] = False
+            except Exception as e:
+                shared['error'] = e
+                shared['success'] = False
+        
+        def poll():
+            progress['value'] = shared['percent']
+            if shared['success'] is None:
+                install_window.after(100, poll)
+            elif shared['success']:
+                status_label.config(text="✓ Tesseract installed successfully!")
+                progress['value'] = 100
+                install_window.after(2000, install_window.destroy)
+            else:
+                if shared['error'] is not None:
+                    status_label.config(text=f"❌ Error: {str(shared['error'])}")
                 else:
                     status_label.config(text="❌ Installation failed. Please install manually.")
-                    # Show manual installation instructions
-                    self.show_manual_install_instructions(install_window)
-                    
-            except Exception as e:
-                status_label.config(text=f"❌ Error: {str(e)}")
+                # Show manual installation instructions
                 self.show_manual_install_instructions(install_window)
         
         # Start installation in background
         import threading
         thread = threading.Thread(target=install_thread, daemon=True)
         thread.start()
+        poll()
         
         install_window.wait_window()  # Wait for window to close
         
@@ -234,13 +354,18 @@ Restart this application after installation"""
         if self.check_tesseract_installed():
             return True
         
-        # Ask user if they want to install Tesseract
-        response = messagebox.askyesno(
-            "Tesseract OCR Required",
-            "Tesseract OCR is required for text recognition but was not found.\n\n"
-            "Would you like to install it automatically?\n\n"
-            "Click 'No' to see manual installation instructions."
-        )
+        if not installer_sha256():
+            # The installer cannot be verified, so never offer to download and run it
+            print("Tesseract installer digest not pinned, showing manual installation instructions")
+            response = False
+        else:
+            # Ask user if they want to install Tesseract
+            response = messagebox.askyesno(
+                "Tesseract OCR Required",
+                "Tesseract OCR is required for text recognition but was not found.\n\n"
+                "Would you like to install it automatically?\n\n"
+                "Click 'No' to see manual installation instructions."
+            )
         
         if response:
             # Try automatic installation
@@ -260,13 +385,55 @@ Restart this application after installation"""
             root.destroy()
             return False
     
-    def configure_pytesseract(self):
-        """Configure pytesseract with the correct path"""
+    def configure_pytesseract(self, warm_up_config=''):
+        """Configure pytesseract with the correct path and load the session OCR engine"""
         if self.tesseract_path and self.tesseract_path != "tesseract":
             try:
                 import pytesseract
                 pytesseract.pytesseract.tesseract_cmd = self.tesseract_path
-                return True
             except ImportError:
                 return False
+        
+        if self.ocr_engine is None:
+            self.ocr_engine = create_ocr_engine(self.tesseract_path, warm_up_config)
         return True
+    
+    def get_ocr_engine(self):
+        """Get the OCR engine, falling back to the pytesseract CLI if none was loaded"""
+        if self.ocr_engine is None:
+            self.ocr_engine = PytesseractEngine()
+        return self.ocr_engine
+    
+    def close(self):
+        """Release the OCR engine"""
+        if self.ocr_engine is not None:
+            self.ocr_engine.close()
+            self.ocr_engine = None
+
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Tesseract installer helpers")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    pin_parser = subparsers.add_parser('pin-installer',
+                                       help='Pin the SHA-256 of the Windows installer in version_config.json')
+    pin_parser.add_argument('--file', help='Hash this downloaded installer instead of fetching it')
+    pin_parser.add_argument('--force', action='store_true', help='Replace a digest that is already pinned')
+    args = parser.parse_args()
+    
+    pinned = installer_sha256()
+    if pinned and not (args.file or args.force):
+        print(f"Installer already pinned: sha256 {pinned}")
+        return 0
+    try:
+        digest = pin_installer(args.file)
+    except Exception as e:
+        print(f"Could not pin the Tesseract installer: {e}", file=sys.stderr)
+        return 1
+    print(f"Pinned {TESSERACT_INSTALLER_URL}\nsha256 {digest}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+import re
+
+FIELDS = ('Name', 'Model', 'Plate', 'Owner')
+
+# Fields whose OCR output tends to lose the space between words ("SultanRS")
+CAMEL_CASE_FIELDS = ('Model', 'Owner')
+
+_CAMEL_BOUNDARY = re.compile(r'([a-z])([A-Z])')
+_NON_LETTERS = re.compile(r'[^a-z]')
+
+# Characters tesseract commonly confuses with letters inside a label
+_LABEL_CONFUSIONS = str.maketrans({'1': 'l', '|': 'l', '!': 'l', '0': 'o', '5': 's', '8': 'b', '3': 'e', '4': 'a'})
+_ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def _edits1(word):
+    """Every string one insertion, deletion, substitution or transposition away from word"""
+    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    deletes = {a + b[1:] for a, b in splits if b}
+    transposes = {a + b[1] + b[0] + b[2:] for a, b in splits if len(b) > 1}
+    replaces = {a + c + b[1:] for a, b in splits if b for c in _ALPHABET}
+    inserts = {a + c + b for a, b in splits for c in _ALPHABET}
+    return deletes | transposes | replaces | inserts
+
+
+def build_label_index(labels):
+    """Map every spelling within edit distance 1 of a label to that label
+
+    labels may also be a dict of label -> target (e.g. several aliases of
+    one field), in which case spellings map to the target. Exact spellings
+    always win over fuzzy ones, and a fuzzy spelling that is close to two
+    different targets is left out rather than guessed.
+    """
+    targets = labels if isinstance(labels, dict) else {label: label for label in labels}
+    index = {}
+    ambiguous = set()
+    for label, target in targets.items():
+        for variant in _edits1(label.lower()):
+            if variant in index and index[variant] != target:
+                ambiguous.add(variant)
+            index[variant] = target
+    for variant in ambiguous:
+        del index[variant]
+    for label, target in targets.items():
+        index[label.lower()] = target
+    return index
+
+
+def split_camel_case(value):
+    """Put back the space OCR dropped between words ("SultanRS" -> "Sultan RS")"""
+    return _CAMEL_BOUNDARY.sub(r'\1 \2', value)
+
+
+def normalize_label(token):
+    """Lowercase a label token and undo common OCR confusions (Narne -> name, P1ate -> plate)"""
+    token = token.lower().translate(_LABEL_CONFUSIONS).replace('rn', 'm').replace('vv', 'w')
+    return _NON_LETTERS.sub('', token)
+
+
+class VehicleParser:
+    """Single-pass parser for the vehicle info panel
+
+    Each line is checked once: a line whose text before the first colon
+    matches a label (exactly or within one edit, after undoing common OCR
+    confusions) starts a new field, any other line continues the current
+    field. A match within one edit never replaces a field that already has
+    a value - "Same: weird" after the name is a continuation, not a second
+    Name. Values are collected as lists and joined once at the end.
+
+    labels maps every label spelling (field names and their aliases) to
+    its field and defaults to the field names themselves; normalizers maps
+    a field to a function applied to its joined value.
+    """
+
+    def __init__(self, fields=FIELDS, camel_case_fields=CAMEL_CASE_FIELDS, labels=None, normalizers=None):
+        self.fields = tuple(fields)
+        self.camel_case_fields = frozenset(camel_case_fields)
+        self.normalizers = dict.fromkeys(self.camel_case_fields, split_camel_case)
+        self.normalizers.update(normalizers or {})
+
+        labels = labels or {field: field for field in self.fields}
+        targets = {}
+        for label, field in labels.items():
+            targets[label.lower()] = field
+            # Multi-word labels are also matched in their normalize_label form ("Plate No" -> "plateno")
+            letters = _NON_LETTERS.sub('', label.lower())
+            if letters:
+                targets.setdefault(letters, field)
+        self.label_index = build_label_index(targets)
+        self._exact_labels = frozenset(targets)
+        self._field_words = tuple((label.lower(), field) for label, field in labels.items())
+
+    def match_label(self, token):
+        """Return the field a label token refers to, or None"""
+        return self._match(token)[0]
+
+    def _match(self, token):
+        """(field or None, whether the token is a label spelling rather than an edit away from one)"""
+        key = token.strip().lower()
+        field = self.label_index.get(key)
+        if field is None:
+            key = normalize_label(token)
+            field = self.label_index.get(key)
+        return field, key in self._exact_labels
+
+    def parse(self, text):
+        """Parse OCR text into a dict with one entry per field"""
+        parts = {}
+        loose = {}
+        current = None
+
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+
+            label, colon, value = line.partition(':')
+            if colon:
+                field, exact = self._match(label)
+                if field is not None and (exact or not parts.get(field)):
+                    value = value.strip()
+                    current = parts[field] = [value] if value else []
+                    continue
+
+                # A label we don't know that contains a field name, e.g. "Vehicle Name:"
+                label_lower = label.lower()
+                for word, loose_field in self._field_words:
+                    if word in label_lower:
+                        loose[loose_field] = value.strip()
+                        break
+
+            if current is not None:
+                current.append(line)
+
+        data = dict.fromkeys(self.fields, '')
+        for field, values in parts.items():
+            value = ' '.join(values)
+            normalize = self.normalizers.get(field)
+            if normalize is not None and value:
+                value = normalize(value)
+            data[field] = value
+
+        # Nothing usable under a known label, fall back to labels that merely contain a field name
+        if not any(data.values()):
+            data.update(loose)
+        return data
+
+
+def format_output(data):
+    """Format the parsed data according to specifications"""
+    # Customer Name comes from Owner field
+    customer_name = data.get('Owner', '')
+
+    # Vehicle Make/Model combines Name and Model fields
+    vehicle_make_model = ' '.join(part for part in (data.get('Name', '').strip(), data.get('Model', '').strip()) if part)
+
+    # Plate stays the same
+    plate = data.get('Plate', '')
+
+    return f"""```
+Customer Name: {customer_name}
+Vehicle | [Make/Model]: {vehicle_make_model}
+Plate: {plate}
+```"""
+
+
+_default_parser = VehicleParser()
+
+
+def parse_vehicle_data(text):
+    """Parse OCR text to extract vehicle information"""
+    return _default_parser.parse(text)
+
+
+def match_vehicle_label(token):
+    """Field of the vehicle panel a label token refers to, or None"""
+    return _default_parser.match_label(token)
@@ -0,0 +1,108 @@
+import threading
+import time
+import numpy as np
+
+
+class FrameChangeDetector:
+    """Cheap change detector working on a downsampled grayscale copy of each frame
+
+    A frame counts as changed when more than changed_fraction of its
+    downsampled pixels differ from the reference by more than
+    pixel_threshold gray levels.
+    """
+
+    def __init__(self, downsample=4, pixel_threshold=24, changed_fraction=0.002):
+        self.downsample = downsample
+        self.pixel_threshold = pixel_threshold
+        self.changed_fraction = changed_fraction
+
+    def signature(self, image):
+        """Downsampled grayscale pixels of a PIL image"""
+        return np.asarray(image.convert("L").reduce(self.downsample), dtype=np.int16)
+
+    def differs(self, a, b):
+        """True if signature b differs noticeably from signature a"""
+        if a is None or b is None or a.shape != b.shape:
+            return True
+        changed = np.count_nonzero(np.abs(a - b) > self.pixel_threshold)
+        return changed > self.changed_fraction * a.size
+
+
+class RegionWatcher:
+    """Samples a screen region on a background thread and calls on_change when its content changes
+
+    on_change fires once the region has changed and then held still for one
+    sample, so a panel that is animating in is only captured after it
+    settles. While nothing changes the sampling interval backs off up to
+    max_interval, and the thread sleeps on an Event between samples.
+    """
+
+    def __init__(self, grab, on_change, min_interval=0.25, max_interval=2.0, backoff=1.5, detector=None):
+        self.grab = grab
+        self.on_change = on_change
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.detector = detector or FrameChangeDetector()
+        self.samples = 0
+        self.triggers = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start watching in a daemon thread"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="region-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching"""
+        self._stop.set()
+
+    def _run(self):
+        """Sampling loop"""
+        interval = self.min_interval
+        previous = None
+        captured = None     # Signature of the last frame we triggered on
+        pending = False     # Content changed but has not settled yet
+
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            try:
+                current = self.detector.signature(self.grab())
+                self.samples += 1
+            except Exception as e:
+                print(f"Watch mode grab failed: {e}")
+                current = None
+
+            if current is not None:
+                if previous is None:
+                    # Whatever is on screen when watching starts is the baseline
+                    captured = current
+                elif self.detector.differs(previous, current):
+                    # Still changing, keep sampling fast
+                    pending = True
+                    interval = self.min_interval
+                elif pending and self.detector.differs(captured, current):
+                    # Settled on new content
+                    pending = False
+                    captured = current
+                    interval = self.min_interval
+                    self.triggers += 1
+                    try:
+                        self.on_change()
+                    except Exception as e:
+                        print(f"Watch mode capture failed: {e}")
+                else:
+                    pending = False
+                    interval = min(interval * self.backoff, self.max_interval)
+                previous = current
+
+            elapsed = time.perf_counter() - started
+            self._stop.wait(max(interval - elapsed, 0))